@@ -19,6 +19,13 @@ load_dotenv()
 
 # Import routers
 from routers import dashboard, yatra, gharwaapsi, concession, campuspay, festpass, kharcha
+from services import knowledge_base, station_search, timetable, upstream
+from services.bonafide import bonafide_issuer
+from services.chat_sessions import session_store
+from services.concession_engine import RATES
+from services.group_ledger import ledgers
+from services.plan_store import plan_store
+from services.route_trees import route_trees
 
 # ── Keep-Alive Ping (prevents Render free tier sleep) ─────
 SELF_URL = os.environ.get("RENDER_EXTERNAL_URL", os.environ.get("SELF_URL", ""))
@@ -39,9 +46,25 @@ async def keep_alive():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await upstream.start_clients()
+    knowledge_base.get_index()
+    station_search.get_index()
+    timetable.get_timetable()
+    ledgers.open()
     task = asyncio.create_task(keep_alive())
+    refresher = asyncio.create_task(plan_store.run_refresher())
+    rates_watcher = asyncio.create_task(RATES.watch())
+    route_warmer = asyncio.create_task(route_trees.run_warmer())
     yield
     task.cancel()
+    refresher.cancel()
+    rates_watcher.cancel()
+    route_warmer.cancel()
+    await upstream.close_clients()
+    session_store.close()
+    plan_store.close()
+    bonafide_issuer.close()
+    ledgers.close()
 
 # ── App Configuration ──────────────────────────────────────
 app = FastAPI(
@@ -92,20 +115,37 @@ async def root():
         "endpoints": [
             "/api/dashboard",
             "/api/yatra/chat",
+            "/api/yatra/chat/stream",
+            "/api/yatra/costs",
+            "/api/yatra/cache/stats",
+            "/api/yatra/providers",
             "/api/yatra/plan",
+            "/api/yatra/plans/stats",
             "/api/yatra/chips",
             "/api/gharwaapsi/route",
+            "/api/gharwaapsi/routes/bulk",
+            "/api/gharwaapsi/routes/stats",
+            "/api/gharwaapsi/stops/nearest",
             "/api/gharwaapsi/hostelmates",
             "/api/gharwaapsi/tatkal",
             "/api/gharwaapsi/papa-pay",
             "/api/concession/stations",
             "/api/concession/calculate",
+            "/api/concession/calculate/batch",
+            "/api/concession/rates",
+            "/api/concession/rates/reload",
             "/api/concession/bonafide",
+            "/api/concession/bonafide/bulk",
             "/api/campuspay/balance",
             "/api/campuspay/spending",
             "/api/campuspay/debts",
             "/api/campuspay/settle",
+            "/api/campuspay/settle/bulk",
             "/api/campuspay/categories",
+            "/api/campuspay/groups/{group}",
+            "/api/campuspay/groups/{group}/expenses",
+            "/api/campuspay/groups/{group}/payments",
+            "/api/campuspay/ledger/stats",
             "/api/festpass/featured",
             "/api/festpass/list",
             "/api/festpass/book",
@@ -1,7 +1,9 @@
 """Pydantic models for Paytm Campus OS API."""
 from __future__ import annotations
 
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
 from typing import Optional
 
 
@@ -36,12 +38,16 @@ class DashboardResponse(BaseModel):
 # ── Yatra (Trip Planner) ──────────────────────────────────
 class ChatRequest(BaseModel):
     message: str
-    history: list[dict] = []
+    history: list[dict] = []  # legacy: only used to seed a new conversation
+    conversation_id: Optional[str] = None
+    student_id: Optional[str] = None  # for fair LLM scheduling
 
 
 class ChatResponse(BaseModel):
     reply: str
     trip_generated: bool = False
+    conversation_id: Optional[str] = None
+    plan: Optional[TripPlan] = None  # structured plan parsed from the reply
 
 
 class TransportOption(BaseModel):
@@ -82,10 +88,59 @@ class TripPlan(BaseModel):
     members: list[GroupMember]
 
 
+class Itinerary(BaseModel):
+    from_station: str
+    to_station: str
+    member_count: int = 1
+    nights: int = 2
+    travel_class: str = "SL"        # "2S" | "SL" | "CC" | "3A"
+    category: str = "General"       # concession category
+    stay: str = "Budget"            # "Budget" | "Mid" | "Premium"
+    activities: Optional[list[str]] = None  # None = all listed for the destination
+    return_journey: bool = True
+
+
+class CostLine(BaseModel):
+    item: str
+    per_person: int
+    group: int
+
+
+class TripCost(BaseModel):
+    from_station: str
+    to_station: str
+    member_count: int
+    return_journey: bool = True
+    lines: list[CostLine]
+    per_person: int
+    group_total: int
+    upi_split: int
+
+
 # ── GharWaapsi ─────────────────────────────────────────────
+class GeoPoint(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+
+
 class RouteRequest(BaseModel):
     from_city: str
     to_city: str
+    depart_after: Optional[datetime] = None  # default: now (IST)
+    category: str = "General"
+    max_options: int = 3                      # alternatives to return (1–5)
+    origin: Optional[GeoPoint] = None         # door-to-door: start here instead of campus
+    home: Optional[GeoPoint] = None           # end here instead of the city's average address
+
+
+class BoardingPoint(BaseModel):
+    id: str
+    name: str
+    city: str
+    kind: str       # "rail" | "bus" | "campus"
+    lat: float
+    lon: float
+    km: float       # straight-line distance
 
 
 class RouteStep(BaseModel):
@@ -110,12 +165,36 @@ class TatkalInfo(BaseModel):
     alert_set: bool
 
 
-class RouteResponse(BaseModel):
+class RouteOption(BaseModel):
     steps: list[RouteStep]
     total_original: int
     total_discounted: int
     savings: int
     savings_text: str
+    depart_at: str = ""     # timetable journeys only, e.g. "Fri 18:30"
+    arrive_at: str = ""
+    duration: str = ""
+    transfers: int = 0
+    tags: list[str] = []    # "Fastest" | "Cheapest" | "Fewest changes"
+
+
+class RouteResponse(RouteOption):
+    alternatives: list[RouteOption] = []  # Pareto-optimal journeys, ranked
+
+
+class BulkRouteRequest(BaseModel):
+    from_city: str = "Lucknow"
+    to_cities: list[str] = []                 # empty: every reachable hometown
+    depart_after: Optional[datetime] = None
+    category: str = "General"
+    max_options: int = 1
+
+
+class BulkRouteResponse(BaseModel):
+    from_city: str
+    depart_at: str                            # start of the shared departure window
+    routes: dict[str, RouteResponse]
+    unreachable: list[str] = []
 
 
 class PapaPayRequest(BaseModel):
@@ -133,10 +212,17 @@ class PapaPayResponse(BaseModel):
 class ConcessionRequest(BaseModel):
     from_station: str
     to_station: str
-    travel_class: str  # "2S" | "SL"
+    travel_class: str  # "2S" | "SL" | "CC" | "3A"
     category: str      # "General" | "SC/ST" | "PH"
 
 
+class BonafideRequest(ConcessionRequest):
+    student_name: str = "Saksham Yason"
+    enrollment_no: str = "2023BCS1042"
+    course: str = "B.Tech Computer Science"
+    year: str = "3rd Year"
+
+
 class ConcessionResult(BaseModel):
     from_station: str
     to_station: str
@@ -150,8 +236,35 @@ class ConcessionResult(BaseModel):
     steps: list[str]
 
 
+class ConcessionQuote(BaseModel):
+    from_station: str
+    to_station: str
+    travel_class: str
+    category: str
+    distance_km: int
+    original_fare: int
+    concession_fare: int
+    savings: int
+    savings_pct: int
+
+
+class FareRates(BaseModel):
+    version: int
+    built_at: float
+    fare_rates: dict[str, dict[str, float]]
+    concession_rates: dict[str, int]
+    stations: int
+
+
+class StationMatch(BaseModel):
+    name: str
+    code: str
+    state: str
+
+
 class StationsResponse(BaseModel):
     stations: list[str]
+    matches: list[StationMatch] = []  # only for ?q= searches
 
 
 # ── CampusPay ──────────────────────────────────────────────
@@ -184,6 +297,36 @@ class DebtResponse(BaseModel):
     simplified_count: int
     simplified_transactions: list[SimplifiedTransaction]
     message: str
+    mode: str = "greedy"    # "exact" | "greedy"
+    optimal: bool = False   # fewest payments proven within the time budget
+
+
+class ExpenseRequest(BaseModel):
+    payer: str
+    amount: int = Field(gt=0)
+    participants: list[str] = []              # empty: every member, equal split
+    shares: Optional[dict[str, int]] = None   # exact ₹ per person, must sum to amount
+    note: str = ""
+
+
+class PaymentRequest(BaseModel):
+    payer: str
+    payee: str
+    amount: int = Field(gt=0)
+
+
+class MemberBalance(BaseModel):
+    name: str
+    balance: int  # positive: is owed, negative: owes
+
+
+class GroupLedgerResponse(BaseModel):
+    group: str
+    version: int
+    balances: list[MemberBalance]
+    settlements: list[SimplifiedTransaction]
+    mode: str = "exact"
+    optimal: bool = False
 
 
 class SpendingCategory(BaseModel):
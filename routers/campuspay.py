@@ -1,18 +1,46 @@
 """CampusPay API — mess balance, spending, micro-debt tracker."""
-from fastapi import APIRouter
+import asyncio
+import sqlite3
 
-from models import MessBalance, SpendingItem, Debt, DebtResponse, SpendingCategory
-from services.debt_simplifier import simplify_debts
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from models import (
+    MessBalance, SpendingItem, Debt, DebtResponse, SpendingCategory,
+    ExpenseRequest, PaymentRequest, MemberBalance, GroupLedgerResponse,
+)
+from services.bulk_settlement import BULK_GROUP_BUDGET_MS, aggregate_stream, settle_stream
+from services.debt_simplifier import SETTLE_BUDGET_MS
+from services.group_ledger import CURRENT_USER, DEFAULT_GROUP, GroupLedger, ledgers
 
 router = APIRouter(prefix="/api/campuspay", tags=["CampusPay"])
 
-# ── Mock data (would come from DB in production) ──────────
-_DEBTS = [
-    {"name": "Rahul", "amount": 120, "direction": "owes_you"},
-    {"name": "Priya", "amount": 30, "direction": "you_owe"},
-    {"name": "Amit", "amount": 85, "direction": "owes_you"},
-    {"name": "Neha", "amount": 45, "direction": "you_owe"},
-]
+MAX_SETTLE_BUDGET_MS = 2000
+
+_Mode = Query("exact", pattern="^(exact|greedy)$")
+_Budget = Query(SETTLE_BUDGET_MS, gt=0, le=MAX_SETTLE_BUDGET_MS)
+
+
+async def _write(record, *args):
+    """Run a ledger write off the event loop; it returns once the event is committed."""
+    try:
+        return await asyncio.to_thread(record, *args)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Ledger write failed, nothing was recorded: {e}")
+
+
+async def _ledger_response(ledger: GroupLedger, mode: str = "exact",
+                           budget_ms: float = SETTLE_BUDGET_MS) -> GroupLedgerResponse:
+    # The exact solver may use its whole budget: keep it off the event loop
+    settlements, optimal = await asyncio.to_thread(ledger.settlements, mode, budget_ms)
+    return GroupLedgerResponse(
+        group=ledger.name,
+        version=ledger.version,
+        balances=[MemberBalance(name=name, balance=balance) for name, balance in ledger.balances.items()],
+        settlements=settlements,
+        mode=mode,
+        optimal=optimal,
+    )
 
 
 @router.get("/balance", response_model=MessBalance)
@@ -39,27 +67,90 @@ async def get_today_spending():
 
 
 @router.get("/debts", response_model=DebtResponse)
-async def get_debts():
-    """Return debts with debt simplification applied."""
-    result = simplify_debts(_DEBTS)
+async def get_debts(group: str = DEFAULT_GROUP, member: str = CURRENT_USER,
+                    mode: str = _Mode, budget_ms: float = _Budget):
+    """
+    Return a member's debts and the group's simplified settlement. "exact"
+    finds the fewest payments within `budget_ms` (`optimal` says whether it
+    was proven); "greedy" is the largest-with-largest heuristic.
+    """
+    result = await asyncio.to_thread(ledgers.get(group).summary, member, mode, budget_ms)
     return DebtResponse(
         debts=[Debt(**d) for d in result["debts"]],
         original_count=result["original_count"],
         simplified_count=result["simplified_count"],
         simplified_transactions=result["simplified_transactions"],
         message=result["message"],
+        mode=result["mode"],
+        optimal=result["optimal"],
     )
 
 
 @router.post("/settle")
-async def settle_debt(name: str):
-    """Settle a debt with a friend (mock endpoint)."""
+async def settle_debt(name: str, group: str = DEFAULT_GROUP):
+    """Settle what you and a friend owe each other (recorded as a UPI payment)."""
+    amount = await _write(lambda: ledgers.get(group).settle_pair(CURRENT_USER, name))
+    return {
+        "message": f"₹{amount} settled with {name} via UPI! ✅",
+        "upi_link": f"upi://pay?pa={name.lower()}@paytm&pn={name}&am={amount}&cu=INR",
+        "amount": amount,
+    }
+
+
+@router.get("/groups/{group}", response_model=GroupLedgerResponse)
+async def get_group(group: str, mode: str = _Mode, budget_ms: float = _Budget):
+    """Net balances and settlement suggestions for a group."""
+    return await _ledger_response(ledgers.get(group), mode, budget_ms)
+
+
+@router.post("/groups/{group}/expenses", response_model=GroupLedgerResponse)
+async def add_expense(group: str, req: ExpenseRequest):
+    """Record a shared expense (equal split unless `shares` is given)."""
+    ledger = ledgers.get(group)
+    try:
+        await _write(ledger.record_expense, req.payer, req.amount, req.participants, req.shares)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _ledger_response(ledger)
+
+
+@router.post("/groups/{group}/payments", response_model=GroupLedgerResponse)
+async def add_payment(group: str, req: PaymentRequest):
+    """Record a payment between two members."""
+    ledger = ledgers.get(group)
+    await _write(ledger.record_payment, req.payer, req.payee, req.amount)
+    return await _ledger_response(ledger)
+
+
+@router.get("/ledger/stats")
+async def ledger_stats():
+    """Event log counters (events, snapshots, write batches) and known groups."""
     return {
-        "message": f"₹ settled with {name} via UPI! ✅",
-        "upi_link": f"upi://pay?pa={name.lower()}@paytm&pn={name}&cu=INR",
+        "groups": ledgers.names(),
+        "log": ledgers.log.info() if ledgers.log is not None else None,
     }
 
 
+@router.post("/settle/bulk")
+async def settle_bulk(request: Request, format: str = Query("csv", pattern="^(csv|ndjson)$"),
+                      mode: str = _Mode,
+                      budget_ms: float = Query(BULK_GROUP_BUDGET_MS, gt=0, le=MAX_SETTLE_BUDGET_MS)):
+    """
+    Semester-end settlement of every group in an expense export. POST the raw
+    CSV (header: group,payer,amount,participants with ";"-separated
+    participants) or NDJSON; payments stream back as NDJSON, then a summary
+    line. `budget_ms` is the exact solver's budget per group.
+    """
+    try:
+        aggregator = await aggregate_stream(request.stream(), format)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        settle_stream(aggregator, exact=mode == "exact", budget_ms=budget_ms),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.get("/categories", response_model=list[SpendingCategory])
 async def get_spending_categories():
     """Return spending breakdown by category."""
@@ -1,16 +1,30 @@
 """Concession API — railway student concession calculator."""
-from fastapi import APIRouter
+from typing import Optional
 
-from models import ConcessionRequest, ConcessionResult, StationsResponse
-from services.concession_engine import calculate_concession, STATIONS
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from models import (
+    BonafideRequest, ConcessionRequest, ConcessionResult, ConcessionQuote, FareRates, StationsResponse,
+)
+from services.bonafide import MAX_ROSTER, bonafide_issuer, certificate_fields
+from services.concession_engine import RATES, calculate_concession, calculate_concessions, current_rates, STATIONS
+from services.station_search import get_index
 
 router = APIRouter(prefix="/api/concession", tags=["Concession"])
 
 
 @router.get("/stations", response_model=StationsResponse)
-async def get_stations():
-    """Return list of available railway stations."""
-    return StationsResponse(stations=STATIONS)
+async def get_stations(q: Optional[str] = None, limit: int = 10):
+    """
+    Return available railway stations.
+    With `q`, autocomplete: best `limit` matches by code, prefix of a
+    name/alias, or fuzzy (typo-tolerant) name match.
+    """
+    if q is None:
+        return StationsResponse(stations=STATIONS)
+    matches = get_index().search(q, limit)
+    return StationsResponse(stations=[match["name"] for match in matches], matches=matches)
 
 
 @router.post("/calculate", response_model=ConcessionResult)
@@ -25,29 +39,79 @@ async def calculate(req: ConcessionRequest):
     return ConcessionResult(**result)
 
 
+@router.post("/calculate/batch", response_model=list[ConcessionQuote])
+async def calculate_batch(rows: list[ConcessionRequest]):
+    """Calculate concession fares for many origin–destination pairs at once."""
+    return calculate_concessions([row.model_dump() for row in rows])
+
+
+@router.get("/rates", response_model=FareRates)
+async def get_rates():
+    """Fare and concession rates currently in force."""
+    return current_rates().info()
+
+
+@router.post("/rates/reload", response_model=FareRates)
+async def reload_rates():
+    """
+    Re-read data/rail/rates.json and swap in freshly precomputed fare tables.
+    In-flight requests finish on the old rates; invalid files are rejected
+    and the current rates stay live.
+    """
+    try:
+        snapshot = await RATES.reload_async()
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Rates not reloaded: {e}")
+    return snapshot.info()
+
+
 @router.post("/bonafide")
-async def generate_bonafide(req: ConcessionRequest):
-    """Generate digital bonafide certificate data (PDF generation stub)."""
-    concession = calculate_concession(
-        req.from_station, req.to_station,
-        req.travel_class, req.category,
-    )
+async def generate_bonafide(req: BonafideRequest):
+    """
+    Issue a digital bonafide certificate. The PDF is rendered off the event
+    loop and cached by content; download it from `pdf_url`.
+    """
+    certificate_id, certificate = certificate_fields(req.model_dump())
+    await bonafide_issuer.pdf(certificate_id, certificate)
 
     return {
-        "certificate": {
-            "student_name": "Saksham Yason",
-            "college": "Indian Institute of Technology, Lucknow",
-            "enrollment_no": "2023BCS1042",
-            "course": "B.Tech Computer Science",
-            "year": "3rd Year",
-            "from_station": req.from_station,
-            "to_station": req.to_station,
-            "travel_class": req.travel_class,
-            "concession_type": req.category,
-            "concession_fare": concession["concession_fare"],
-            "valid_until": "2026-06-30",
-            "verified_via": "DigiLocker + ABC (Academic Bank of Credits)",
-            "verification_id": "DL-2026-STU-48291",
-        },
+        "certificate": certificate,
+        "certificate_id": certificate_id,
+        "pdf_url": f"/api/concession/bonafide/{certificate_id}.pdf",
         "message": "Digital bonafide certificate generated successfully!",
     }
+
+
+@router.get("/bonafide/{certificate_id}.pdf")
+async def download_bonafide(certificate_id: str, request: Request):
+    """Download an issued certificate (immutable: the id is its content hash)."""
+    etag = f'"{certificate_id}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    pdf = await bonafide_issuer.cached(certificate_id)
+    if pdf is None:
+        raise HTTPException(status_code=404, detail="Certificate not found — generate it first")
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={
+            "ETag": etag,
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Content-Disposition": f'inline; filename="bonafide-{certificate_id[:8]}.pdf"',
+        },
+    )
+
+
+@router.post("/bonafide/bulk")
+async def generate_bonafide_bulk(roster: list[BonafideRequest]):
+    """
+    Certificates for a whole roster as one ZIP, streamed while PDFs finish
+    (already-issued certificates come straight from the cache).
+    """
+    if len(roster) > MAX_ROSTER:
+        raise HTTPException(status_code=413, detail=f"Roster too large (max {MAX_ROSTER} students)")
+    return StreamingResponse(
+        bonafide_issuer.bulk_zip([student.model_dump() for student in roster]),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="bonafide-certificates.zip"'},
+    )
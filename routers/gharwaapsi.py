@@ -1,22 +1,75 @@
 """GharWaapsi API — smart home route with concession, hostelmates, tatkal."""
-from fastapi import APIRouter
+import asyncio
+
+from fastapi import APIRouter, Query
 
 from models import (
-    RouteRequest, RouteResponse, Hostelmate,
-    TatkalInfo, PapaPayRequest, PapaPayResponse,
+    RouteRequest, RouteResponse, BulkRouteRequest, BulkRouteResponse, BoardingPoint,
+    Hostelmate, TatkalInfo, PapaPayRequest, PapaPayResponse,
 )
-from services.route_planner import calculate_route
+from services.route_trees import plan_route, plan_routes, route_trees
+from services.timetable import get_timetable
 
 router = APIRouter(prefix="/api/gharwaapsi", tags=["GharWaapsi"])
 
 
 @router.post("/route", response_model=RouteResponse)
 async def get_route(req: RouteRequest):
-    """Calculate optimal multi-modal home route with student concession."""
-    result = calculate_route(req.from_city, req.to_city)
+    """
+    Home journeys from the timetable (trains, buses, campus shuttle) leaving
+    after `depart_after`, with student concession. The top-level fields are the
+    best option; `alternatives` holds up to `max_options` Pareto-optimal
+    journeys trading off fare, arrival time and changes. Departures are
+    rounded up to the route-tree window and served from the shared tree.
+    With `origin` / `home` coordinates the trip is door to door: first and
+    last miles run to the nearest stations and bus stands by real distance.
+    """
+    origin = (req.origin.lat, req.origin.lon) if req.origin else None
+    home = (req.home.lat, req.home.lon) if req.home else None
+    # A cold tree or a door-to-door search takes a while: keep it off the event loop
+    result = await asyncio.to_thread(
+        plan_route, req.from_city, req.to_city, req.category,
+        depart_after=req.depart_after, k=req.max_options, origin=origin, home=home,
+    )
     return RouteResponse(**result)
 
 
+@router.post("/routes/bulk", response_model=BulkRouteResponse)
+async def get_routes_bulk(req: BulkRouteRequest):
+    """
+    Routes from one origin to many hometowns (all of them if `to_cities` is
+    empty), computed from a single one-to-many search and cached per
+    departure window.
+    """
+    result = await asyncio.to_thread(
+        plan_routes, req.from_city, req.to_cities or None, req.category,
+        depart_after=req.depart_after, k=req.max_options,
+    )
+    return BulkRouteResponse(**result)
+
+
+@router.get("/stops/nearest", response_model=list[BoardingPoint])
+async def nearest_stops(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    k: int = Query(5, ge=1, le=20),
+    max_km: float | None = Query(None, gt=0),
+):
+    """The k stations / bus stands nearest a coordinate, nearest first."""
+    tt = get_timetable()
+    return [
+        BoardingPoint(**{key: tt.stops[stop][key] for key in ("id", "name", "city", "kind", "lat", "lon")},
+                      km=round(km, 2))
+        for km, stop in tt.nearest_stops(lat, lon, k, max_km)
+    ]
+
+
+@router.get("/routes/stats")
+async def route_tree_stats():
+    """Route-tree cache counters (hits, builds, evictions, warm-ups)."""
+    return route_trees.info()
+
+
 @router.get("/hostelmates", response_model=list[Hostelmate])
 async def get_hostelmates():
     """Return hostelmates traveling on the same route."""
@@ -1,11 +1,26 @@
 """Yatra API — AI trip planner with chat and trip plans."""
-from fastapi import APIRouter
+import json
+from contextlib import aclosing
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from models import (
-    ChatRequest, ChatResponse, TripPlan,
+    ChatRequest, ChatResponse, TripPlan, Itinerary, TripCost,
     TransportOption, StayOption, Activity, GroupMember,
 )
-from services.ai_chat import get_ai_response
+from services.ai_chat import (
+    LLM_HEDGED, get_ai_response, stream_ai_response, provider_health,
+)
+from services import intent_router
+from services.chat_sessions import session_store
+from services.cost_engine import estimate_costs
+from services.llm_scheduler import scheduler
+from services.plan_store import PLAN_MAX_MEMBERS, plan_store
+from services.response_cache import response_cache
+from services.trip_parser import TripPlanParser
 
 router = APIRouter(prefix="/api/yatra", tags=["Yatra"])
 
@@ -13,8 +28,95 @@ router = APIRouter(prefix="/api/yatra", tags=["Yatra"])
 @router.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
     """AI-powered trip planning chat endpoint."""
-    reply, trip_generated = await get_ai_response(req.message, req.history)
-    return ChatResponse(reply=reply, trip_generated=trip_generated)
+    session = session_store.get_or_create(req.conversation_id, req.history)
+    reply, trip_generated = await get_ai_response(
+        req.message, session.window(), req.student_id or session.id,
+    )
+    session_store.record_turn(session, req.message, reply)
+    plan = TripPlanParser.from_text(reply).plan()
+    return ChatResponse(
+        reply=reply,
+        trip_generated=trip_generated,
+        conversation_id=session.id,
+        plan=TripPlan(**plan) if plan else None,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent-Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+    Emits `delta` events with reply text as it arrives, `plan` events
+    with each transport/stay/activity card as soon as its line completes
+    (`index` is its position; a card re-sent with `update: true` replaces
+    the earlier one, e.g. once its section's fare is known), then one `done` event carrying `trip_generated`, the parsed `plan`
+    and `conversation_id`. Stops the upstream call if the client
+    disconnects.
+    """
+    session = session_store.get_or_create(req.conversation_id, req.history)
+    history = session.window()
+
+    async def events():
+        parts: list[str] = []
+        parser = TripPlanParser()
+        stream = stream_ai_response(req.message, history, req.student_id or session.id)
+        async with aclosing(stream) as deltas:
+            async for delta in deltas:
+                if await request.is_disconnected():
+                    return
+                parts.append(delta)
+                yield _sse("delta", {"text": delta})
+                for update in parser.feed(delta):
+                    yield _sse("plan", update)
+
+        for update in parser.close():
+            yield _sse("plan", update)
+
+        session_store.record_turn(session, req.message, "".join(parts))
+        yield _sse("done", {
+            "trip_generated": parser.trip_generated,
+            "plan": parser.plan(),
+            "conversation_id": session.id,
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/costs", response_model=list[TripCost])
+async def get_trip_costs(itineraries: list[Itinerary]):
+    """Exact per-person and group costs for a batch of itineraries."""
+    return estimate_costs([itinerary.model_dump() for itinerary in itineraries])
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Return CampusGPT response cache hit/miss and local-answer counters."""
+    return {**response_cache.snapshot(), "local_intents": intent_router.snapshot()}
+
+
+@router.get("/plans/stats")
+async def get_plan_stats():
+    """Return precomputed trip-plan store counters."""
+    return plan_store.snapshot()
+
+
+@router.get("/providers")
+async def get_provider_health():
+    """Return breaker state, latency and rate-limit budget per LLM provider."""
+    return {
+        "hedged": LLM_HEDGED,
+        "providers": provider_health(),
+        "scheduler": scheduler.snapshot(),
+    }
 
 
 @router.get("/chips")
@@ -24,8 +126,23 @@ async def get_chips():
 
 
 @router.get("/plan", response_model=TripPlan)
-async def get_trip_plan():
-    """Return a sample generated trip plan (Rishikesh demo)."""
+async def get_trip_plan(
+    destination: Optional[str] = None,
+    members: int = Query(5, ge=1, le=PLAN_MAX_MEMBERS),
+    origin: Optional[str] = None,
+):
+    """
+    Return a precomputed trip plan for a destination and group size.
+    Only the configured origins are generated; any other `origin` gets the
+    nearest stored plan. Without `destination`, returns the sample Rishikesh
+    demo plan.
+    """
+    if destination:
+        plan = await plan_store.get(destination, members, origin)
+        if plan is None:
+            raise HTTPException(status_code=404, detail=f"No plan available for '{destination}'")
+        return plan
+
     return TripPlan(
         destination="Rishikesh, Uttarakhand",
         region="Uttarakhand",
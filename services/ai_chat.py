@@ -1,16 +1,41 @@
 """AI Chat Service — Groq (Llama 3.3 70B) powered trip planning assistant."""
 from __future__ import annotations
 
+import asyncio
+import json
 import os
-import httpx
+import time
+from contextlib import aclosing, suppress
+from typing import AsyncIterator
+
 from dotenv import load_dotenv
 
+from services import cost_engine, intent_router, knowledge_base
+from services.chat_sessions import estimate_tokens
+from services.circuit_breaker import CircuitBreaker
+from services.llm_scheduler import AdmissionRejected, MAX_QUEUE_WAIT_SECONDS, scheduler
+from services.response_cache import response_cache
+from services.trip_parser import TripPlanParser
+from services.upstream import get_http_client, get_anthropic_client
+
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 # Keep Anthropic as optional fallback
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 
+# Hedged mode: if Groq has no first token within the budget, race Claude
+LLM_HEDGED = os.getenv("LLM_HEDGED", "0") == "1"
+# Fixed hedge budget in seconds; empty = Groq's observed p95 first-token latency
+LLM_HEDGE_AFTER = os.getenv("LLM_HEDGE_AFTER", "")
+HEDGE_DEFAULT_SECONDS = 3.0
+HEDGE_MIN_SECONDS = 0.5
+HEDGE_MAX_SECONDS = 10.0
+
+# Shed load: answer first-turn "<destination> plan" messages from the
+# offline guide index instead of the LLM
+LLM_SHED_TO_KB = os.getenv("LLM_SHED_TO_KB", "0") == "1"
+
 SYSTEM_PROMPT = """You are CampusGPT, the ULTIMATE AI travel planner for Indian college students, built into Paytm Campus OS.
 
 PERSONALITY:
@@ -81,7 +106,7 @@ Day 2:
 • Best train/bus for return
 • Tips for last-day packing and checkout
 
-💰 STEP 9: COMPLETE COST TABLE
+💰 STEP 9: COMPLETE COST TABLE (skip if the app says it adds the table)
 List EVERY expense:
 • Transport (going): ₹XXX
 • Local transport (both ways): ₹XXX
@@ -115,37 +140,328 @@ CRITICAL RULES:
 """
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-
-
-async def get_ai_response(message: str, history: list[dict]) -> tuple[str, bool]:
+GROQ_MODEL = "llama-3.3-70b-versatile"
+CLAUDE_MODEL = "claude-3-haiku-20240307"
+MAX_TOKENS = {"Groq": 2048, "Claude": 1024}
+# When the cost engine supplies STEP 9, the model only narrates the rest
+NARRATE_MAX_TOKENS = {"Groq": 1536, "Claude": 768}
+COST_TABLE_NOTE = (
+    "[Note: the app appends the exact STEP 9 cost table (per person, group total, "
+    "UPI split) itself. Skip STEP 9 and do not quote totals.]"
+)
+SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+class ProviderUnavailable(Exception):
+    """Raised when no LLM provider could answer."""
+
+
+async def get_ai_response(
+    message: str,
+    history: list[dict],
+    student_id: str = "anonymous",
+) -> tuple[str, bool]:
     """
     Get AI response for trip planning chat.
-    Priority: Groq (free) -> Anthropic (paid) -> Fallback.
+    Priority: Local fare/route answer -> Cache -> Groq (free) ->
+    Anthropic (paid) -> Fallback.
     Returns (reply_text, trip_generated_flag).
     """
-    # Try Groq first (free tier)
-    if GROQ_API_KEY:
+    # A route answer may build a route tree: off the event loop
+    local = await asyncio.to_thread(intent_router.answer, message)
+    if local is not None:
+        return local
+
+    if LLM_SHED_TO_KB and not history:
+        answer = knowledge_base.destination_answer(message)
+        if answer is not None:
+            return answer
+
+    response = await get_llm_response(message, history, student_id)
+    if response is None:
+        # Final fallback (never cached, so providers are retried next turn)
+        return _fallback_response(message)
+    return response
+
+
+async def get_llm_response(
+    message: str,
+    history: list[dict],
+    student_id: str = "anonymous",
+) -> tuple[str, bool] | None:
+    """Cached LLM answer, or None if no provider could answer (no fallback)."""
+    table = _cost_table(message)
+
+    def compute():
+        if table is None:
+            return _provider_response(message, history, student_id)
+        return _narrated_response(message, history, student_id, table)
+
+    try:
+        return await response_cache.get_or_compute(message, history, compute)
+    except ProviderUnavailable:
+        return None
+
+
+def _cost_table(message: str) -> str | None:
+    """Deterministic STEP 9 block if the message names a known route."""
+    itinerary = cost_engine.itinerary_from_text(message)
+    if itinerary is None:
+        return None
+    return cost_engine.cost_table(cost_engine.estimate_cost(itinerary), itinerary["nights"])
+
+
+async def _narrated_response(message: str, history: list[dict], student_id: str,
+                             table: str) -> tuple[str, bool]:
+    """LLM narrates the plan; the cost engine's table is appended."""
+    reply, _ = await _provider_response(
+        f"{message}\n\n{COST_TABLE_NOTE}", history, student_id, NARRATE_MAX_TOKENS,
+    )
+    reply = f"{reply.rstrip()}\n\n{table}"
+    return reply, is_trip_reply(reply)
+
+
+async def _provider_response(message: str, history: list[dict], student_id: str,
+                             limits: dict[str, int] = MAX_TOKENS) -> tuple[str, bool]:
+    """Ask the LLM providers in priority order, skipping open circuits."""
+    if LLM_HEDGED:
+        name, first, rest = await _open_stream(message, history, student_id, limits)
         try:
-            return await _groq_response(message, history)
+            async with aclosing(rest) as deltas:
+                parts = [first] + [delta async for delta in deltas]
         except Exception as e:
-            print(f"[CampusGPT] Groq API error: {e}")
-
-    # Try Anthropic as fallback
-    if ANTHROPIC_API_KEY:
+            # Breaker already saw it (_tracked_stream); a cut-off reply
+            # must not be cached, so fall back like any failed provider
+            print(f"[CampusGPT] {name} stream error: {e}")
+            raise ProviderUnavailable(f"{name} stream failed mid-reply") from e
+        reply = "".join(parts)
+        return reply, is_trip_reply(reply)
+
+    for name, call, _ in _providers():
+        breaker = BREAKERS[name]
+        if not breaker.allow():
+            continue
+        if not await _admit(name, message, history, student_id, limits=limits):
+            continue
+        started = time.monotonic()
         try:
-            return await _claude_response(message, history)
+            result = await call(message, history, limits[name])
         except Exception as e:
-            print(f"[CampusGPT] Claude API error: {e}")
-
-    # Final fallback
-    return _fallback_response(message)
-
+            breaker.record_failure(time.monotonic() - started)
+            print(f"[CampusGPT] {name} API error: {e}")
+        else:
+            # Whole-reply time: counts toward slow calls but not the
+            # first-token p95 that sizes the hedge budget
+            breaker.record_success(time.monotonic() - started, sample=False)
+            return result
+
+    raise ProviderUnavailable("no LLM provider available")
+
+
+async def stream_ai_response(
+    message: str,
+    history: list[dict],
+    student_id: str = "anonymous",
+) -> AsyncIterator[str]:
+    """
+    Stream the AI reply as text deltas, same priority as get_ai_response.
+    A provider that fails before its first delta falls through to the next;
+    once text has been sent the stream just ends on error.
+    Closing the generator (client disconnect) closes the upstream request.
+    """
+    # A route answer may build a route tree: off the event loop
+    local = await asyncio.to_thread(intent_router.answer, message)
+    if local is not None:
+        yield local[0]
+        return
+
+    if LLM_SHED_TO_KB and not history:
+        answer = knowledge_base.destination_answer(message)
+        if answer is not None:
+            # Line by line, so plan cards still arrive as the guide streams
+            for line in answer[0].splitlines(keepends=True):
+                yield line
+            return
+
+    cached = response_cache.lookup(message, history)
+    if cached is not None:
+        yield cached[0]
+        return
+
+    table = _cost_table(message)
+    prompt, limits = message, MAX_TOKENS
+    if table is not None:
+        prompt, limits = f"{message}\n\n{COST_TABLE_NOTE}", NARRATE_MAX_TOKENS
+
+    try:
+        name, first, rest = await _open_stream(prompt, history, student_id, limits)
+    except ProviderUnavailable:
+        # Final fallback — canned reply as a single delta
+        reply, _ = _fallback_response(message)
+        yield reply
+        return
+
+    parts = [first]
+    yield first
+    try:
+        async with aclosing(rest) as deltas:
+            async for delta in deltas:
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        print(f"[CampusGPT] {name} stream error: {e}")
+        return
+
+    if table is not None:
+        tail = f"\n\n{table}"
+        parts.append(tail)
+        yield tail
+
+    reply = "".join(parts)
+    response_cache.store(message, history, (reply, is_trip_reply(reply)))
+
+
+# ── Provider health: circuit breakers + hedging ───────────
+BREAKERS = {
+    "Groq": CircuitBreaker("Groq"),
+    "Claude": CircuitBreaker("Claude"),
+}
+
+
+def provider_health() -> list[dict]:
+    """Breaker state and latency for every provider."""
+    return [breaker.snapshot() for breaker in BREAKERS.values()]
+
+
+def _estimate_request_tokens(name: str, message: str, history: list[dict],
+                             limits: dict[str, int] = MAX_TOKENS) -> int:
+    """Upper-bound token cost: system prompt + history + message + max_tokens."""
+    prompt = SYSTEM_PROMPT_TOKENS + estimate_tokens(message)
+    prompt += sum(estimate_tokens(msg.get("text", "")) for msg in history)
+    return prompt + limits[name]
+
+
+async def _admit(name: str, message: str, history: list[dict], student_id: str,
+                 max_wait: float = MAX_QUEUE_WAIT_SECONDS,
+                 limits: dict[str, int] = MAX_TOKENS) -> bool:
+    """Ask the scheduler for rate-limit budget; False = skip this provider."""
+    try:
+        await scheduler.acquire(
+            name, student_id, _estimate_request_tokens(name, message, history, limits), max_wait,
+        )
+    except AdmissionRejected as e:
+        print(f"[CampusGPT] {e}")
+        return False
+    return True
 
-async def _groq_response(message: str, history: list[dict]) -> tuple[str, bool]:
-    """Call Groq API (OpenAI-compatible) for response using Llama 3.3 70B."""
 
-    # Build conversation messages
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+def _providers() -> list[tuple]:
+    """Configured providers in priority order: (name, call, stream)."""
+    providers = []
+    if GROQ_API_KEY:
+        providers.append(("Groq", _groq_response, _groq_stream))
+    if ANTHROPIC_API_KEY:
+        providers.append(("Claude", _claude_response, _claude_stream))
+    return providers
+
+
+def _hedge_delay() -> float:
+    """Seconds to wait for Groq's first token before racing Claude."""
+    if LLM_HEDGE_AFTER:
+        return float(LLM_HEDGE_AFTER)
+    p95 = BREAKERS["Groq"].latency_p95()
+    if p95 is None:
+        return HEDGE_DEFAULT_SECONDS
+    return min(HEDGE_MAX_SECONDS, max(HEDGE_MIN_SECONDS, p95))
+
+
+async def _tracked_stream(name: str, stream, message: str, history: list[dict],
+                          max_tokens: int) -> AsyncIterator[str]:
+    """Wrap a provider stream, reporting first-token latency to its breaker."""
+    breaker = BREAKERS[name]
+    started = time.monotonic()
+    first_token_at = None
+    try:
+        async with aclosing(stream(message, history, max_tokens)) as deltas:
+            async for delta in deltas:
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                yield delta
+    except Exception:
+        breaker.record_failure(time.monotonic() - started)
+        raise
+    breaker.record_success((first_token_at or time.monotonic()) - started)
+
+
+async def _open_stream(message: str, history: list[dict], student_id: str,
+                       limits: dict[str, int] = MAX_TOKENS) -> tuple[str, str, AsyncIterator[str]]:
+    """
+    Start provider streams until one yields its first delta.
+    Returns (provider_name, first_delta, remaining_stream).
+    In hedged mode the next provider is started alongside a slow one and
+    whichever produces a token first wins; the loser is cancelled.
+    A hedge only starts if its provider has rate-limit budget right now.
+    """
+    queue = [(name, stream) for name, _, stream in _providers()]
+    pending: dict[asyncio.Task, tuple[str, AsyncIterator[str], float]] = {}
+    hedged_from = None
+
+    async def start_next(max_wait: float) -> bool:
+        while queue:
+            name, stream = queue.pop(0)
+            if not BREAKERS[name].allow():
+                continue
+            if not await _admit(name, message, history, student_id, max_wait, limits):
+                continue
+            gen = _tracked_stream(name, stream, message, history, limits[name])
+            task = asyncio.ensure_future(anext(gen))
+            pending[task] = (name, gen, time.monotonic())
+            return True
+        return False
+
+    try:
+        while pending or await start_next(MAX_QUEUE_WAIT_SECONDS):
+            can_hedge = LLM_HEDGED and queue and len(pending) == 1
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=_hedge_delay() if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                hedged_from = next(iter(pending.values()))[0]
+                await start_next(0)
+                continue
+
+            for task in done:
+                name, gen, _ = pending.pop(task)
+                try:
+                    first = task.result()
+                except StopAsyncIteration:
+                    first = ""
+                except Exception as e:
+                    print(f"[CampusGPT] {name} stream error: {e}")
+                    continue
+                return name, first, gen
+
+        raise ProviderUnavailable("no LLM provider available")
+    finally:
+        # Cancel losers / stragglers and close their upstream requests
+        for task, (name, gen, started) in pending.items():
+            task.cancel()
+            with suppress(BaseException):
+                await task
+            await gen.aclose()
+            if name == hedged_from:
+                BREAKERS[name].record_slow(time.monotonic() - started)
+
+
+def is_trip_reply(reply: str) -> bool:
+    """Whether a reply contains a structured trip plan (transport/stay/cost)."""
+    return TripPlanParser.from_text(reply).trip_generated
+
+
+def _build_messages(message: str, history: list[dict]) -> list[dict]:
+    """Turn chat history + new message into alternating user/assistant turns."""
+    messages: list[dict] = []
 
     for msg in history:
         role = "user" if msg.get("role") == "user" else "assistant"
@@ -163,132 +479,125 @@ async def _groq_response(message: str, history: list[dict]) -> tuple[str, bool]:
     else:
         messages.append({"role": "user", "content": message})
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        response = await client.post(
-            GROQ_API_URL,
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": messages,
-                "max_tokens": 2048,
-                "temperature": 0.7,
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
+    return messages
 
-    reply = data["choices"][0]["message"]["content"]
-    trip_generated = any(
-        kw in reply.lower()
-        for kw in ["plan ready", "itinerary", "budget", "₹", "total cost",
-                    "per person", "transport", "stay", "hotel", "hostel", "train"]
-    )
 
-    return reply, trip_generated
+def _groq_payload(message: str, history: list[dict], max_tokens: int, stream: bool = False) -> dict:
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages += _build_messages(message, history)
+    return {
+        "model": GROQ_MODEL,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": 0.7,
+        "stream": stream,
+    }
 
 
-async def _claude_response(message: str, history: list[dict]) -> tuple[str, bool]:
-    """Call Anthropic Claude Haiku API for response (paid fallback)."""
-    import anthropic
+def _groq_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json",
+    }
 
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
-    messages = []
-    for msg in history:
-        role = "user" if msg.get("role") == "user" else "assistant"
-        text = msg.get("text", "")
-        if text.strip():
-            if messages and messages[-1]["role"] == role:
-                messages[-1]["content"] += "\n" + text
-            else:
-                messages.append({"role": role, "content": text})
+async def _groq_response(message: str, history: list[dict],
+                         max_tokens: int = MAX_TOKENS["Groq"]) -> tuple[str, bool]:
+    """Call Groq API (OpenAI-compatible) for response using Llama 3.3 70B."""
+    # Shared pooled client — reuses warm keep-alive connections
+    client = get_http_client()
+    response = await client.post(
+        GROQ_API_URL,
+        headers=_groq_headers(),
+        json=_groq_payload(message, history, max_tokens),
+    )
+    response.raise_for_status()
+    data = response.json()
 
-    if messages and messages[-1]["role"] == "user":
-        messages[-1]["content"] += "\n" + message
-    else:
-        messages.append({"role": "user", "content": message})
+    reply = data["choices"][0]["message"]["content"]
+    return reply, is_trip_reply(reply)
+
+
+async def _groq_stream(message: str, history: list[dict],
+                       max_tokens: int = MAX_TOKENS["Groq"]) -> AsyncIterator[str]:
+    """Stream Groq completion deltas (OpenAI-style SSE chunks)."""
+    client = get_http_client()
+    async with client.stream(
+        "POST",
+        GROQ_API_URL,
+        headers=_groq_headers(),
+        json=_groq_payload(message, history, max_tokens, stream=True),
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+
+def _claude_client():
+    client = get_anthropic_client()
+    if client is None:
+        raise RuntimeError("Anthropic client not configured")
+    return client
+
+
+async def _claude_response(message: str, history: list[dict],
+                           max_tokens: int = MAX_TOKENS["Claude"]) -> tuple[str, bool]:
+    """Call Anthropic Claude Haiku API for response (paid fallback)."""
+    client = _claude_client()
 
-    response = client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=1024,
+    response = await client.messages.create(
+        model=CLAUDE_MODEL,
+        max_tokens=max_tokens,
         system=SYSTEM_PROMPT,
-        messages=messages,
+        messages=_build_messages(message, history),
     )
 
     reply = response.content[0].text
-    trip_generated = any(
-        kw in reply.lower()
-        for kw in ["plan ready", "itinerary", "budget", "₹", "total cost",
-                    "per person", "transport", "stay"]
-    )
+    return reply, is_trip_reply(reply)
 
-    return reply, trip_generated
 
+async def _claude_stream(message: str, history: list[dict],
+                         max_tokens: int = MAX_TOKENS["Claude"]) -> AsyncIterator[str]:
+    """Stream Claude Haiku text deltas."""
+    client = _claude_client()
 
-def _fallback_response(message: str) -> tuple[str, bool]:
-    """Fallback when no AI API is available."""
-    msg_lower = message.lower()
+    async with client.messages.stream(
+        model=CLAUDE_MODEL,
+        max_tokens=max_tokens,
+        system=SYSTEM_PROMPT,
+        messages=_build_messages(message, history),
+    ) as stream:
+        async for delta in stream.text_stream:
+            yield delta
 
-    destinations = {
-        "rishikesh": (
-            "Rishikesh trip plan ready! 🏞️\n\n"
-            "📍 Rishikesh, Uttarakhand\n📅 Weekend trip best\n\n"
-            "🚂 Train: Delhi→Haridwar ₹380 (Sleeper)\n"
-            "🏨 Zostel: ₹500/night | Hostel: ₹400/night\n"
-            "🎯 Rafting: ₹500 | Beatles Ashram: ₹75 (student)\n"
-            "💰 Total: ~₹1,850-2,200/person\n\n"
-            "Paytm se book karo, cashback milega! 💙"
-        ),
-        "goa": (
-            "Goa plan ready! 🏖️\n\n📍 North Goa\n📅 3 Nights\n\n"
-            "🚂 Train→Madgaon: ₹800 | ✈️ Flight: ₹2,500+\n"
-            "🏨 Zostel: ₹600/night | Villa (5 share): ₹800/person\n"
-            "🏍 Scooty: ₹350/day | Dudhsagar: ₹800\n"
-            "💰 Total: ~₹3,500-4,500/person\n\n"
-            "Paytm se book karo, cashback milega! 💙"
-        ),
-        "manali": (
-            "Manali plan ready! ❄️\n\n📍 Old Manali\n📅 4 Nights\n\n"
-            "🚌 Volvo Delhi→Manali: ₹1,200\n"
-            "🏨 Hostel: ₹450/night | Camp: ₹1,000 (meals incl)\n"
-            "🏔 Paragliding: ₹1,500 | Rohtang: ₹800\n"
-            "💰 Total: ~₹2,800-3,500/person\n\n"
-            "Paytm se book karo, cashback milega! 💙"
-        ),
-        "udaipur": (
-            "Udaipur plan ready! 🏰\n\n📍 City of Lakes\n📅 2-3 Nights\n\n"
-            "🚂 Train: ₹500 (Sleeper), ₹250 (student 2S)\n"
-            "🏨 Zostel: ₹500/night (lake view!)\n"
-            "🎯 City Palace: ₹150 (student) | Boat: ₹400\n"
-            "💰 Total: ~₹2,000-2,800/person\n\n"
-            "Paytm se book karo, cashback milega! 💙"
-        ),
-        "jaipur": (
-            "Jaipur plan ready! 🏛️\n\n📍 Pink City\n📅 2 Nights\n\n"
-            "🚂 Train Delhi→Jaipur: ₹270 (Sleeper)\n"
-            "🏨 Moustache Hostel: ₹400/night\n"
-            "🎯 Amber Fort: ₹100 (student) | Composite ticket: ₹500\n"
-            "💰 Total: ~₹2,200-2,800/person\n\n"
-            "Paytm se book karo, cashback milega! 💙"
-        ),
-        "varanasi": (
-            "Varanasi plan ready! 🙏\n\n📍 Kashi\n📅 2 Nights\n\n"
-            "🚂 Train: ₹300-500 (Sleeper, student 50% off!)\n"
-            "🏨 Zostel: ₹400/night (ghat view!)\n"
-            "🎯 Ganga Aarti: FREE | Boat ride: ₹150\n"
-            "💰 Total: ~₹1,500-2,000/person\n\n"
-            "Paytm se book karo, cashback milega! 💙"
-        ),
-    }
 
-    for dest, reply in destinations.items():
-        if dest in msg_lower:
-            return reply, True
+def _fallback_response(message: str) -> tuple[str, bool]:
+    """Fallback when no AI API is available — served from the offline guide index."""
+    answer = knowledge_base.destination_answer(message)
+    if answer is not None:
+        return answer
 
+    msg_lower = message.lower()
     if any(kw in msg_lower for kw in ["trip", "plan", "travel", "ghum", "jana", "jao", "weekend"]):
+        matches = knowledge_base.suggestions(message)
+        if matches:
+            options = "\n".join(
+                f"📍 {guide['name']} — ₹{guide['price_per_person']:,}/person"
+                for guide in matches
+            )
+            return (
+                f"Badhiya! 🗺️ Ye options dekh:\n\n{options}\n\n"
+                "Destination bol, full plan bana deta hu! 🚀"
+            ), False
+
         return (
             "Badhiya! 🗺️ Popular student destinations:\n\n"
             "🏞 Rishikesh — ₹1,850/person\n🏰 Jaipur — ₹2,200/person\n"
@@ -0,0 +1,253 @@
+"""Bonafide Certificates — PDF issue off the event loop, cached by content.
+
+    • fields      certificate_fields() builds the certificate from a
+                  BonafideRequest (concession fare from the live fare rates)
+    • identity    the certificate id is a SHA-256 of the canonical fields, so
+                  the same certificate always has the same id, file and ETag
+    • cache       PDFs are kept as data/cache/bonafide/<id>.pdf (override with
+                  BONAFIDE_CACHE_DIR); a re-download is a file read (which
+                  refreshes the file's mtime), and concurrent requests for
+                  one certificate share one render. Past BONAFIDE_CACHE_MAX
+                  files the least recently used are deleted — checked at
+                  start-up and after every tenth of that many renders — and
+                  an evicted certificate is simply rendered again on re-issue
+    • rendering   bonafide_pdf.render_to_file in a spawned process pool
+                  (BONAFIDE_WORKERS), so PDF work never blocks the event loop;
+                  if a worker dies the broken pool is replaced and the render
+                  retried once
+    • bulk        bulk_zip() streams a ZIP for a whole roster, keeping at most
+                  BONAFIDE_BULK_WINDOW renders in flight and adding each PDF
+                  to the archive as it finishes — memory stays flat and bytes
+                  start flowing immediately
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from services.bonafide_pdf import render_to_file
+from services.concession_engine import current_rates
+
+CACHE_DIR = Path(os.getenv(
+    "BONAFIDE_CACHE_DIR",
+    Path(__file__).resolve().parent.parent / "data" / "cache" / "bonafide",
+))
+RENDER_WORKERS = int(os.getenv("BONAFIDE_WORKERS", str(min(4, os.cpu_count() or 1))))
+BULK_WINDOW = int(os.getenv("BONAFIDE_BULK_WINDOW", "32"))
+MAX_ROSTER = int(os.getenv("BONAFIDE_MAX_ROSTER", "20000"))
+CACHE_MAX = int(os.getenv("BONAFIDE_CACHE_MAX", "5000"))
+_PRUNE_EVERY = max(1, CACHE_MAX // 10)
+_STALE_TMP_SECONDS = 3600  # leftovers of a worker that died mid-write
+
+COLLEGE = "Indian Institute of Technology, Lucknow"
+VALID_UNTIL = "2026-06-30"
+VERIFIED_VIA = "DigiLocker + ABC (Academic Bank of Credits)"
+
+_CERTIFICATE_ID = re.compile(r"[0-9a-f]{32}")
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def certificate_fields(student: dict) -> tuple[str, dict]:
+    """(certificate id, certificate fields) for one student's journey."""
+    quote = current_rates().quote(
+        student["from_station"], student["to_station"],
+        student["travel_class"], student["category"],
+    )
+    fields = {
+        "student_name": student["student_name"],
+        "college": COLLEGE,
+        "enrollment_no": student["enrollment_no"],
+        "course": student["course"],
+        "year": student["year"],
+        "from_station": student["from_station"],
+        "to_station": student["to_station"],
+        "travel_class": student["travel_class"],
+        "concession_type": student["category"],
+        "concession_fare": quote["concession_fare"],
+        "valid_until": VALID_UNTIL,
+        "verified_via": VERIFIED_VIA,
+    }
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    certificate_id = hashlib.sha256(canonical).hexdigest()[:32]
+    fields["verification_id"] = f"DL-2026-STU-{certificate_id[:8].upper()}"
+    return certificate_id, fields
+
+
+class _ZipSink:
+    """Unseekable write target for ZipFile; drain() hands over what was written."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _read_and_touch(path: Path) -> bytes:
+    """Cached PDF bytes; bumps the mtime so pruning keeps recently used files."""
+    pdf = path.read_bytes()
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return pdf
+
+
+class BonafideIssuer:
+    """Content-addressed PDF cache in front of a rendering process pool."""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, workers: int = RENDER_WORKERS):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._renders: dict[str, asyncio.Future] = {}  # certificate id -> in-flight render
+        self._since_prune = 0
+        self._pruning: asyncio.Future | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._schedule_prune()
+            # spawn: workers only import bonafide_pdf, not the app
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def cached(self, certificate_id: str) -> bytes | None:
+        """The PDF for an issued certificate (None if unknown or evicted)."""
+        if not _CERTIFICATE_ID.fullmatch(certificate_id):
+            return None
+        render = self._renders.get(certificate_id)
+        if render is not None:
+            return await asyncio.shield(render)
+        try:
+            return await asyncio.to_thread(_read_and_touch, self.cache_dir / f"{certificate_id}.pdf")
+        except FileNotFoundError:
+            return None
+
+    async def pdf(self, certificate_id: str, fields: dict) -> bytes:
+        """Cached PDF, else rendered once in the pool (shared by concurrent callers)."""
+        pdf = await self.cached(certificate_id)
+        if pdf is not None:
+            return pdf
+        render = self._renders.get(certificate_id)  # may have started while we read
+        if render is None:
+            path = str(self.cache_dir / f"{certificate_id}.pdf")
+            render = asyncio.ensure_future(self._render(fields, path))
+            self._renders[certificate_id] = render
+            render.add_done_callback(lambda _: self._rendered(certificate_id))
+        return await asyncio.shield(render)
+
+    async def _render(self, fields: dict, path: str) -> bytes:
+        """Render in the pool; if a worker died (e.g. OOM-killed) the broken
+        pool is replaced and the render retried once."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._executor()
+            try:
+                return await loop.run_in_executor(pool, render_to_file, fields, path)
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                if self._pool is pool:  # concurrent renders replace it once
+                    print("[bonafide] render pool broke, starting a new one")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+
+    def _rendered(self, certificate_id: str) -> None:
+        self._renders.pop(certificate_id, None)
+        self._since_prune += 1
+        if self._since_prune >= _PRUNE_EVERY:
+            self._schedule_prune()
+
+    def _schedule_prune(self) -> None:
+        """Prune in a worker thread (at most one at a time)."""
+        if self._pruning is not None and not self._pruning.done():
+            return
+        self._since_prune = 0
+        self._pruning = asyncio.get_running_loop().run_in_executor(None, self.prune)
+
+    def prune(self, limit: int = CACHE_MAX) -> int:
+        """Delete the least recently used PDFs beyond `limit`; returns how many."""
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            try:
+                mtime = entry.stat().st_mtime
+                if entry.name.endswith(".tmp"):
+                    if now - mtime > _STALE_TMP_SECONDS:
+                        os.unlink(entry.path)
+                elif entry.name.endswith(".pdf"):
+                    files.append((mtime, entry.path))
+            except FileNotFoundError:
+                continue  # removed meanwhile
+        if len(files) <= limit:
+            return 0
+        files.sort()
+        removed = 0
+        for _, path in files[:len(files) - limit]:
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        print(f"[bonafide] pruned {removed} cached certificates (keeping {limit})")
+        return removed
+
+    async def bulk_zip(self, students: list[dict]) -> AsyncIterator[bytes]:
+        """ZIP archive of every student's certificate, yielded in chunks as PDFs finish."""
+
+        async def issue(number: int, student: dict) -> tuple[str, bytes]:
+            certificate_id, fields = certificate_fields(student)
+            name = f"{number:05d}_{_UNSAFE_NAME.sub('-', student['enrollment_no'])}.pdf"
+            return name, await self.pdf(certificate_id, fields)
+
+        sink = _ZipSink()
+        archive = zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED)
+        roster = enumerate(students, start=1)
+        pending: set[asyncio.Task] = set()
+        try:
+            while True:
+                for number, student in itertools.islice(roster, BULK_WINDOW - len(pending)):
+                    pending.add(asyncio.create_task(issue(number, student)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    archive.writestr(*task.result())
+                yield sink.drain()
+            archive.close()
+            yield sink.drain()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Shared process-wide issuer
+bonafide_issuer = BonafideIssuer()
@@ -0,0 +1,112 @@
+"""Bonafide PDF — renders one certificate to PDF bytes with the stdlib only.
+
+Runs inside the bonafide process pool, so this module imports nothing from
+the app (spawned workers start fast). The output is a single A4 page using
+the built-in Helvetica fonts, and is byte-for-byte deterministic (no
+timestamps): the same certificate fields always give the same file.
+"""
+from __future__ import annotations
+
+import os
+import textwrap
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 60
+WRAP = 88  # characters per body line at 11pt
+
+# Characters outside WinAnsi (the base-14 font encoding)
+_SUBSTITUTES = {"₹": "Rs. ", "→": "to", "—": "-", "–": "-", "‘": "'", "’": "'", "“": '"', "”": '"'}
+
+
+def _escape(text: str) -> str:
+    for char, replacement in _SUBSTITUTES.items():
+        text = text.replace(char, replacement)
+    text = text.encode("cp1252", errors="replace").decode("cp1252")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x: float, y: float, size: int, text: str, bold: bool = False) -> str:
+    font = "F2" if bold else "F1"
+    return f"BT /{font} {size} Tf {x} {y} Td ({_escape(text)}) Tj ET"
+
+
+def _page(fields: dict) -> str:
+    """Content stream for the certificate page."""
+    ops = [
+        "0.1 0.2 0.5 RG 2 w",
+        f"30 30 {PAGE_WIDTH - 60} {PAGE_HEIGHT - 60} re S",
+        _text(MARGIN, 760, 16, fields["college"], bold=True),
+        _text(MARGIN, 722, 20, "BONAFIDE CERTIFICATE", bold=True),
+        _text(MARGIN, 702, 11, "For Indian Railways student concession"),
+        f"{MARGIN} 690 m {PAGE_WIDTH - MARGIN} 690 l S",
+    ]
+
+    body = (
+        f"This is to certify that {fields['student_name']} (Enrollment No. "
+        f"{fields['enrollment_no']}) is a bonafide student of {fields['course']}, "
+        f"{fields['year']}, at {fields['college']}, and is eligible for railway "
+        f"concession under the {fields['concession_type']} category."
+    )
+    y = 660
+    for line in textwrap.wrap(body, WRAP):
+        ops.append(_text(MARGIN, y, 11, line))
+        y -= 16
+
+    y -= 20
+    rows = [
+        ("Journey", f"{fields['from_station']} to {fields['to_station']}"),
+        ("Travel class", fields["travel_class"]),
+        ("Concession category", fields["concession_type"]),
+        ("Concession fare", f"Rs. {fields['concession_fare']}"),
+        ("Valid until", fields["valid_until"]),
+        ("Verified via", fields["verified_via"]),
+        ("Verification ID", fields["verification_id"]),
+    ]
+    for label, value in rows:
+        ops.append(_text(MARGIN, y, 11, label, bold=True))
+        ops.append(_text(MARGIN + 150, y, 11, str(value)))
+        y -= 20
+
+    ops.append(_text(
+        MARGIN, 60, 9,
+        "Digitally issued certificate. Quote the Verification ID at the booking counter.",
+    ))
+    return "\n".join(ops)
+
+
+def render_pdf(fields: dict) -> bytes:
+    """One-page PDF for a certificate (see bonafide.certificate_fields)."""
+    content = _page(fields).encode("cp1252")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            "/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> /Contents 4 0 R >>"
+        ).encode(),
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def render_to_file(fields: dict, path: str) -> bytes:
+    """Render and store atomically at `path` (pool entry point); returns the PDF."""
+    pdf = render_pdf(fields)
+    tmp = f"{path}.{os.getpid()}.tmp"  # unique per worker process
+    with open(tmp, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp, path)
+    return pdf
@@ -0,0 +1,313 @@
+"""Bulk Settlement — semester-end settlement of every group in a hostel.
+
+Millions of expense rows (mess, trips, fests) stream in as CSV or NDJSON and
+settlements stream out, with memory bounded by the number of people rather
+than the number of rows:
+
+    • parse      rows arrive in chunks of BULK_CHUNK_ROWS and are turned into
+                 columns; CSV (C csv.reader) needs a header with group,
+                 payer, amount and participants (";"-separated), NDJSON lines
+                 carry the same keys (participants as a list). Malformed rows
+                 are counted and skipped
+    • ids        group and person names map to dense integer ids through a
+                 dict lookup run by map(), never a Python loop per row
+    • balances   each chunk becomes flat NumPy arrays (payer / amount,
+                 participant / share, equal split in paise with the remainder
+                 on the first participants) keyed by group << 32 | person,
+                 reduced into the running sorted (key, int64 sum) arrays with
+                 np.unique + np.add.at — no per-expense Python math
+    • settle     keys are sorted by group, so groups are cut into batches of
+                 about BULK_BATCH_MEMBERS people and settled by
+                 debt_simplifier.settle_batch in a spawned process pool
+                 (BULK_WORKERS); exact mode gets BULK_GROUP_BUDGET_MS per
+                 group
+    • output     NDJSON, one line per payment as each batch finishes, then a
+                 summary line
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+import numpy as np
+
+from services.debt_simplifier import settle_batch
+
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "100000"))
+BULK_BATCH_MEMBERS = int(os.getenv("BULK_BATCH_MEMBERS", "5000"))
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(min(4, os.cpu_count() or 1))))
+BULK_GROUP_BUDGET_MS = float(os.getenv("BULK_GROUP_BUDGET_MS", "20"))
+
+CSV_FIELDS = ("group", "payer", "amount", "participants")
+_PERSON_BITS = 32  # slot key = group id << 32 | person id
+
+# One chunk as columns: groups, payers, amounts (text or numbers),
+# ";"-joined participants, and rows already rejected while parsing
+Columns = tuple[list[str], list[str], list, list[str], int]
+
+
+class _Ids(dict):
+    """name -> dense integer id, assigned on first lookup (map(ids.__getitem__, …))."""
+
+    def __missing__(self, name: str) -> int:
+        ident = self[name] = len(self)
+        return ident
+
+
+def csv_columns(lines: Iterable[str], size: int = BULK_CHUNK_ROWS) -> Iterator[Columns]:
+    """Column chunks from CSV text lines (header names the columns).
+
+    A chunk without quotes and with the header's comma count on every line
+    is split in one go; anything else goes through csv.reader.
+    """
+    lines = iter(lines)
+    header = [field.strip() for field in next(csv.reader(itertools.islice(lines, 1)), [])]
+    if not set(CSV_FIELDS) <= set(header):
+        raise ValueError(f"CSV header must include {', '.join(CSV_FIELDS)}")
+    index = [header.index(field) for field in CSV_FIELDS]
+    width = len(header)
+    while chunk := list(itertools.islice(lines, size)):
+        # File lines keep their endings, request-body lines (_lines) do not
+        text = ("".join(chunk) if chunk[0].endswith("\n") else "\n".join(chunk))
+        text = text.replace("\r\n", "\n").rstrip("\r\n")
+        commas = np.char.count(np.asarray(chunk, dtype=str), ",")
+        if '"' not in text and (commas == width - 1).all():
+            fields = text.replace("\n", ",").split(",")
+            yield (*(fields[i::width] for i in index), 0)
+            continue
+        rows = [row for row in csv.reader(chunk) if len(row) == width]
+        if rows:
+            yield (*map(list, zip(*(itemgetter(*index)(row) for row in rows))), len(chunk) - len(rows))
+        else:
+            yield [], [], [], [], len(chunk)
+
+
+def ndjson_columns(lines: Iterable[str], size: int = BULK_CHUNK_ROWS) -> Iterator[Columns]:
+    """Column chunks from NDJSON lines with the CSV_FIELDS keys."""
+    lines = (line for line in lines if line.strip())
+    while chunk := list(itertools.islice(lines, size)):
+        groups, payers, amounts, participants = [], [], [], []
+        for line in chunk:
+            try:
+                record = json.loads(line)
+                row = (str(record["group"]), str(record["payer"]), float(record["amount"]),
+                       ";".join(map(str, record["participants"])))
+            except (KeyError, TypeError, ValueError):
+                continue
+            groups.append(row[0])
+            payers.append(row[1])
+            amounts.append(row[2])
+            participants.append(row[3])
+        yield groups, payers, amounts, participants, len(chunk) - len(groups)
+
+
+def _paise(amounts: list) -> np.ndarray:
+    """Amounts in paise; anything unparsable or not positive becomes 0."""
+    try:
+        values = np.asarray(amounts, dtype=np.float64)
+    except ValueError:
+        values = np.array([_number(amount) for amount in amounts], dtype=np.float64)
+    values = np.where(np.isfinite(values) & (values > 0), values, 0)
+    return np.rint(values * 100).astype(np.int64)
+
+
+def _number(text) -> float:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class BalanceAggregator:
+    """Net balance (paise) per (group, person), reduced chunk by chunk.
+
+    Balances live as two sorted arrays — slot keys (group id << 32 | person
+    id) and int64 sums — so memory follows the number of people, not rows.
+    """
+
+    def __init__(self):
+        self.groups = _Ids()
+        self.people = _Ids()
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros(0, dtype=np.int64)
+        self.rows = 0
+        self.skipped = 0
+
+    def add(self, columns: Columns) -> None:
+        """Fold one column chunk into the balances."""
+        groups, payers, amounts, participants, rejected = columns
+        self.skipped += rejected
+        if not groups:
+            return
+        strip = str.strip
+        group = np.fromiter(map(self.groups.__getitem__, map(strip, groups)), np.int64, len(groups))
+        payer = np.fromiter(map(self.people.__getitem__, map(strip, payers)), np.int64, len(payers))
+        amount = _paise(amounts)
+        count = np.char.count(np.asarray(participants, dtype=str), ";") + 1
+        names = ";".join(participants).split(";")
+        member = np.fromiter(map(self.people.__getitem__, map(strip, names)), np.int64, len(names))
+
+        # A row is usable with a group, a payer, an amount and no blank names
+        blank_group, blank = self.groups.get(""), self.people.get("")
+        row_of = np.repeat(np.arange(len(groups)), count)
+        valid = amount > 0
+        if blank_group is not None:
+            valid &= group != blank_group
+        if blank is not None:
+            valid &= payer != blank
+            valid &= np.bincount(row_of[member == blank], minlength=len(groups)) == 0
+        self.skipped += int(len(groups) - valid.sum())
+        self.rows += int(valid.sum())
+        keep = valid[row_of]
+        group, payer, amount, count = group[valid], payer[valid], amount[valid], count[valid]
+        member = member[keep]
+        if not len(group):
+            return
+
+        base, extra = np.divmod(amount, count)
+        rank = np.arange(len(member)) - np.repeat(np.cumsum(count) - count, count)
+        shares = np.repeat(base, count) + (rank < np.repeat(extra, count))
+        member_group = np.repeat(group, count)
+
+        keys = np.concatenate((self.keys, group << _PERSON_BITS | payer,
+                               member_group << _PERSON_BITS | member))
+        values = np.concatenate((self.sums, amount, -shares))
+        self.keys, slot = np.unique(keys, return_inverse=True)
+        self.sums = np.zeros(len(self.keys), dtype=np.int64)
+        np.add.at(self.sums, slot, values)
+
+    def batches(self, max_members: int = BULK_BATCH_MEMBERS) -> Iterator[list[tuple[int, list[int], list[int]]]]:
+        """settle_batch inputs: groups with non-zero balances, about max_members people each."""
+        live = np.flatnonzero(self.sums)
+        keys, sums = self.keys[live], self.sums[live]
+        groups = keys >> _PERSON_BITS
+        people = keys & ((1 << _PERSON_BITS) - 1)
+        cuts = np.flatnonzero(np.diff(groups)) + 1  # keys are sorted, so by group
+
+        batch: list[tuple[int, list[int], list[int]]] = []
+        size = 0
+        for start, stop in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [len(keys)]))):
+            if start == stop:
+                continue
+            batch.append((int(groups[start]), people[start:stop].tolist(), sums[start:stop].tolist()))
+            size += stop - start
+            if size >= max_members:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+
+def aggregate(lines: Iterable[str], fmt: str = "csv") -> BalanceAggregator:
+    """Balances for a whole input (file lines, decoded request body, …)."""
+    aggregator = BalanceAggregator()
+    for columns in (csv_columns(lines) if fmt == "csv" else ndjson_columns(lines)):
+        aggregator.add(columns)
+    return aggregator
+
+
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """Decoded text lines from a byte stream, about BULK_CHUNK_ROWS at a time."""
+    buffer = b""
+    lines: list[str] = []
+    async for data in body:
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        lines += (line.decode("utf-8-sig") for line in complete)
+        if len(lines) >= BULK_CHUNK_ROWS:
+            yield lines
+            lines = []
+    if buffer:
+        lines.append(buffer.decode("utf-8-sig"))
+    if lines:
+        yield lines
+
+
+async def aggregate_stream(body: AsyncIterator[bytes], fmt: str = "csv") -> BalanceAggregator:
+    """Balances from an async byte stream (a request body), folded chunk by chunk."""
+    aggregator = BalanceAggregator()
+    header: list[str] = []
+
+    def fold(lines: list[str]) -> None:
+        columns = csv_columns(header + lines) if fmt == "csv" else ndjson_columns(lines)
+        for chunk in columns:
+            aggregator.add(chunk)
+
+    async for lines in _lines(body):
+        if fmt == "csv" and not header:
+            header, lines = lines[:1], lines[1:]  # every chunk is read with the header
+        await asyncio.to_thread(fold, lines)
+    if fmt == "csv" and not header:
+        raise ValueError(f"CSV header must include {', '.join(CSV_FIELDS)}")
+    return aggregator
+
+
+async def settle_stream(aggregator: BalanceAggregator, exact: bool = True,
+                        budget_ms: float = BULK_GROUP_BUDGET_MS,
+                        workers: int = BULK_WORKERS) -> AsyncIterator[bytes]:
+    """NDJSON payment lines per batch as the pool finishes it, then a summary line."""
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    payments = groups = proven = 0
+    group_names, people = list(aggregator.groups), list(aggregator.people)  # id order
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pending = {
+            loop.run_in_executor(pool, settle_batch, batch, exact, budget_ms)
+            for batch in aggregator.batches()
+        }
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                out = []
+                for group, settled, optimal in task.result():
+                    groups += 1
+                    proven += optimal
+                    name = group_names[group]
+                    for debtor, creditor, amount in settled:
+                        out.append(json.dumps({
+                            "group": name,
+                            "from_person": people[debtor],
+                            "to_person": people[creditor],
+                            "amount": amount / 100,
+                        }, ensure_ascii=False))
+                    payments += len(settled)
+                if out:
+                    yield ("\n".join(out) + "\n").encode("utf-8")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    yield (json.dumps({
+        "summary": True,
+        "rows": aggregator.rows,
+        "skipped": aggregator.skipped,
+        "groups_settled": groups,
+        "groups_optimal": proven,
+        "people": len(aggregator.people),
+        "payments": payments,
+        "seconds": round(time.perf_counter() - started, 3),
+    }) + "\n").encode("utf-8")
+
+
+if __name__ == "__main__":
+    # python -m services.bulk_settlement expenses.csv|expenses.ndjson [--greedy] > payments.ndjson
+    import sys
+
+    path = sys.argv[1]
+    fmt = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+    async def _main() -> None:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            aggregator = aggregate(f, fmt)
+        async for data in settle_stream(aggregator, exact="--greedy" not in sys.argv):
+            sys.stdout.buffer.write(data)
+
+    asyncio.run(_main())
@@ -0,0 +1,184 @@
+"""Chat Sessions — server-side CampusGPT conversation history.
+
+Clients send a `conversation_id` and only the new message; the server keeps
+the turns. Each session holds a token-budgeted window of recent turns plus
+a compact extractive summary of older ones, so per-turn prompt size stays
+flat however long the chat runs.
+
+Sessions live in an in-memory LRU. If CHAT_SESSION_DB is set, sessions
+evicted from memory spill to a local SQLite file and are reloaded on demand.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+
+# ── Configuration ──────────────────────────────────────────
+SESSION_MAX_IN_MEMORY = int(os.getenv("CHAT_SESSION_MAX", "5000"))
+SESSION_DB_PATH = os.getenv("CHAT_SESSION_DB", "")
+
+# Recent turns kept verbatim after compaction
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "3000"))
+# Compaction kicks in once the verbatim turns exceed this
+COMPACT_THRESHOLD_TOKENS = int(os.getenv("CHAT_COMPACT_THRESHOLD", "4000"))
+SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400"))
+
+SUMMARY_PREFIX = "Context from earlier in this chat:"
+SNIPPET_CHARS = 160
+SUMMARY_LINES_PER_REPLY = 4
+
+_SUMMARY_LINE = re.compile(r"(📍|TOTAL|per person|UPI split)", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token, never below 1 for text)."""
+    return (len(text) + 3) // 4
+
+
+def _summarize_turn(turn: dict) -> str:
+    """One-line extractive summary of a turn."""
+    text = turn["text"].strip()
+    if turn["role"] == "user":
+        return f"• Student asked: {text[:SNIPPET_CHARS]}"
+
+    # Assistant: keep the headline and the cost totals, drop the rest
+    picked = [line.strip() for line in text.splitlines() if _SUMMARY_LINE.search(line)]
+    if not picked:
+        picked = [text.splitlines()[0].strip()] if text else []
+    picked = [line[:SNIPPET_CHARS] for line in picked[:SUMMARY_LINES_PER_REPLY]]
+    return "• CampusGPT said: " + " | ".join(picked)
+
+
+class ChatSession:
+    """One conversation: compact summary + recent verbatim turns."""
+
+    __slots__ = ("id", "summary", "turns", "turn_tokens", "updated_at")
+
+    def __init__(self, session_id: str, summary: str = "", turns: list[dict] | None = None):
+        self.id = session_id
+        self.summary = summary
+        self.turns: list[dict] = turns or []
+        self.turn_tokens = sum(estimate_tokens(t["text"]) for t in self.turns)
+        self.updated_at = time.time()
+
+    def append(self, role: str, text: str) -> None:
+        if not text.strip():
+            return
+        self.turns.append({"role": role, "text": text})
+        self.turn_tokens += estimate_tokens(text)
+        self.updated_at = time.time()
+        if self.turn_tokens > COMPACT_THRESHOLD_TOKENS:
+            self._compact()
+
+    def window(self) -> list[dict]:
+        """History to send upstream: summary (if any) + recent turns."""
+        if not self.summary:
+            return list(self.turns)
+        return [{"role": "user", "text": f"{SUMMARY_PREFIX}\n{self.summary}"}] + self.turns
+
+    def _compact(self) -> None:
+        """Fold the oldest turns into the summary until the rest fit the budget."""
+        lines = self.summary.splitlines() if self.summary else []
+        # Always keep the latest turn verbatim
+        while self.turn_tokens > HISTORY_TOKEN_BUDGET and len(self.turns) > 1:
+            turn = self.turns.pop(0)
+            self.turn_tokens -= estimate_tokens(turn["text"])
+            lines.append(_summarize_turn(turn))
+
+        # Bound the summary itself, dropping the oldest lines first
+        while lines and estimate_tokens("\n".join(lines)) > SUMMARY_MAX_TOKENS:
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+
+
+class SessionStore:
+    """In-memory LRU of sessions with optional SQLite spill."""
+
+    def __init__(self, max_in_memory: int = SESSION_MAX_IN_MEMORY, db_path: str = SESSION_DB_PATH):
+        self.max_in_memory = max_in_memory
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                " id TEXT PRIMARY KEY, summary TEXT, turns TEXT, updated_at REAL)"
+            )
+            self._db.commit()
+
+    def get_or_create(self, session_id: str | None, seed_history: list[dict] | None = None) -> ChatSession:
+        """
+        Return the session for `session_id`, creating one if unknown.
+        A new session is seeded from client-sent history (legacy clients).
+        """
+        if session_id:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+            session = self._load(session_id)
+            if session is not None:
+                self._put(session)
+                return session
+        else:
+            session_id = uuid.uuid4().hex
+
+        session = ChatSession(session_id)
+        for msg in seed_history or []:
+            role = "user" if msg.get("role") == "user" else "assistant"
+            session.append(role, msg.get("text", ""))
+        self._put(session)
+        return session
+
+    def record_turn(self, session: ChatSession, message: str, reply: str) -> None:
+        """Append a completed user/assistant exchange."""
+        session.append("user", message)
+        session.append("assistant", reply)
+
+    def close(self) -> None:
+        """Spill every in-memory session (if SQLite is configured)."""
+        if self._db is None:
+            return
+        for session in self._sessions.values():
+            self._spill(session)
+        self._db.commit()
+        self._db.close()
+        self._db = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # ── Internals ──────────────────────────────────────────
+    def _put(self, session: ChatSession) -> None:
+        self._sessions[session.id] = session
+        self._sessions.move_to_end(session.id)
+        while len(self._sessions) > self.max_in_memory:
+            _, evicted = self._sessions.popitem(last=False)
+            if self._db is not None:
+                self._spill(evicted)
+                self._db.commit()
+
+    def _spill(self, session: ChatSession) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO chat_sessions (id, summary, turns, updated_at) VALUES (?, ?, ?, ?)",
+            (session.id, session.summary, json.dumps(session.turns, ensure_ascii=False), session.updated_at),
+        )
+
+    def _load(self, session_id: str) -> ChatSession | None:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT summary, turns FROM chat_sessions WHERE id = ?", (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return ChatSession(session_id, summary=row[0], turns=json.loads(row[1]))
+
+
+# Shared process-wide store
+session_store = SessionStore()
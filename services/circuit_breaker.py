@@ -0,0 +1,146 @@
+"""Circuit Breaker — per-provider error-rate and latency tracking.
+
+States:
+    closed    — calls flow; outcomes go into a rolling time window
+    open      — error/slow rate crossed the threshold; calls are skipped
+                until `open_seconds` have passed
+    half_open — one probe call at a time is let through; success closes
+                the breaker, failure re-opens it
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+
+WINDOW_SECONDS = float(os.getenv("LLM_BREAKER_WINDOW", "60"))
+MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+ERROR_RATE_THRESHOLD = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+SLOW_CALL_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_CALL", "20"))
+OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+
+LATENCY_SAMPLES = 200
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for one upstream provider."""
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = WINDOW_SECONDS,
+        min_calls: int = MIN_CALLS,
+        error_rate_threshold: float = ERROR_RATE_THRESHOLD,
+        slow_call_seconds: float = SLOW_CALL_SECONDS,
+        open_seconds: float = OPEN_SECONDS,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started_at: float | None = None
+        # (timestamp, bad) where bad = failed or slower than slow_call_seconds
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    # ── Admission ──────────────────────────────────────────
+    def allow(self) -> bool:
+        """Whether a call may go to this provider right now."""
+        now = time.monotonic()
+
+        if self.state == OPEN:
+            if now - self._opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self._probe_started_at = None
+
+        if self.state == HALF_OPEN:
+            # One probe at a time; a probe that never reports expires
+            if (self._probe_started_at is not None
+                    and now - self._probe_started_at < self.open_seconds):
+                return False
+            self._probe_started_at = now
+
+        return True
+
+    # ── Outcomes ───────────────────────────────────────────
+    def record_success(self, latency: float, sample: bool = True) -> None:
+        """`sample=False` keeps a latency of another kind (e.g. a whole
+        non-streamed reply) out of the first-token percentiles."""
+        if sample:
+            self._latencies.append(latency)
+        if self.state == HALF_OPEN:
+            self._close()
+            return
+        self._record(bad=latency > self.slow_call_seconds)
+
+    def record_failure(self, latency: float | None = None) -> None:
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self._record(bad=True)
+
+    def record_slow(self, latency: float) -> None:
+        """A call abandoned for being too slow (e.g. lost a hedge race)."""
+        self._latencies.append(latency)
+        self.record_failure(latency)
+
+    # ── Metrics ────────────────────────────────────────────
+    def latency_p95(self) -> float | None:
+        """95th percentile of recent first-token latencies (seconds)."""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def error_rate(self) -> float:
+        self._trim(time.monotonic())
+        if not self._outcomes:
+            return 0.0
+        return sum(bad for _, bad in self._outcomes) / len(self._outcomes)
+
+    def snapshot(self) -> dict:
+        p95 = self.latency_p95()
+        return {
+            "name": self.name,
+            "state": self.state,
+            "calls_in_window": len(self._outcomes),
+            "error_rate": round(self.error_rate(), 4),
+            "latency_p95_ms": round(p95 * 1000) if p95 is not None else None,
+        }
+
+    # ── Internals ──────────────────────────────────────────
+    def _record(self, bad: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, bad))
+        self._trim(now)
+
+        if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+            if self.error_rate() >= self.error_rate_threshold:
+                self._open()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _open(self) -> None:
+        print(f"[breaker] {self.name} circuit OPEN")
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started_at = None
+
+    def _close(self) -> None:
+        print(f"[breaker] {self.name} circuit closed")
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._probe_started_at = None
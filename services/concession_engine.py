@@ -1,55 +1,15 @@
 """Indian Railway Concession Engine — fare calculation with student discounts."""
 from __future__ import annotations
 
-# ── Distance matrix (km) between major stations ───────────
-# Approximate real Indian Railways distances
-DISTANCE_MATRIX: dict[tuple[str, str], int] = {
-    ("Lucknow", "Kanpur"): 82,
-    ("Lucknow", "Allahabad"): 200,
-    ("Lucknow", "Varanasi"): 300,
-    ("Lucknow", "Delhi"): 511,
-    ("Lucknow", "Mumbai"): 1380,
-    ("Lucknow", "Patna"): 540,
-    ("Lucknow", "Jaipur"): 580,
-    ("Lucknow", "Haridwar"): 510,
-    ("Kanpur", "Allahabad"): 193,
-    ("Kanpur", "Varanasi"): 295,
-    ("Kanpur", "Delhi"): 440,
-    ("Kanpur", "Mumbai"): 1320,
-    ("Kanpur", "Patna"): 610,
-    ("Kanpur", "Jaipur"): 500,
-    ("Kanpur", "Haridwar"): 520,
-    ("Allahabad", "Varanasi"): 128,
-    ("Allahabad", "Delhi"): 634,
-    ("Allahabad", "Mumbai"): 1400,
-    ("Allahabad", "Patna"): 415,
-    ("Allahabad", "Jaipur"): 725,
-    ("Allahabad", "Haridwar"): 740,
-    ("Varanasi", "Delhi"): 780,
-    ("Varanasi", "Mumbai"): 1500,
-    ("Varanasi", "Patna"): 240,
-    ("Varanasi", "Jaipur"): 870,
-    ("Varanasi", "Haridwar"): 850,
-    ("Delhi", "Mumbai"): 1384,
-    ("Delhi", "Patna"): 1001,
-    ("Delhi", "Jaipur"): 304,
-    ("Delhi", "Haridwar"): 214,
-    ("Mumbai", "Patna"): 1680,
-    ("Mumbai", "Jaipur"): 1150,
-    ("Mumbai", "Haridwar"): 1620,
-    ("Patna", "Jaipur"): 960,
-    ("Patna", "Haridwar"): 900,
-    ("Jaipur", "Haridwar"): 475,
-}
+import numpy as np
 
-# All available stations
-STATIONS = [
-    "Lucknow", "Kanpur", "Allahabad", "Varanasi",
-    "Delhi", "Mumbai", "Patna", "Jaipur", "Haridwar",
-]
+from services.fare_artifact import load_current
+from services.fare_snapshot import DEFAULT_DISTANCE_KM, FareSnapshot, RatesStore
+from services.rail_network import load_network
 
 # ── Fare calculation (per km rates as per Indian Railways) ─
-# These are approximate rates for 2025-2026
+# These are approximate rates for 2025-2026. They are the defaults: the live
+# rates come from data/rail/rates.json and can be hot-reloaded (see RATES)
 FARE_RATES = {
     "2S": {  # Second Sitting
         "base": 15,
@@ -59,8 +19,25 @@ FARE_RATES = {
         "base": 20,
         "per_km": 0.45,
     },
+    "CC": {  # AC Chair Car (Shatabdi)
+        "base": 40,
+        "per_km": 1.05,
+    },
+    "3A": {  # AC 3-Tier (Rajdhani)
+        "base": 40,
+        "per_km": 1.20,
+    },
 }
 
+# ── Station network (km) ───────────────────────────────────
+# Shortest rail distances: the compiled, memory-mapped artifact if one has
+# been built (python -m services.fare_artifact), else data/rail/network.json.
+# Resolved once per worker: a newly compiled artifact needs a restart
+NETWORK = load_current() or load_network()
+
+# All available stations
+STATIONS = NETWORK.names
+
 # Concession percentages for students
 CONCESSION_RATES = {
     "General": 50,   # 50% discount for general students
@@ -68,20 +45,36 @@ CONCESSION_RATES = {
     "PH": 75,        # 75% discount for PH students
 }
 
+# ── Live rates ─────────────────────────────────────────────
+# Every fare below is a read from the current precomputed snapshot. A
+# request takes `current_rates()` once, so a reload mid-request can't mix
+# old fares with new concessions.
+RATES = RatesStore(NETWORK, FARE_RATES, CONCESSION_RATES)
+
+
+def current_rates() -> FareSnapshot:
+    """The live fare snapshot (lock-free; swapped atomically on reload)."""
+    return RATES.current
+
 
 def get_distance(from_station: str, to_station: str) -> int | None:
     """Get distance between two stations (direction-agnostic)."""
-    key1 = (from_station, to_station)
-    key2 = (to_station, from_station)
-    return DISTANCE_MATRIX.get(key1) or DISTANCE_MATRIX.get(key2)
+    return NETWORK.distance(from_station, to_station)
 
 
 def calculate_fare(distance_km: int, travel_class: str) -> int:
-    """Calculate base fare from distance and class."""
-    rates = FARE_RATES.get(travel_class, FARE_RATES["SL"])
-    raw_fare = rates["base"] + (distance_km * rates["per_km"])
-    # Round to nearest 5
-    return int(round(raw_fare / 5) * 5)
+    """Calculate base fare from distance and class (rounded to nearest 5)."""
+    return current_rates().fare_for_distance(distance_km, travel_class)
+
+
+def get_fare(from_station: str, to_station: str, travel_class: str) -> int | None:
+    """Base fare between two stations (None if unknown or unconnected)."""
+    return current_rates().fare(from_station, to_station, travel_class)
+
+
+def apply_concession(fare: int, category: str) -> int:
+    """Student fare after the category's concession (rounded to nearest 5)."""
+    return current_rates().concession_fare(fare, category)
 
 
 def calculate_concession(
@@ -93,19 +86,10 @@ def calculate_concession(
     """
     Calculate railway concession for a student.
     Returns full result including original fare, concession fare, savings, steps.
+    Unknown station pairs are estimated at DEFAULT_DISTANCE_KM.
     """
-    distance = get_distance(from_station, to_station)
-    if distance is None:
-        # Estimate based on generic distance
-        distance = 300  # default fallback
-
-    original_fare = calculate_fare(distance, travel_class)
-    concession_pct = CONCESSION_RATES.get(category, 50)
-    discount = int(original_fare * concession_pct / 100)
-    concession_fare = original_fare - discount
-    # Round to nearest 5
-    concession_fare = int(round(concession_fare / 5) * 5)
-    savings = original_fare - concession_fare
+    quote = current_rates().quote(from_station, to_station, travel_class, category)
+    concession_fare = quote["concession_fare"]
 
     steps = [
         f"1. Visit nearest railway counter with student ID",
@@ -120,10 +104,63 @@ def calculate_concession(
         "to_station": to_station,
         "travel_class": travel_class,
         "category": category,
-        "original_fare": original_fare,
-        "concession_fare": concession_fare,
-        "savings": savings,
-        "savings_pct": concession_pct,
+        **quote,
         "verified_via": "DigiLocker + ABC",
         "steps": steps,
     }
+
+
+def calculate_concessions(rows: list[dict]) -> list[dict]:
+    """
+    Batch version of calculate_concession (without the steps) for many
+    (from_station, to_station, travel_class, category) rows.
+    Rows are mapped to station/class/category ids and every fare is one
+    gather from the snapshot's precomputed tables.
+    """
+    n = len(rows)
+    if n == 0:
+        return []
+
+    rates = current_rates()
+    ids: dict[str, int] = {}
+
+    def station_id(name: str) -> int:
+        if name not in ids:
+            station = NETWORK.station_id(name)
+            ids[name] = -1 if station is None else station
+        return ids[name]
+
+    src = np.fromiter((station_id(row["from_station"]) for row in rows), np.int64, n)
+    dst = np.fromiter((station_id(row["to_station"]) for row in rows), np.int64, n)
+    cls = np.fromiter((rates.class_index(row["travel_class"]) for row in rows), np.int64, n)
+    cat = np.fromiter((rates.category_index(row["category"]) for row in rows), np.int64, n)
+    pct = [rates.concession_pct(row["category"]) for row in rows]
+
+    # Distances: one gather from the all-pairs table
+    matrix = np.asarray(memoryview(NETWORK.distances))
+    distance = np.full(n, DEFAULT_DISTANCE_KM, dtype=np.int64)
+    known = (src >= 0) & (dst >= 0)
+    found = matrix[src[known] * len(NETWORK) + dst[known]].astype(np.int64)
+    found[found == NETWORK.unreachable] = DEFAULT_DISTANCE_KM
+    distance[known] = found
+
+    original, concession = rates.quotes(src, dst, cls, cat)
+    savings = original - concession
+
+    return [
+        {
+            "from_station": row["from_station"],
+            "to_station": row["to_station"],
+            "travel_class": row["travel_class"],
+            "category": row["category"],
+            "distance_km": km,
+            "original_fare": fare,
+            "concession_fare": student_fare,
+            "savings": saved,
+            "savings_pct": rate,
+        }
+        for row, km, fare, student_fare, saved, rate in zip(
+            rows, distance.tolist(), original.tolist(), concession.tolist(),
+            savings.tolist(), pct,
+        )
+    ]
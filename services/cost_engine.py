@@ -0,0 +1,168 @@
+"""Trip Cost Engine — deterministic per-person and group trip costs.
+
+Replaces the LLM-estimated STEP 9 cost table. Every number is computed from
+the same tables the rest of the app uses:
+
+    • train fare      → the live fare snapshot (base fare + student concession)
+    • last mile       → campus bus + route_planner._estimate_auto_fare
+                        (autos shared AUTO_CAPACITY to a ride)
+    • stay            → STAY_RATES (rooms rounded up for the group)
+    • food / misc     → per-day tables
+    • activities      → ACTIVITY_COSTS per destination
+
+`estimate_costs` evaluates many itineraries in one call; leg fares are
+precomputed table reads, so a batch costs microseconds per itinerary.
+"""
+from __future__ import annotations
+
+import math
+import re
+
+from services.concession_engine import current_rates
+from services.intent_router import extract_stations, mentioned_stations
+from services.route_planner import CAMPUS_BUS_FARE, _estimate_auto_fare
+
+AUTO_CAPACITY = 3
+
+# Stay tier → (₹ per unit per night, people per unit)
+STAY_RATES = {
+    "Budget": (450, 1),     # hostel dorm bed
+    "Mid": (1400, 2),       # hotel room, 2 sharing
+    "Premium": (3500, 2),
+}
+
+FOOD_PER_DAY = {"Budget": 350, "Mid": 600, "Premium": 1000}
+MISC_PER_DAY = 100
+
+# Destination → (activity, ₹ per person)
+ACTIVITY_COSTS: dict[str, list[tuple[str, int]]] = {
+    "Lucknow": [("Bara Imambara", 50), ("Residency", 25), ("Hazratganj walk", 0)],
+    "Kanpur": [("JK Temple", 0), ("Allen Forest Zoo", 60), ("Ganga Barrage", 0)],
+    "Allahabad": [("Triveni Sangam boat", 150), ("Anand Bhawan", 70), ("Khusro Bagh", 0)],
+    "Varanasi": [("Ganga Aarti", 0), ("Sunrise boat ride", 200), ("Sarnath", 25)],
+    "Delhi": [("Red Fort", 35), ("Qutub Minar", 35), ("Metro day pass", 200)],
+    "Mumbai": [("Gateway of India", 0), ("Elephanta Caves ferry", 250), ("Marine Drive", 0)],
+    "Patna": [("Golghar", 0), ("Patna Museum", 100), ("Gandhi Ghat", 0)],
+    "Jaipur": [("Amber Fort", 100), ("Hawa Mahal", 50), ("Nahargarh sunset", 50)],
+    "Haridwar": [("Har Ki Pauri Aarti", 0), ("Rishikesh rafting", 500), ("Mansa Devi ropeway", 150)],
+}
+
+ITEM_TRANSPORT = "Transport (train)"
+ITEM_LOCAL = "Local transport"
+ITEM_STAY = "Stay"
+ITEM_FOOD = "Food"
+ITEM_ACTIVITIES = "Activities/Entry fees"
+ITEM_MISC = "Miscellaneous"
+
+_GROUP = re.compile(r"(\d+)\s*(?:logo|log|people|persons|friends|members|students)\b", re.IGNORECASE)
+_DAYS = re.compile(r"(\d+)\s*(?:days?|din)\b", re.IGNORECASE)
+_NIGHTS = re.compile(r"(\d+)\s*(?:nights?|raat)\b", re.IGNORECASE)
+
+
+def _train_fare(from_station: str, to_station: str, travel_class: str, category: str) -> int:
+    """Concession train fare for one leg, per person (not cached: rates reload)."""
+    quote = current_rates().quote(from_station, to_station, travel_class, category)
+    return quote["concession_fare"]
+
+
+def _activities(destination: str, wanted: list[str] | None) -> list[tuple[str, int]]:
+    listed = ACTIVITY_COSTS.get(destination, [])
+    if wanted is None:
+        return listed
+    wanted_lower = {name.lower() for name in wanted}
+    return [(name, cost) for name, cost in listed if name.lower() in wanted_lower]
+
+
+def estimate_cost(itinerary: dict) -> dict:
+    """Full cost breakdown for one itinerary (see models.Itinerary for keys)."""
+    origin = itinerary["from_station"]
+    destination = itinerary["to_station"]
+    members = max(1, itinerary.get("member_count", 1))
+    nights = max(0, itinerary.get("nights", 2))
+    days = nights + 1
+    legs = 2 if itinerary.get("return_journey", True) else 1
+    stay = itinerary.get("stay", "Budget")
+    if stay not in STAY_RATES:
+        stay = "Budget"
+
+    fare = _train_fare(origin, destination, itinerary.get("travel_class", "SL"),
+                       itinerary.get("category", "General"))
+    autos = math.ceil(members / AUTO_CAPACITY)
+    rate, occupancy = STAY_RATES[stay]
+    activities = _activities(destination, itinerary.get("activities"))
+
+    # Group amounts (₹); per-person shares are derived from these
+    group = {
+        ITEM_TRANSPORT: fare * legs * members,
+        ITEM_LOCAL: (CAMPUS_BUS_FARE * members + _estimate_auto_fare(destination) * autos) * legs,
+        ITEM_STAY: math.ceil(members / occupancy) * rate * nights,
+        ITEM_FOOD: FOOD_PER_DAY[stay] * days * members,
+        ITEM_ACTIVITIES: sum(cost for _, cost in activities) * members,
+        ITEM_MISC: MISC_PER_DAY * days * members,
+    }
+    group_total = sum(group.values())
+    return {
+        "from_station": origin,
+        "to_station": destination,
+        "member_count": members,
+        "return_journey": legs == 2,
+        "lines": [
+            {"item": item, "per_person": math.ceil(amount / members), "group": amount}
+            for item, amount in group.items()
+        ],
+        "per_person": math.ceil(group_total / members),
+        "group_total": group_total,
+        "upi_split": math.ceil(group_total / members),
+    }
+
+
+def estimate_costs(itineraries: list[dict]) -> list[dict]:
+    """Batch evaluation — one breakdown per itinerary, in order."""
+    return [estimate_cost(itinerary) for itinerary in itineraries]
+
+
+def itinerary_from_text(text: str) -> dict | None:
+    """Itinerary from a chat message naming exactly two known stations,
+    else None (a multi-city trip isn't one origin → destination leg)."""
+    if len(mentioned_stations(text)) != 2:
+        return None
+    origin, destination = extract_stations(text)
+
+    group = _GROUP.search(text)
+    days = _DAYS.search(text)
+    nights = _NIGHTS.search(text)
+    if nights:
+        night_count = int(nights.group(1))
+    elif days:
+        night_count = max(0, int(days.group(1)) - 1)
+    else:
+        night_count = 2
+    return {
+        "from_station": origin,
+        "to_station": destination,
+        "member_count": int(group.group(1)) if group else 1,
+        "nights": night_count,
+    }
+
+
+def cost_table(cost: dict, nights: int) -> str:
+    """STEP 9 block in CampusGPT's reply format."""
+    members = cost["member_count"]
+    labels = {
+        ITEM_TRANSPORT: "Transport (going + return)" if cost["return_journey"] else "Transport (one way)",
+        ITEM_LOCAL: "Local transport (bus + auto)",
+        ITEM_STAY: f"Stay ({nights} nights)",
+        ITEM_FOOD: f"Food ({nights + 1} days)",
+    }
+    lines = [
+        f"• {labels.get(line['item'], line['item'])}: ₹{line['per_person']:,}"
+        for line in cost["lines"]
+    ]
+    return "\n".join([
+        "💰 STEP 9: COMPLETE COST TABLE (per person)",
+        *lines,
+        "━━━━━━━━━━━━━━━━━",
+        f"📊 TOTAL per person: ₹{cost['per_person']:,}",
+        f"📊 TOTAL for {members} people: ₹{cost['group_total']:,}",
+        f"💵 UPI split: Each person pays ₹{cost['upi_split']:,}",
+    ])
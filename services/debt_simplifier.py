@@ -1,8 +1,214 @@
-"""Debt Simplification Algorithm — minimize transactions among friends."""
+"""Debt Simplification Algorithm — minimize transactions among friends.
+
+Two settlement modes over net balances:
+
+    • greedy   settle_balances: largest debtor pays largest creditor (heaps)
+    • exact    settle_exact: the fewest payments possible. A group of people
+               whose balances sum to zero settles in (size - 1) payments, so
+               the optimum is n minus the largest number of disjoint zero-sum
+               groups. Exact opposites (+x / -x) are paired first (always
+               optimal), then
+                 – up to EXACT_DP_MAX people: bitmask DP over subsets
+                   (NumPy, one popcount layer at a time)
+                 – beyond (up to EXACT_SEARCH_MAX): branch-and-bound over
+                   who absorbs whose balance, seeded with the greedy count,
+                   pruned by the ceil(remaining / 2) lower bound
+               Both stop at the request's time budget (SETTLE_BUDGET_MS) and
+               then return the best found so far; `optimal` says whether the
+               result is proven.
+"""
 from __future__ import annotations
 
+import heapq
+import os
+import time
 from collections import defaultdict
 
+import numpy as np
+
+EXACT_DP_MAX = int(os.getenv("SETTLE_EXACT_DP_MAX", "20"))
+EXACT_SEARCH_MAX = 600  # branch-and-bound recursion depth is one level per person
+SETTLE_BUDGET_MS = float(os.getenv("SETTLE_BUDGET_MS", "250"))
+_CHECK_EVERY = 1024  # branch-and-bound nodes between clock checks
+
+
+def settle_balances(balances: dict[str, int]) -> list[dict]:
+    """
+    Payments that clear net balances (positive = is owed, negative = owes).
+
+    Greedy over two max-heaps: the largest debtor pays the largest creditor
+    as much as either allows, and whoever is left with a remainder goes back
+    on its heap. Each payment zeroes at least one person, so there are at
+    most n - 1 payments and the whole run is O(n log n). Ties break by name
+    so the suggestions are stable.
+    """
+    creditors = [(-balance, person) for person, balance in balances.items() if balance > 0]
+    debtors = [(balance, person) for person, balance in balances.items() if balance < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    simplified = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debit, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debit)
+        simplified.append({"from_person": debtor, "to_person": creditor, "amount": amount})
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debit > amount:
+            heapq.heappush(debtors, (debit + amount, debtor))
+    return simplified
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def _pair_opposites(balances: dict[str, int]) -> tuple[list[dict], dict[str, int]]:
+    """Payments for exact +x / -x pairs, and the balances left over."""
+    waiting: dict[int, list[str]] = defaultdict(list)  # balance -> people awaiting a partner
+    payments = []
+    for person, balance in sorted(balances.items()):
+        if balance == 0:
+            continue
+        partners = waiting.get(-balance)
+        if partners:
+            partner = partners.pop()
+            debtor, creditor = (person, partner) if balance < 0 else (partner, person)
+            payments.append({"from_person": debtor, "to_person": creditor, "amount": abs(balance)})
+        else:
+            waiting[balance].append(person)
+    rest = {person: balance for balance, people in waiting.items() for person in people}
+    return payments, rest
+
+
+def _zero_sum_groups(values: list[int], deadline: float) -> list[list[int]]:
+    """Partition indices into the most zero-sum groups (bitmask DP)."""
+    n = len(values)
+    size = 1 << n
+    sums = np.zeros(size, dtype=np.int64)
+    popcount = np.zeros(size, dtype=np.int8)
+    for i, value in enumerate(values):
+        bit = 1 << i
+        sums[bit:2 * bit] = sums[:bit] + value
+        popcount[bit:2 * bit] = popcount[:bit] + 1
+    zero = (sums == 0).astype(np.int8)
+
+    # groups[mask] = most zero-sum groups the people in mask split into;
+    # a mask's value depends only on masks one person smaller
+    order = np.argsort(popcount, kind="stable")
+    layers = np.searchsorted(popcount[order], np.arange(n + 2))
+    groups = np.zeros(size, dtype=np.int8)
+    for count in range(1, n + 1):
+        if time.monotonic() > deadline:
+            raise _OutOfTime
+        masks = order[layers[count]:layers[count + 1]]
+        best = np.zeros(len(masks), dtype=np.int8)
+        for i in range(n):
+            np.maximum(best, groups[masks ^ (1 << i)], out=best)  # supersets are still 0
+        groups[masks] = best + zero[masks]
+
+    # Walk back down, cutting a group whenever the remaining mask sums to zero
+    partition, current, mask = [], [], size - 1
+    while mask:
+        target = groups[mask] - zero[mask]
+        for i in range(n):
+            bit = 1 << i
+            if mask & bit and groups[mask ^ bit] == target:
+                current.append(i)
+                mask ^= bit
+                break
+        if zero[mask]:
+            partition.append(current)
+            current = []
+    return partition
+
+
+def _branch_and_bound(people: list[str], values: list[int], best: int,
+                      deadline: float) -> tuple[list[dict] | None, bool]:
+    """Fewest payments by search: person i's whole balance moves to a later j.
+
+    Returns (payments or None if nothing beat `best`, finished in time).
+    """
+    values = list(values)
+    n = len(values)
+    path: list[tuple[int, int, int]] = []
+    found: list[tuple[int, int, int]] | None = None
+    nodes = 0
+
+    def search(i: int, cost: int) -> None:
+        nonlocal best, found, nodes
+        while i < n and values[i] == 0:
+            i += 1
+        remaining = sum(1 for v in values[i:] if v)
+        if cost + (remaining + 1) // 2 >= best:
+            return
+        if i == n:
+            best, found = cost, list(path)
+            return
+        nodes += 1
+        if nodes % _CHECK_EVERY == 0 and time.monotonic() > deadline:
+            raise _OutOfTime
+        value = values[i]
+        tried = set()
+        for j in range(i + 1, n):
+            if values[j] * value >= 0 or values[j] in tried:
+                continue
+            tried.add(values[j])
+            values[j] += value
+            path.append((i, j, value))
+            search(i + 1, cost + 1)
+            path.pop()
+            values[j] -= value
+            if values[j] + value == 0:
+                break  # cancelling exactly is never worse than anything else
+
+    try:
+        search(0, 0)
+        finished = True
+    except _OutOfTime:
+        finished = False
+    if found is None:
+        return None, finished
+    payments = []
+    for i, j, value in found:
+        debtor, creditor = (people[i], people[j]) if value < 0 else (people[j], people[i])
+        payments.append({"from_person": debtor, "to_person": creditor, "amount": abs(value)})
+    return payments, finished
+
+
+def settle_exact(balances: dict[str, int],
+                 budget_ms: float = SETTLE_BUDGET_MS) -> tuple[list[dict], bool]:
+    """
+    Fewest payments that clear net balances, within a time budget.
+
+    Returns (payments, optimal). When the budget runs out the best solution
+    found so far is returned (at worst settle_balances'), with optimal False.
+    """
+    deadline = time.monotonic() + budget_ms / 1000
+    payments, rest = _pair_opposites(balances)
+    people = sorted(rest, key=lambda person: (-abs(rest[person]), person))
+    values = [rest[person] for person in people]
+
+    greedy = settle_balances(rest)
+    lower_bound = (len(values) + 1) // 2  # one payment zeroes at most two people
+    if len(greedy) <= lower_bound or len(values) <= 3:  # 3 unpaired people need 2
+        return payments + greedy, True
+
+    if len(values) <= EXACT_DP_MAX:
+        try:
+            partition = _zero_sum_groups(values, deadline)
+        except _OutOfTime:
+            return payments + greedy, False
+        for group in partition:
+            payments += settle_balances({people[i]: values[i] for i in group})
+        return payments, True
+
+    if len(values) > EXACT_SEARCH_MAX:
+        return payments + greedy, False
+    found, finished = _branch_and_bound(people, values, len(greedy), deadline)
+    return payments + (found if found is not None else greedy), finished
+
 
 def simplify_debts(
     debts: list[dict],
@@ -44,42 +250,8 @@ def simplify_debts(
             balances[name] += amount
             balances[current_user] -= amount
 
-    # Step 2: Separate into creditors (positive) and debtors (negative)
-    creditors = []  # (name, amount_owed_to_them)
-    debtors = []    # (name, amount_they_owe)
-
-    for person, balance in balances.items():
-        if balance > 0:
-            creditors.append([person, balance])
-        elif balance < 0:
-            debtors.append([person, -balance])
-
-    # Step 3: Greedy matching — match largest debtor with largest creditor
-    creditors.sort(key=lambda x: -x[1])
-    debtors.sort(key=lambda x: -x[1])
-
-    simplified = []
-    i, j = 0, 0
-
-    while i < len(creditors) and j < len(debtors):
-        creditor_name, credit = creditors[i]
-        debtor_name, debit = debtors[j]
-
-        settle_amount = min(credit, debit)
-
-        simplified.append({
-            "from_person": debtor_name,
-            "to_person": creditor_name,
-            "amount": settle_amount,
-        })
-
-        creditors[i][1] -= settle_amount
-        debtors[j][1] -= settle_amount
-
-        if creditors[i][1] == 0:
-            i += 1
-        if debtors[j][1] == 0:
-            j += 1
+    # Step 2: Settle largest debtor against largest creditor (heaps)
+    simplified = settle_balances(balances)
 
     original_count = len(debts)
     simplified_count = len(simplified)
@@ -91,3 +263,25 @@ def simplify_debts(
         "simplified_transactions": simplified,
         "message": f"Instead of {original_count} payments, only {simplified_count} needed!",
     }
+
+
+def settle_batch(groups: list[tuple[int, list[int], list[int]]], exact: bool = True,
+                 budget_ms: float = SETTLE_BUDGET_MS) -> list[tuple[int, list[tuple[int, int, int]], bool]]:
+    """
+    Settle many groups at once (process-pool entry point for bulk settlement).
+
+    groups: [(group id, member ids, balances)] → [(group id, [(from, to, amount)], optimal)]
+    """
+    settled = []
+    for group, members, balances in groups:
+        named = {member: balance for member, balance in zip(members, balances) if balance}
+        if exact:
+            payments, optimal = settle_exact(named, budget_ms)
+        else:
+            payments, optimal = settle_balances(named), False
+        settled.append((
+            group,
+            [(p["from_person"], p["to_person"], p["amount"]) for p in payments],
+            optimal,
+        ))
+    return settled
@@ -0,0 +1,306 @@
+"""Fare Artifact — compiled, memory-mapped station/distance/fare tables.
+
+Building the rail network (JSON parse + one Dijkstra per station) in every
+uvicorn worker wastes startup time and RAM once the station set grows. The
+compile step does it once, offline:
+
+    python -m services.fare_artifact
+
+and writes data/rail/compiled/network-v<N>.bin (override the directory with
+RAIL_ARTIFACT_DIR), then atomically points data/rail/compiled/CURRENT at it.
+Workers `mmap` the current file read-only, so they all share one copy of
+the pages through the OS page cache and startup parses nothing: distances,
+fares and the station-name index are read straight out of the mapping.
+
+File layout (native byte order, sections 8-byte aligned):
+
+    header     magic, format version, artifact version, #stations, #keys,
+               FARE_RATES digest
+    sections   (offset, length) for each of
+               distances  uint16[n*n]            (0xFFFF = unreachable)
+               fares      uint16[classes*n*n]    per FARE_RATES class
+               names      offsets int32[n+1] + utf-8 blob
+               keys       sorted lower-case name/code/alias keys:
+                          offsets int32[k+1], station ids int32[k], blob
+               classes    "\\n"-joined class names
+               meta       JSON station records (parsed only on demand)
+
+Fare tables are only used when the digest matches the live fare rates;
+otherwise the fare snapshot computes them from distance (fare_snapshot).
+
+CURRENT is resolved once, when concession_engine is imported: the station
+indexes (station search, intent router, journey planner) are built from
+that network, so a running worker is never remapped underneath them. After
+compiling a new artifact, restart the workers — a rates reload keeps the old
+mapping and logs that a newer artifact is waiting.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from functools import cached_property
+from pathlib import Path
+from typing import Callable
+
+from services.rail_network import UNREACHABLE, RailNetwork
+
+ARTIFACT_DIR = Path(os.getenv(
+    "RAIL_ARTIFACT_DIR",
+    Path(__file__).resolve().parent.parent / "data" / "rail" / "compiled",
+))
+CURRENT_POINTER = "CURRENT"
+
+MAGIC = b"CGRAIL\x00\x00"
+FORMAT_VERSION = 1
+NO_VALUE = 0xFFFF
+
+_HEADER = struct.Struct("<8sIIII16s")
+_SECTION = struct.Struct("<QQ")
+SECTIONS = (
+    "distances", "fares", "name_offsets", "names",
+    "key_offsets", "key_ids", "keys", "classes", "meta",
+)
+_ARTIFACT_NAME = re.compile(r"network-v(\d+)\.bin$")
+
+
+def fare_digest(fare_rates: dict) -> bytes:
+    """Fingerprint of the fare rates a fare table was compiled with."""
+    canonical = json.dumps(fare_rates, sort_keys=True).encode()
+    return hashlib.sha1(canonical).digest()[:16]
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _blob(strings: list[str]) -> tuple[array, bytes]:
+    offsets = array("i", [0])
+    parts = []
+    for text in strings:
+        data = text.encode("utf-8")
+        parts.append(data)
+        offsets.append(offsets[-1] + len(data))
+    return offsets, b"".join(parts)
+
+
+class _Strings:
+    """Read-only sequence view over an offsets + blob pair (for bisect)."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+
+class CompiledNetwork:
+    """RailNetwork-compatible view over a memory-mapped artifact."""
+
+    unreachable = NO_VALUE
+
+    def __init__(self, path: Path, expected_fare_digest: bytes | None = None):
+        self.path = path
+        with path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, fmt, self.version, self.size, n_keys, digest = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path.name} is not a v{FORMAT_VERSION} rail artifact")
+
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            sections[name] = view[offset:offset + length]
+
+        self._distances = sections["distances"].cast("H")
+        self._fares = sections["fares"].cast("H")
+        self._names = _Strings(sections["name_offsets"].cast("i"), sections["names"])
+        self._keys = _Strings(sections["key_offsets"].cast("i"), sections["keys"])
+        self._key_ids = sections["key_ids"].cast("i")
+        self._meta = sections["meta"]
+        self.classes = bytes(sections["classes"]).decode().split("\n")
+        self.fare_digest = digest
+        self.fares_valid = expected_fare_digest is None or digest == expected_fare_digest
+
+    def __len__(self) -> int:
+        return self.size
+
+    def superseded(self) -> bool:
+        """True once CURRENT names another artifact (workers need a restart)."""
+        return current_artifact(self.path.parent) != self.path
+
+    @property
+    def distances(self) -> memoryview:
+        """Flat n×n distance table (uint16, straight from the mapping)."""
+        return self._distances
+
+    @cached_property
+    def names(self) -> list[str]:
+        return [self._names[i].decode("utf-8") for i in range(self.size)]
+
+    @cached_property
+    def stations(self) -> list[dict]:
+        """Full station records (decoded on first use only)."""
+        return json.loads(bytes(self._meta))["stations"]
+
+    def station_id(self, name: str) -> int | None:
+        key = name.strip().lower().encode("utf-8")
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._key_ids[i]
+        return None
+
+    def distance(self, from_station: str, to_station: str) -> int | None:
+        a = self.station_id(from_station)
+        b = self.station_id(to_station)
+        if a is None or b is None:
+            return None
+        km = self._distances[a * self.size + b]
+        return None if km == NO_VALUE else km
+
+    def fare_tables(self, fare_rates: dict) -> memoryview | None:
+        """uint16[classes*n*n] fares if compiled for exactly these rates."""
+        if fare_digest(fare_rates) != self.fare_digest or self.classes != sorted(fare_rates):
+            return None
+        return self._fares
+
+    def fare(self, from_station: str, to_station: str, travel_class: str) -> int | None:
+        """Precompiled base fare (None if not compiled for these rates/class)."""
+        if not self.fares_valid or travel_class not in self.classes:
+            return None
+        a = self.station_id(from_station)
+        b = self.station_id(to_station)
+        if a is None or b is None:
+            return None
+        n = self.size
+        fare = self._fares[self.classes.index(travel_class) * n * n + a * n + b]
+        return None if fare == NO_VALUE else fare
+
+
+# ── Compile ────────────────────────────────────────────────
+def _versions(directory: Path) -> list[int]:
+    if not directory.is_dir():
+        return []
+    return sorted(
+        int(match.group(1))
+        for path in directory.iterdir()
+        if (match := _ARTIFACT_NAME.match(path.name))
+    )
+
+
+def write_artifact(
+    network: RailNetwork,
+    fare_rates: dict,
+    fare_for_distance: Callable[[int, str], int],
+    directory: Path = ARTIFACT_DIR,
+) -> Path:
+    """Compile a network into the next artifact version and make it current."""
+    n = network.size
+    classes = sorted(fare_rates)
+
+    distances = array("H", (NO_VALUE if km == UNREACHABLE else km for km in network.distances))
+    fares = array("H")
+    for travel_class in classes:
+        fares.extend(
+            NO_VALUE if km == UNREACHABLE else fare_for_distance(km, travel_class)
+            for km in network.distances
+        )
+
+    keys = sorted(network.station_index().items(), key=lambda item: item[0].encode("utf-8"))
+    name_offsets, names = _blob(network.names)
+    key_offsets, key_blob = _blob([key for key, _ in keys])
+    key_ids = array("i", (station_id for _, station_id in keys))
+    meta = json.dumps({
+        "compiled_at": time.time(),
+        "fare_rates": fare_rates,
+        "stations": network.stations,
+    }, ensure_ascii=False).encode("utf-8")
+
+    payloads = {
+        "distances": distances.tobytes(),
+        "fares": fares.tobytes(),
+        "name_offsets": name_offsets.tobytes(),
+        "names": names,
+        "key_offsets": key_offsets.tobytes(),
+        "key_ids": key_ids.tobytes(),
+        "keys": key_blob,
+        "classes": "\n".join(classes).encode(),
+        "meta": meta,
+    }
+
+    directory.mkdir(parents=True, exist_ok=True)
+    version = (_versions(directory) or [0])[-1] + 1
+    path = directory / f"network-v{version}.bin"
+    tmp = path.with_name(path.name + ".tmp")
+
+    offset = _align(_HEADER.size + len(SECTIONS) * _SECTION.size)
+    table = []
+    for name in SECTIONS:
+        table.append((offset, len(payloads[name])))
+        offset = _align(offset + len(payloads[name]))
+
+    with tmp.open("wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, version, n, len(keys), fare_digest(fare_rates)))
+        for entry in table:
+            f.write(_SECTION.pack(*entry))
+        for name, (start, _) in zip(SECTIONS, table):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(payloads[name])
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    # Flip the pointer last — readers see either the old or the new version
+    pointer = directory / CURRENT_POINTER
+    pointer_tmp = pointer.with_name(CURRENT_POINTER + ".tmp")
+    pointer_tmp.write_text(path.name)
+    os.replace(pointer_tmp, pointer)
+    return path
+
+
+def current_artifact(directory: Path = ARTIFACT_DIR) -> Path | None:
+    """Path the CURRENT pointer names, if any."""
+    try:
+        name = (directory / CURRENT_POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+    path = directory / name
+    return path if path.is_file() else None
+
+
+def load_current(expected_fare_digest: bytes | None = None,
+                 directory: Path = ARTIFACT_DIR) -> CompiledNetwork | None:
+    """Map the current artifact read-only (None if none has been compiled)."""
+    path = current_artifact(directory)
+    if path is None:
+        return None
+    try:
+        return CompiledNetwork(path, expected_fare_digest)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[fare-artifact] could not map {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    from services.concession_engine import calculate_fare, current_rates
+    from services.rail_network import load_network
+
+    started = time.perf_counter()
+    network = load_network()
+    path = write_artifact(network, dict(current_rates().fare_rates), calculate_fare)
+    print(
+        f"[fare-artifact] compiled {len(network)} stations → {path} "
+        f"({path.stat().st_size:,} bytes, {time.perf_counter() - started:.2f}s)"
+    )
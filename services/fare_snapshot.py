@@ -0,0 +1,254 @@
+"""Fare Snapshot — precomputed fare tables with atomic hot reload of rates.
+
+Fare and concession rates (Indian Railways revises them) live in
+data/rail/rates.json (override with FARE_RATES_PATH):
+
+    {"fare_rates": {"SL": {"base": 20, "per_km": 0.45}, ...},
+     "concession_rates": {"General": 50, ...}}
+
+From the rates and the station network a FareSnapshot precomputes every
+result once:
+
+    • base fare for every station pair × class      uint16[classes, n*n]
+      (taken zero-copy from the compiled artifact when it was built for
+      the same rates)
+    • concession fare for every category × base fare  int64[categories, max+1]
+
+so a quote is two array reads. Snapshots are immutable; the current one is
+a single module reference that request handlers read once, without locks.
+`RatesStore.reload()` builds a new snapshot off the event loop and swaps the
+reference in one assignment — a request sees either the old rates or the
+new ones, never a mix. `RatesStore.watch()` reloads when the file changes.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+
+RATES_PATH = Path(os.getenv(
+    "FARE_RATES_PATH",
+    Path(__file__).resolve().parent.parent / "data" / "rail" / "rates.json",
+))
+RATES_WATCH_INTERVAL = float(os.getenv("FARE_RATES_WATCH_INTERVAL", "30"))
+
+DEFAULT_CLASS = "SL"
+DEFAULT_CONCESSION_PCT = 50
+DEFAULT_DISTANCE_KM = 300  # used when a station pair is unknown
+NO_FARE = 0xFFFF
+
+
+def _paise(amount: float, what: str) -> int:
+    paise = round(amount * 100)
+    if amount < 0 or abs(amount * 100 - paise) > 1e-6:
+        raise ValueError(f"{what} must be a non-negative whole number of paise")
+    return paise
+
+
+def round_fare(paise: np.ndarray) -> np.ndarray:
+    """Paise → rupees rounded to the nearest ₹5, ties to even (as round())."""
+    fives, rem = np.divmod(paise, 500)
+    fives += (rem > 250) | ((rem == 250) & (fives % 2 == 1))
+    return fives * 5
+
+
+def concession_fares(fares: np.ndarray, pct: np.ndarray | int) -> np.ndarray:
+    """Truncated percentage discount, then nearest ₹5 (no ties on integers)."""
+    discounted = fares - fares * pct // 100
+    return (discounted + 2) // 5 * 5
+
+
+def validate_rates(fare_rates: dict, concession_rates: dict) -> None:
+    """Raise ValueError unless the tables are complete and sane."""
+    if DEFAULT_CLASS not in fare_rates:
+        raise ValueError(f"fare_rates must include the default class {DEFAULT_CLASS!r}")
+    for travel_class, rates in fare_rates.items():
+        _paise(rates["base"], f"{travel_class} base")
+        _paise(rates["per_km"], f"{travel_class} per_km")
+    for category, pct in concession_rates.items():
+        if not isinstance(pct, int) or not 0 <= pct <= 100:
+            raise ValueError(f"concession for {category!r} must be an integer 0-100")
+
+
+class FareSnapshot:
+    """Immutable, fully precomputed fare/concession tables for one rate set."""
+
+    __slots__ = (
+        "version", "built_at", "fare_rates", "concession_rates",
+        "classes", "categories", "_network", "_fares", "_concessions",
+        "_class_index", "_category_index",
+    )
+
+    def __init__(self, network, fare_rates: dict, concession_rates: dict, version: int):
+        validate_rates(fare_rates, concession_rates)
+        self._network = network
+        self.version = version
+        self.built_at = time.time()
+        self.fare_rates = MappingProxyType({k: dict(v) for k, v in fare_rates.items()})
+        self.concession_rates = MappingProxyType(dict(concession_rates))
+        self.classes = tuple(sorted(fare_rates))
+        self.categories = tuple(concession_rates)
+        self._class_index = {travel_class: i for i, travel_class in enumerate(self.classes)}
+        self._category_index = {category: i for i, category in enumerate(self.categories)}
+
+        # Pair × class base fares (zero-copy from the artifact if compatible)
+        n = len(network)
+        compiled = network.fare_tables(fare_rates)
+        if compiled is not None:
+            fares = np.asarray(compiled).reshape(len(self.classes), n * n)
+        else:
+            distances = np.asarray(memoryview(network.distances)).astype(np.int64)
+            reachable = distances != network.unreachable
+            fares = np.full((len(self.classes), n * n), NO_FARE, dtype=np.uint16)
+            for i, travel_class in enumerate(self.classes):
+                rates = fare_rates[travel_class]
+                paise = _paise(rates["base"], "base") + distances * _paise(rates["per_km"], "per_km")
+                fares[i, reachable] = round_fare(paise[reachable])
+            fares.flags.writeable = False
+        self._fares = fares
+
+        # Category × base fare concession fares (last row: unknown category)
+        max_fare = max(
+            int(fares[fares != NO_FARE].max(initial=0)),
+            *(self.fare_for_distance(DEFAULT_DISTANCE_KM, c) for c in self.classes),
+        )
+        pcts = np.array(
+            [*concession_rates.values(), DEFAULT_CONCESSION_PCT], dtype=np.int64,
+        )[:, None]
+        concessions = concession_fares(np.arange(max_fare + 1, dtype=np.int64)[None, :], pcts)
+        concessions.flags.writeable = False
+        self._concessions = concessions
+
+    # ── Scalar lookups ─────────────────────────────────────
+    def class_index(self, travel_class: str) -> int:
+        return self._class_index.get(travel_class, self._class_index[DEFAULT_CLASS])
+
+    def category_index(self, category: str) -> int:
+        return self._category_index.get(category, len(self.categories))
+
+    def concession_pct(self, category: str) -> int:
+        return self.concession_rates.get(category, DEFAULT_CONCESSION_PCT)
+
+    def fare_for_distance(self, distance_km: int, travel_class: str) -> int:
+        rates = self.fare_rates.get(travel_class) or self.fare_rates[DEFAULT_CLASS]
+        paise = _paise(rates["base"], "base") + distance_km * _paise(rates["per_km"], "per_km")
+        return int(round_fare(np.int64(paise)))
+
+    def fare(self, from_station: str, to_station: str, travel_class: str) -> int | None:
+        """Base fare for a known, connected station pair (else None)."""
+        a = self._network.station_id(from_station)
+        b = self._network.station_id(to_station)
+        if a is None or b is None:
+            return None
+        fare = int(self._fares[self.class_index(travel_class), a * len(self._network) + b])
+        return None if fare == NO_FARE else fare
+
+    def concession_fare(self, fare: int, category: str) -> int:
+        row = self.category_index(category)
+        if fare < self._concessions.shape[1]:
+            return int(self._concessions[row, fare])
+        return int(concession_fares(np.int64(fare), self.concession_pct(category)))
+
+    def quote(self, from_station: str, to_station: str, travel_class: str, category: str) -> dict:
+        """Original fare, concession fare and savings for one journey."""
+        original = self.fare(from_station, to_station, travel_class)
+        if original is None:
+            original = self.fare_for_distance(DEFAULT_DISTANCE_KM, travel_class)
+        concession = self.concession_fare(original, category)
+        return {
+            "original_fare": original,
+            "concession_fare": concession,
+            "savings": original - concession,
+            "savings_pct": self.concession_pct(category),
+        }
+
+    # ── Vectorized lookups ─────────────────────────────────
+    def quotes(self, src: np.ndarray, dst: np.ndarray, classes: np.ndarray,
+               categories: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(original, concession) fares for id arrays (-1 = unknown station)."""
+        n = len(self._network)
+        original = np.empty(len(src), dtype=np.int64)
+        known = (src >= 0) & (dst >= 0)
+        original[known] = self._fares[classes[known], src[known] * n + dst[known]]
+        fallback = ~known | (original == NO_FARE)
+        if fallback.any():
+            default = np.array([self.fare_for_distance(DEFAULT_DISTANCE_KM, c) for c in self.classes])
+            original[fallback] = default[classes[fallback]]
+        return original, self._concessions[categories, original]
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "built_at": self.built_at,
+            "fare_rates": dict(self.fare_rates),
+            "concession_rates": dict(self.concession_rates),
+            "stations": len(self._network),
+        }
+
+
+def read_rates(path: Path) -> tuple[dict, dict] | None:
+    """(fare_rates, concession_rates) from the rates file, None if absent."""
+    try:
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return data["fare_rates"], data["concession_rates"]
+
+
+class RatesStore:
+    """Holds the current FareSnapshot; rebuilds and swaps it on reload."""
+
+    def __init__(self, network, default_fare_rates: dict, default_concession_rates: dict,
+                 path: Path = RATES_PATH):
+        self.network = network
+        self.path = path
+        self._defaults = (default_fare_rates, default_concession_rates)
+        self._build_lock = threading.Lock()  # serializes builders, never readers
+        self._mtime = self._file_mtime()
+        rates = read_rates(path) or self._defaults
+        self.current = FareSnapshot(network, *rates, version=1)
+
+    def _file_mtime(self) -> float | None:
+        try:
+            return self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def reload(self) -> FareSnapshot:
+        """Rebuild from the rates file and swap atomically (ValueError if invalid)."""
+        with self._build_lock:
+            self._mtime = self._file_mtime()
+            try:
+                rates = read_rates(self.path) or self._defaults
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"invalid rates file {self.path}: {e}") from e
+            snapshot = FareSnapshot(self.network, *rates, version=self.current.version + 1)
+            self.current = snapshot  # the swap: one reference assignment
+        print(f"[fare-snapshot] rates v{snapshot.version} live")
+        # The network itself is not remapped: indexes elsewhere are built from it
+        superseded = getattr(self.network, "superseded", None)
+        if superseded is not None and superseded():
+            print("[fare-snapshot] a newer rail artifact is CURRENT — restart workers to map it")
+        return snapshot
+
+    async def reload_async(self) -> FareSnapshot:
+        """reload() on a worker thread so the event loop keeps serving."""
+        return await asyncio.to_thread(self.reload)
+
+    async def watch(self, interval: float = RATES_WATCH_INTERVAL) -> None:
+        """Background loop: reload whenever the rates file changes."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._file_mtime() == self._mtime:
+                continue
+            try:
+                await self.reload_async()
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[fare-snapshot] keeping v{self.current.version}: {e}")
@@ -0,0 +1,98 @@
+"""Geo Index — k nearest points (stations, bus stands) to any coordinate.
+
+Points are placed on the unit sphere as (x, y, z). Straight-line (chord)
+distance there orders points exactly like great-circle distance, so a plain
+3-d KD-tree answers "nearest stops to (lat, lon)" with no longitude scaling
+or antimeridian special cases:
+
+    • build    median split on the widest axis, kept as one flat implicit
+               tree (the node of a slice is its middle element), built once
+    • query    descend towards the query point, then visit a far half only
+               when its splitting plane is closer than the k-th best so far
+               (bounded max-heap); max_km becomes a chord bound up front
+    • result   (great-circle km, point id) pairs, nearest first
+
+A couple of hundred stops answer in microseconds.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit(lat: float, lon: float) -> tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoIndex:
+    """Static KD-tree over (lat, lon) points, ids are list positions."""
+
+    def __init__(self, points: list[tuple[float, float]]):
+        self.points = points
+        self._xyz = [_unit(lat, lon) for lat, lon in points]
+        self._order = list(range(len(points)))  # ids in tree layout
+        self._axis = [0] * len(points)          # split axis of each node
+        self._build(0, len(points))
+
+    def _build(self, lo: int, hi: int) -> None:
+        if hi - lo <= 1:
+            return
+        xyz = self._xyz
+        ids = self._order[lo:hi]
+        axis = max(range(3), key=lambda a: max(xyz[i][a] for i in ids) - min(xyz[i][a] for i in ids))
+        ids.sort(key=lambda i: xyz[i][axis])
+        self._order[lo:hi] = ids
+        mid = (lo + hi) // 2
+        self._axis[mid] = axis
+        self._build(lo, mid)
+        self._build(mid + 1, hi)
+
+    def nearest(self, lat: float, lon: float, k: int = 5,
+                max_km: float | None = None) -> list[tuple[float, int]]:
+        """Up to k (km, point id) pairs nearest to a coordinate, nearest first."""
+        if k <= 0 or not self.points:
+            return []
+        qx, qy, qz = query = _unit(lat, lon)
+        xyz, order, axes = self._xyz, self._order, self._axis
+        limit = math.inf
+        if max_km is not None:
+            limit = (2 * math.sin(min(math.pi, max_km / EARTH_RADIUS_KM) / 2)) ** 2
+        heap: list[tuple[float, int]] = []  # (-squared chord, id), worst on top
+
+        def visit(lo: int, hi: int) -> None:
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            point = order[mid]
+            x, y, z = xyz[point]
+            d2 = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+            if d2 <= limit:
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, point))
+                elif d2 < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d2, point))
+            axis = axes[mid]
+            diff = query[axis] - xyz[point][axis]
+            near, far = ((mid + 1, hi), (lo, mid)) if diff > 0 else ((lo, mid), (mid + 1, hi))
+            visit(*near)
+            bound = -heap[0][0] if len(heap) == k else limit
+            if diff * diff <= bound:
+                visit(*far)
+
+        visit(0, len(order))
+        return sorted((_chord_km(math.sqrt(-d2)), point) for d2, point in heap)
@@ -0,0 +1,291 @@
+"""Group Ledger — who owes whom in a trip group, kept up to date per entry.
+
+Any member can owe any other. Every entry updates two maintained views in
+place, so reads never replay the history:
+
+    • balances[m]      net ₹ per member (positive = is owed); an expense
+                       touches the payer and its participants only, a
+                       direct debt or payment touches two members — O(1)
+    • owed[a][b]       pairwise net (positive = b owes a), mirrored in
+                       owed[b][a]; a member's own debts are one dict walk
+    • pair_count       how many pairs currently owe each other, i.e. the
+                       payments needed without simplification
+
+Settlement suggestions come from debt_simplifier — "exact" (fewest
+payments, within a time budget) or "greedy" (two max-heaps, O(n log n)) —
+and are cached until the next entry, so a fest contingent of hundreds can
+poll `/api/campuspay/debts` freely.
+
+Entries are events: under the group's own lock each one gets the next
+per-group version as its sequence number, is committed to the ledger_log
+(SQLite, batched group commits across groups) and only then applied, so a
+failed write changes nothing and leaves no gap. Every LEDGER_SNAPSHOT_EVERY
+events the maintained views are snapshotted. A group is loaded on first use
+from its snapshot plus the events after it, so a restart replays only the
+tail. Recording blocks until the commit: call it from a worker thread.
+Importing opens nothing — the store stays in memory until main.lifespan
+calls ledgers.open().
+"""
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+
+from services.debt_simplifier import SETTLE_BUDGET_MS, settle_balances, settle_exact
+from services.ledger_log import LEDGER_DB_PATH, LEDGER_SNAPSHOT_EVERY, LedgerLog
+
+DEFAULT_GROUP = "hostel"
+CURRENT_USER = "You"
+
+# Mock hostel debts (would come from DB in production)
+_SEED_DEBTS = [
+    {"name": "Rahul", "amount": 120, "direction": "owes_you"},
+    {"name": "Priya", "amount": 30, "direction": "you_owe"},
+    {"name": "Amit", "amount": 85, "direction": "owes_you"},
+    {"name": "Neha", "amount": 45, "direction": "you_owe"},
+]
+
+
+def split_amount(amount: int, participants: list[str]) -> dict[str, int]:
+    """Equal shares in whole ₹; the first `amount % n` participants pay ₹1 more."""
+    base, extra = divmod(amount, len(participants))
+    return {person: base + (i < extra) for i, person in enumerate(participants)}
+
+
+class GroupLedger:
+    """Maintained net and pairwise balances for one group."""
+
+    def __init__(self, name: str, log: LedgerLog | None = None):
+        self.name = name
+        self.version = 0  # sequence number of the last applied event
+        self.balances: dict[str, int] = {}
+        self.owed: dict[str, dict[str, int]] = defaultdict(dict)
+        self.pair_count = 0
+        # mode -> (version, budget ms, payments, proven optimal)
+        self._settlements: dict[str, tuple[int, float, list[dict], bool]] = {}
+        self._lock = threading.Lock()
+        self._log = log
+
+    @property
+    def members(self) -> list[str]:
+        return list(self.balances)
+
+    def _owe(self, debtor: str, creditor: str, amount: int) -> None:
+        """debtor owes creditor `amount` more (negative: less)."""
+        if debtor == creditor or amount == 0:
+            return
+        self.balances[creditor] = self.balances.get(creditor, 0) + amount
+        self.balances[debtor] = self.balances.get(debtor, 0) - amount
+
+        before = self.owed[creditor].get(debtor, 0)
+        after = before + amount
+        self.pair_count += (after != 0) - (before != 0)
+        if after:
+            self.owed[creditor][debtor] = after
+            self.owed[debtor][creditor] = -after
+        else:
+            self.owed[creditor].pop(debtor, None)
+            self.owed[debtor].pop(creditor, None)
+
+    def _apply(self, kind: str, data: dict) -> None:
+        """Fold one event into the maintained views (live entries and replay)."""
+        if kind == "member":
+            self.balances.setdefault(data["name"], 0)
+        elif kind == "debt":
+            self._owe(data["debtor"], data["creditor"], data["amount"])
+        elif kind == "payment":
+            self._owe(data["payee"], data["payer"], data["amount"])
+        elif kind == "expense":
+            self.balances.setdefault(data["payer"], 0)
+            for person, share in data["shares"].items():
+                self.balances.setdefault(person, 0)
+                self._owe(person, data["payer"], share)
+        else:
+            raise ValueError(f"unknown ledger event {kind!r}")
+        self.version += 1
+
+    def _record(self, kind: str, data: dict) -> None:
+        """Commit an event to the log, then apply it; the caller holds the lock.
+
+        Raises the log's sqlite3.Error (nothing applied) if the commit fails.
+        """
+        if self._log is not None:
+            self._log.append(self.name, self.version + 1, kind, data).result()
+        self._apply(kind, data)
+        if self._log is not None and self.version % LEDGER_SNAPSHOT_EVERY == 0:
+            self._log.snapshot(self.name, self.version, self.state())
+
+    def state(self) -> dict:
+        """Snapshot of the maintained views (each pair once, as creditor -> debtor)."""
+        return {
+            "balances": dict(self.balances),
+            "owed": [[creditor, debtor, amount]
+                     for creditor, debts in self.owed.items()
+                     for debtor, amount in debts.items() if amount > 0],
+        }
+
+    def restore(self, version: int, state: dict | None, events: list[tuple[int, str, dict]]) -> None:
+        """Rebuild from a snapshot (None: empty) and the events after it."""
+        with self._lock:
+            self.balances = dict(state["balances"]) if state else {}
+            self.owed = defaultdict(dict)
+            for creditor, debtor, amount in state["owed"] if state else []:
+                self.owed[creditor][debtor] = amount
+                self.owed[debtor][creditor] = -amount
+            self.pair_count = len(state["owed"]) if state else 0
+            self.version = version
+            for seq, kind, data in events:
+                self._apply(kind, data)
+                self.version = seq
+            self._settlements.clear()
+
+    def add_member(self, name: str) -> None:
+        with self._lock:
+            if name not in self.balances:
+                self._record("member", {"name": name})
+
+    def record_debt(self, debtor: str, creditor: str, amount: int) -> None:
+        """A direct IOU: debtor owes creditor `amount` ₹."""
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        with self._lock:
+            self._record("debt", {"debtor": debtor, "creditor": creditor, "amount": amount})
+
+    def record_payment(self, payer: str, payee: str, amount: int) -> None:
+        """payer paid payee `amount` ₹ (settles debts, or creates a credit)."""
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        with self._lock:
+            self._record("payment", {"payer": payer, "payee": payee, "amount": amount})
+
+    def record_expense(self, payer: str, amount: int, participants: list[str] | None = None,
+                       shares: dict[str, int] | None = None) -> dict[str, int]:
+        """payer covered `amount` ₹ for participants (default: everyone, equal split).
+
+        `shares` gives exact ₹ per participant and must add up to `amount`.
+        Returns the shares used.
+        """
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        with self._lock:
+            if shares is None:
+                participants = participants or self.members or [payer]
+                shares = split_amount(amount, list(dict.fromkeys(participants)))
+            elif sum(shares.values()) != amount or any(share < 0 for share in shares.values()):
+                raise ValueError("shares must be non-negative and add up to the amount")
+            self._record("expense", {"payer": payer, "shares": shares})
+            return shares
+
+    def settle_pair(self, member: str, other: str) -> int:
+        """Record the payment that clears what two members owe each other; returns the ₹."""
+        with self._lock:
+            amount = self.owed.get(member, {}).get(other, 0)
+            if amount < 0:
+                self._record("payment", {"payer": member, "payee": other, "amount": -amount})
+            elif amount > 0:
+                self._record("payment", {"payer": other, "payee": member, "amount": amount})
+            return abs(amount)
+
+    def debts_of(self, member: str) -> list[dict]:
+        """A member's pairwise debts as Debt records ("owes_you" / "you_owe")."""
+        return [
+            {"name": other, "amount": abs(amount), "direction": "owes_you" if amount > 0 else "you_owe"}
+            for other, amount in self.owed.get(member, {}).items()
+        ]
+
+    def settlements(self, mode: str = "exact",
+                    budget_ms: float = SETTLE_BUDGET_MS) -> tuple[list[dict], bool]:
+        """(payments settling the whole group, proven optimal), cached per version.
+
+        A cached exact result that was cut short is recomputed only when a
+        later request allows a bigger budget.
+        """
+        cached = self._settlements.get(mode)
+        if (cached is not None and cached[0] == self.version
+                and (cached[3] or cached[1] >= budget_ms)):
+            return cached[2], cached[3]
+        with self._lock:
+            version, balances = self.version, dict(self.balances)
+        if mode == "greedy":
+            payments, optimal = settle_balances(balances), False
+        else:
+            payments, optimal = settle_exact(balances, budget_ms)
+        self._settlements[mode] = (version, budget_ms, payments, optimal)
+        return payments, optimal
+
+    def summary(self, member: str = CURRENT_USER, mode: str = "exact",
+                budget_ms: float = SETTLE_BUDGET_MS) -> dict:
+        """DebtResponse fields from the member's point of view."""
+        debts = self.debts_of(member)
+        simplified, optimal = self.settlements(mode, budget_ms)
+        return {
+            "debts": debts,
+            "original_count": self.pair_count,
+            "simplified_count": len(simplified),
+            "simplified_transactions": simplified,
+            "message": f"Instead of {self.pair_count} payments, only {len(simplified)} needed!",
+            "mode": mode,
+            "optimal": optimal,
+        }
+
+
+class LedgerStore:
+    """Named group ledgers, loaded from the event log (once opened) on first use."""
+
+    def __init__(self):
+        self.log: LedgerLog | None = None
+        self._groups: dict[str, GroupLedger] = {}
+        self._lock = threading.Lock()
+
+    def open(self, path: str = LEDGER_DB_PATH) -> None:
+        """Back the store with the event log at `path` (called from main.lifespan).
+
+        Ledgers held so far are dropped and re-read from the log; an empty
+        path keeps the store in memory.
+        """
+        with self._lock:
+            if not path or self.log is not None:
+                return
+            self.log = LedgerLog(path)
+            self._groups.clear()
+        _seed(self)
+
+    def get(self, name: str = DEFAULT_GROUP) -> GroupLedger:
+        ledger = self._groups.get(name)
+        if ledger is not None:
+            return ledger
+        with self._lock:
+            ledger = self._groups.get(name)
+            if ledger is None:
+                ledger = GroupLedger(name, self.log)
+                if self.log is not None:
+                    ledger.restore(*self.log.load(name))
+                self._groups[name] = ledger
+            return ledger
+
+    def names(self) -> list[str]:
+        if self.log is None:
+            return list(self._groups)
+        return list(dict.fromkeys([*self._groups, *self.log.groups()]))
+
+    def close(self) -> None:
+        """Flush pending log writes."""
+        if self.log is not None:
+            self.log.close()
+
+
+def _seed(store: LedgerStore) -> None:
+    """Mock hostel debts, unless the group already has history."""
+    hostel = store.get(DEFAULT_GROUP)
+    if hostel.version:
+        return
+    for debt in _SEED_DEBTS:
+        if debt["direction"] == "owes_you":
+            hostel.record_debt(debt["name"], CURRENT_USER, debt["amount"])
+        else:
+            hostel.record_debt(CURRENT_USER, debt["name"], debt["amount"])
+
+
+# Shared process-wide store: in memory until main.lifespan opens the log
+ledgers = LedgerStore()
+_seed(ledgers)
@@ -0,0 +1,214 @@
+"""Local Intent Router — answers fare/route questions without the LLM.
+
+A lot of CampusGPT traffic is really "Lucknow se Delhi sleeper kitna?" or
+"Patna ghar jaane ka route". Those have exact answers in-process
+(concession_engine.calculate_concession, route_trees.plan_route — the same
+timetable journeys as /api/gharwaapsi/route), so each message is classified
+first:
+
+    • keyword automata (one compiled regex per intent) spot fare / route /
+      open-ended planning words in Hinglish or English
+    • station entities are extracted token by token over the rail network's
+      station names and aliases (prayagraj, banaras, dilli, bombay …),
+      compared by phonetic key so spelling variants still hit
+    • "X se" / "from X" marks the origin, otherwise mention order decides
+
+Only fare/route intents with two distinct stations and no planning words are
+answered locally (a route naming one station is taken as campus → that
+station); everything else — including fares in classes with no
+rates (2A, 1A, EC) — falls through to the LLM. A route answer
+may build a route tree, so callers on the event loop run answer() in a
+worker thread.
+"""
+from __future__ import annotations
+
+import re
+
+from services.concession_engine import NETWORK, calculate_concession
+from services.knowledge_base import FOOTER, phonetic
+from services.route_trees import plan_route
+from services.timetable import get_timetable
+
+INTENT_FARE = "fare"
+INTENT_ROUTE = "route"
+
+_ROUTE_WORDS = re.compile(
+    r"\b(?:ghar|home|route|rasta|raasta|waapsi|wapsi|kaise\s+(?:jau|jaun|jaye|jayein|pahunch\w*)|"
+    r"how\s+(?:to|do\s+i)\s+(?:reach|get))\b",
+    re.IGNORECASE,
+)
+_FARE_WORDS = re.compile(
+    r"\b(?:kitna|kitne|kitni|fare|kiraya|kiraaya|price|ticket|concession|discount|rate)\b",
+    re.IGNORECASE,
+)
+# Open-ended planning — always left to the LLM
+_PLAN_WORDS = re.compile(
+    r"\b(?:trip|plan|itinerary|ghum\w*|hotel|stay|hostel|days?|din|nights?|"
+    r"log|logo|friends|budget|weekend|tour|explore)\b",
+    re.IGNORECASE,
+)
+_ORIGIN_BEFORE = {"from"}
+_ORIGIN_AFTER = {"se", "say"}
+
+_CLASSES = [
+    ("3A", re.compile(r"\b(?:3a|3ac|3\s+ac|3\s*tier|third\s+ac|3rd\s+ac|ac\s+3\s*tier)\b", re.IGNORECASE)),
+    ("CC", re.compile(r"\b(?:cc|chair\s*car|ac\s+chair)\b", re.IGNORECASE)),
+    ("2S", re.compile(r"\b(?:2s|second\s+sitting|sitting|general\s+coach)\b", re.IGNORECASE)),
+    ("SL", re.compile(r"\b(?:sl|sleeper)\b", re.IGNORECASE)),
+]
+# AC classes with no rates (1A, 2A, EC, bare "AC") — left to the LLM
+# rather than quoted as Sleeper
+_UNPRICED_CLASSES = re.compile(
+    r"\b(?:ac|1a|2a|1ac|2ac|[12]\s*tier|first\s+ac|second\s+ac|1st\s+ac|2nd\s+ac|ec|executive)\b",
+    re.IGNORECASE,
+)
+_CATEGORIES = [
+    ("SC/ST", re.compile(r"\b(?:sc|st|sc/st|scst)\b", re.IGNORECASE)),
+    ("PH", re.compile(r"\b(?:ph|divyang|disabled|handicapped)\b", re.IGNORECASE)),
+]
+_TOKEN = re.compile(r"[a-z]+")
+
+CLASS_NAMES = {"SL": "Sleeper", "2S": "Second Sitting", "CC": "AC Chair Car", "3A": "AC 3-Tier"}
+
+
+def _station_keys() -> dict[tuple[str, ...], str]:
+    """Phonetic token keys of every station name and alias (codes excluded:
+    short codes like ST/SC/BE collide with ordinary words)."""
+    keys: dict[tuple[str, ...], str] = {}
+    for station in NETWORK.stations:
+        for name in [station["name"], *station.get("aliases", [])]:
+            key = tuple(phonetic(tok) for tok in _TOKEN.findall(name.lower()))
+            keys.setdefault(key, station["name"])
+    return keys
+
+
+_STATION_KEYS = _station_keys()
+_MAX_ALIAS_TOKENS = max(len(key) for key in _STATION_KEYS)
+
+
+def _mentions(text: str) -> list[tuple[str, bool]]:
+    """Distinct stations in mention order, each with whether it is marked
+    as the origin ("X se", "from X")."""
+    tokens = _TOKEN.findall(text.lower())
+    keys = [phonetic(tok) for tok in tokens]
+    found: list[tuple[str, bool]] = []  # (station, marked as origin)
+
+    i = 0
+    while i < len(tokens):
+        for size in range(_MAX_ALIAS_TOKENS, 0, -1):
+            station = _STATION_KEYS.get(tuple(keys[i:i + size]))
+            if station is not None:
+                before = tokens[i - 1] if i else ""
+                after = tokens[i + size] if i + size < len(tokens) else ""
+                origin = before in _ORIGIN_BEFORE or after in _ORIGIN_AFTER
+                if all(station != seen for seen, _ in found):
+                    found.append((station, origin))
+                i += size
+                break
+        else:
+            i += 1
+
+    return found
+
+
+def mentioned_stations(text: str) -> list[str]:
+    """Every distinct station mentioned in a message, in order."""
+    return [station for station, _ in _mentions(text)]
+
+
+def extract_stations(text: str) -> tuple[str | None, str | None]:
+    """(origin, destination) stations mentioned in a message."""
+    found = _mentions(text)
+    if len(found) < 2:
+        return (found[0][0] if found else None), None
+    origins = [station for station, origin in found if origin]
+    if origins:
+        origin = origins[0]
+        destination = next(station for station, _ in found if station != origin)
+        return origin, destination
+    return found[0][0], found[1][0]
+
+
+def classify(text: str) -> str | None:
+    """Local intent for a message, or None to send it to the LLM."""
+    if _PLAN_WORDS.search(text):
+        return None
+    if _ROUTE_WORDS.search(text):
+        return INTENT_ROUTE
+    if _FARE_WORDS.search(text):
+        if _pick(_CLASSES, text, None) is None and _UNPRICED_CLASSES.search(text):
+            return None
+        return INTENT_FARE
+    return None
+
+
+def _pick(options: list[tuple[str, re.Pattern]], text: str, default: str | None) -> str | None:
+    for value, pattern in options:
+        if pattern.search(text):
+            return value
+    return default
+
+
+def _fare_reply(origin: str, destination: str, text: str) -> str:
+    travel_class = _pick(_CLASSES, text, "SL")
+    category = _pick(_CATEGORIES, text, "General")
+    result = calculate_concession(origin, destination, travel_class, category)
+    steps = "\n".join(result["steps"])
+    return (
+        f"🎫 {origin} → {destination}, {CLASS_NAMES[travel_class]}\n\n"
+        f"• Normal fare: ₹{result['original_fare']}\n"
+        f"• Student concession ({category}, {result['savings_pct']}%): ₹{result['concession_fare']}\n"
+        f"• Bachat: ₹{result['savings']} 🎉\n\n"
+        f"Concession kaise milega:\n{steps}\n\n{FOOTER}"
+    )
+
+
+def _route_reply(origin: str, destination: str, text: str) -> str:
+    category = _pick(_CATEGORIES, text, "General")
+    # Timetable journey (falls back to the fixed three-leg estimate itself)
+    route = plan_route(origin, destination, category, k=1)
+    steps = "\n".join(
+        f"{n}. {step['icon']} {step['from_location']}"
+        f"{' → ' + step['to_location'] if step['to_location'] else ''}"
+        f"{' (' + step['transport'] + ')' if step['transport'] else ''}: "
+        f"{step['price']} — {step['detail']}"
+        for n, step in enumerate(route["steps"], 1)
+    )
+    timing = ""
+    if route.get("depart_at"):
+        timing = (f"🕒 Niklo {route['depart_at']} · pahuncho {route['arrive_at']} "
+                  f"({route['duration']}, {route['transfers']} "
+                  f"change{'s' if route['transfers'] != 1 else ''})\n")
+    return (
+        f"🏠 Ghar ka route: {origin} → {destination}\n\n{steps}\n\n{timing}"
+        f"💸 Total: ₹{route['total_discounted']} (bina concession ₹{route['total_original']})\n"
+        f"{route['savings_text']}\n\n{FOOTER}"
+    )
+
+
+_REPLIES = {
+    INTENT_FARE: _fare_reply,
+    INTENT_ROUTE: _route_reply,
+}
+
+stats = {INTENT_FARE: 0, INTENT_ROUTE: 0, "llm": 0}
+
+
+def answer(message: str) -> tuple[str, bool] | None:
+    """Templated reply for fare/route questions; None = needs the LLM."""
+    intent = classify(message)
+    origin, destination = extract_stations(message) if intent else (None, None)
+    if intent == INTENT_ROUTE and origin is not None and destination is None:
+        # "Patna ghar jaane ka route" — home is the one station named
+        campus = get_timetable().campus_city
+        if origin != campus:
+            origin, destination = campus, origin
+    if intent is None or destination is None:
+        stats["llm"] += 1
+        return None
+    stats[intent] += 1
+    return _REPLIES[intent](origin, destination, message), False
+
+
+def snapshot() -> dict:
+    return dict(stats)
@@ -0,0 +1,683 @@
+"""Journey Planner — timetable-aware GharWaapsi routes (RAPTOR).
+
+Round k of the search finds the earliest arrival at every stop using at most
+k vehicles (RAPTOR, Delling et al.). Each round:
+
+    1. collects the routes through stops improved in the previous round,
+       each from the earliest such stop position
+    2. scans every collected route once, hopping on the earliest catchable
+       trip (a bisect on the precomputed departure column) and improving
+       arrivals further down the line
+    3. relaxes footpaths (station ↔ bus stand) from the improved stops
+
+No priority queue and no graph of timed events, so "leave after 6 PM
+Friday, arrive home earliest" over the week's ~80k trips takes a few
+milliseconds. A journey is campus shuttle (or any stop in the origin city)
+→ trains / buses → auto home:
+
+    • trains   fare from the live fare snapshot, student concession applied
+    • buses    the timetable's bus fare table (no concession)
+    • shuttle  route_planner.CAMPUS_BUS_FARE
+    • auto     to and from real coordinates when given: the ACCESS_STOPS
+               nearest stops (timetable GeoIndex) at each end, walked when
+               close, else an auto priced on the road distance; without
+               coordinates, the route_planner per-city last-mile estimate
+
+Alternatives (ParetoSearch) run the same rounds with a bag of labels per
+stop instead of one arrival — (arrival, ₹ after concession, vehicles) —
+keeping only labels no other label beats on all three (McRAPTOR). Labels
+that a label already at the destination dominates are dropped on sight, only
+the previous round's labels board again, and nothing arriving later than
+MAX_SLOWDOWN × the fastest trip is explored, so the bags stay small. The frontier is ranked fastest / cheapest / fewest
+changes first.
+
+With coordinates the search starts from every nearby stop at once (ready
+after the first mile, its fare already paid) and each destination stop's
+labels are compared with their last mile added, so a cheaper station
+further from home can lose to a nearer one.
+
+Requests are served through route_trees, which runs these searches once per
+origin and departure window for every hometown at once.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from services.concession_engine import NETWORK, current_rates
+from services.route_planner import CAMPUS_BUS_FARE, LAST_MILE_KM, _auto_fare, _estimate_auto_fare
+from services.timetable import Timetable, format_duration, format_minute, get_timetable
+
+MAX_RIDES = 5            # vehicles per journey, campus shuttle included
+MIN_CHANGE_MINUTES = 15  # to change between vehicles at the same stop
+AUTO_SPEED_KMPH = 20     # last-mile auto through city traffic
+WALK_SPEED_KMPH = 4.5
+WALK_KM = 1.0            # walk rather than take an auto up to this far
+ROAD_FACTOR = 1.3        # road km per straight-line km
+ACCESS_STOPS = 6         # nearest stops considered at each end of a door-to-door trip
+MAX_ACCESS_KM = 40
+MAX_SLOWDOWN = 2.0       # alternatives may take up to 2× the fastest trip
+MAX_ALTERNATIVES = 5
+
+CLASS_LABELS = {"SL": "Sleeper Class", "2S": "Second Sitting", "CC": "AC Chair Car", "3A": "AC 3-Tier"}
+_INF = 1 << 30
+
+
+class Mile:
+    """Getting between a coordinate (or a city's average address) and a stop."""
+
+    __slots__ = ("mode", "km", "minutes", "fare")
+
+    def __init__(self, mode: str, km: float, minutes: int, fare: int):
+        self.mode = mode  # "walk" | "auto"
+        self.km = km
+        self.minutes = minutes
+        self.fare = fare
+
+
+def _mile(road_km: float) -> Mile:
+    if road_km <= WALK_KM:
+        return Mile("walk", road_km, round(road_km / WALK_SPEED_KMPH * 60), 0)
+    return Mile("auto", road_km, round(road_km / AUTO_SPEED_KMPH * 60), _auto_fare(road_km))
+
+
+def city_mile(city: str) -> Mile:
+    """route_planner's per-city average auto ride."""
+    km = LAST_MILE_KM.get(city, 5)
+    return Mile("auto", km, round(km / AUTO_SPEED_KMPH * 60), _estimate_auto_fare(city))
+
+
+def nearby_miles(tt: Timetable, lat: float, lon: float) -> dict[int, Mile]:
+    """First/last mile to each of the nearest stops to a coordinate."""
+    return {
+        stop: _mile(round(km * ROAD_FACTOR, 1))
+        for km, stop in tt.nearest_stops(lat, lon, ACCESS_STOPS, MAX_ACCESS_KM)
+    }
+
+
+class Search:
+    """Labels of one RAPTOR run from a set of source stops.
+
+    rides[k][stop]  = (arrival, route, trip, board_pos, alight_pos, board_round)
+    walks[k][stop]  = (arrival, from_stop, minutes)
+    best[stop]      = earliest arrival over all rounds
+    """
+
+    def __init__(self, timetable: Timetable, sources: dict[int, int],
+                 targets: set[int] | None = None, max_rides: int = MAX_RIDES):
+        self.timetable = timetable
+        self.sources = sources
+        self.best: dict[int, int] = dict(sources)
+        self.best_round: dict[int, int] = dict.fromkeys(sources, 0)
+        self.rides: list[dict[int, tuple]] = [{}]
+        self.walks: list[dict[int, tuple]] = [{}]
+        self._targets = targets
+        self._run(max_rides)
+
+    def _bound(self) -> int:
+        """Arrivals later than the best target arrival can be pruned."""
+        if not self._targets:
+            return _INF
+        return min((self.best.get(stop, _INF) for stop in self._targets), default=_INF)
+
+    def _relax_footpaths(self, k: int, stops: list[int], marked: set[int]) -> None:
+        bound = self._bound()
+        walks = self.walks[k]
+        for stop in stops:
+            arrival = self.rides[k][stop][0] if k else self.sources[stop]
+            for neighbour, minutes in self.timetable.footpaths[stop]:
+                t = arrival + minutes
+                if t < self.best.get(neighbour, _INF) and t < bound:
+                    self.best[neighbour] = t
+                    self.best_round[neighbour] = k
+                    walks[neighbour] = (t, stop, minutes)
+                    marked.add(neighbour)
+
+    def _run(self, max_rides: int) -> None:
+        tt = self.timetable
+        marked = set(self.sources)
+        self._relax_footpaths(0, list(self.sources), marked)
+
+        for k in range(1, max_rides + 1):
+            ready = dict(self.best)           # τ(k-1): arrivals with < k vehicles
+            ready_round = dict(self.best_round)
+            change = MIN_CHANGE_MINUTES if k > 1 else 0
+
+            queue: dict[int, int] = {}
+            for stop in marked:
+                for route, position in tt.stop_routes[stop]:
+                    if position < queue.get(route, _INF):
+                        queue[route] = position
+            marked = set()
+            rides: dict[int, tuple] = {}
+            self.rides.append(rides)
+            self.walks.append({})
+            bound = self._bound()
+
+            for route, first in queue.items():
+                stops = tt.route_stops[route]
+                departures = tt.departures[route]
+                arrivals = tt.arrivals[route]
+                trip = board = board_round = -1
+                for i in range(first, len(stops)):
+                    stop = stops[i]
+                    if trip >= 0:
+                        t = arrivals[i][trip]
+                        if t < self.best.get(stop, _INF) and t < bound:
+                            self.best[stop] = t
+                            self.best_round[stop] = k
+                            rides[stop] = (t, route, trip, board, i, board_round)
+                            marked.add(stop)
+                            if self._targets and stop in self._targets:
+                                bound = t
+                    at = ready.get(stop)
+                    if at is None or i == len(stops) - 1:
+                        continue
+                    at += change
+                    column = departures[i]
+                    if trip < 0 or at <= column[trip]:
+                        earlier = bisect_left(column, at, 0, trip if trip >= 0 else len(column))
+                        if earlier < (trip if trip >= 0 else len(column)):
+                            trip, board, board_round = earlier, i, ready_round[stop]
+
+            self._relax_footpaths(k, list(rides), marked)
+            if not marked:
+                break
+
+    def legs(self, stop: int) -> list[dict]:
+        """Reconstruct the journey to a reached stop, first leg first."""
+        legs: list[dict] = []
+        k = self.best_round[stop]
+        while True:
+            walk = self.walks[k].get(stop)
+            if walk is not None:
+                arrival, origin, minutes = walk
+                legs.append({"kind": "walk", "from": origin, "to": stop,
+                             "depart": arrival - minutes, "arrive": arrival})
+                stop = origin
+            if k == 0:
+                break
+            _, route, trip, board, alight, board_round = self.rides[k][stop]
+            tt = self.timetable
+            legs.append({
+                "kind": "ride", "route": route,
+                "from": tt.route_stops[route][board], "to": stop,
+                "depart": tt.departures[route][board][trip],
+                "arrive": tt.arrivals[route][alight][trip],
+            })
+            stop = tt.route_stops[route][board]
+            k = board_round
+        legs.reverse()
+        return legs
+
+
+class Label:
+    """One non-dominated way of reaching a stop."""
+
+    __slots__ = ("stop", "arrival", "cost", "rides", "leg", "prev")
+
+    def __init__(self, stop: int, arrival: int, cost: int, rides: int,
+                 leg: tuple | None = None, prev: Label | None = None):
+        self.stop = stop
+        self.arrival = arrival
+        self.cost = cost
+        self.rides = rides
+        self.leg = leg    # ("ride", route, trip, board_pos, alight_pos) | ("walk", minutes)
+        self.prev = prev
+
+    def dominated_by(self, other: Label) -> bool:
+        return (other.arrival <= self.arrival and other.cost <= self.cost
+                and other.rides <= self.rides)
+
+
+class ParetoSearch:
+    """Multi-criteria RAPTOR: Pareto bags over (arrival, ₹, vehicles)."""
+
+    def __init__(self, timetable: Timetable, sources: dict[int, int], targets: set[int],
+                 category: str, arrival_limit: int = _INF, max_rides: int = MAX_RIDES,
+                 source_costs: dict[int, int] | None = None):
+        self.timetable = timetable
+        self.targets = targets
+        self.arrival_limit = arrival_limit
+        self._category = category
+        self._rates = current_rates()
+        self._fares = _fare_memo(self._rates.version, category)
+        source_costs = source_costs or {}
+        self.bags: dict[int, list[Label]] = {
+            stop: [Label(stop, depart, source_costs.get(stop, 0), 0)] for stop, depart in sources.items()
+        }
+        self._run(max_rides)
+
+    def _fare(self, route: int, board: int, alight: int) -> int:
+        key = (route, board, alight)
+        fare = self._fares.get(key)
+        if fare is None:
+            stops = self.timetable.route_stops[route]
+            fare = _leg_price(self.timetable, route, stops[board], stops[alight],
+                              self._category, self._rates)[1]
+            self._fares[key] = fare
+        return fare
+
+    def _alight(self, route: int, i: int, stop: int, arrivals, riding: list,
+                new: list[Label], marked: set[int]) -> list:
+        """Labels for getting off at stop i; returns the pruned route bag.
+
+        Riders that boarded at the same stop pay the same fare from here on,
+        so among those one on a later trip that has paid no less and used no
+        fewer vehicles can never win and is dropped.
+        """
+        candidates = []
+        for entry in riding:
+            trip, board, prev = entry
+            t = arrivals[trip]
+            if t > self.arrival_limit:
+                continue  # later stops are later still
+            candidates.append((t, prev.cost + self._fare(route, board, i), prev.rides + 1, entry))
+        candidates.sort(key=lambda c: (c[0], c[1], c[2]))
+
+        kept: list[tuple] = []
+        for candidate in candidates:
+            t, cost, rides, entry = candidate
+            board = entry[1]
+            if any(k[3][1] == board and k[1] <= cost and k[2] <= rides for k in kept):
+                continue  # kept riders arrive no later (sorted)
+            kept.append(candidate)
+            trip, board, prev = entry
+            label = Label(stop, t, cost, rides, ("ride", route, trip, board, i), prev)
+            if self._insert(label):
+                new.append(label)
+                marked.add(stop)
+        return [candidate[3] for candidate in kept]
+
+    def _pruned(self, label: Label) -> bool:
+        if label.arrival > self.arrival_limit:
+            return True
+        for stop in self.targets:
+            for other in self.bags.get(stop, ()):
+                if label.dominated_by(other):
+                    return True
+        return False
+
+    def _insert(self, label: Label) -> bool:
+        """Add to the stop's bag unless dominated; evict labels it dominates."""
+        bag = self.bags.setdefault(label.stop, [])
+        for other in bag:
+            if label.dominated_by(other):
+                return False
+        if self._pruned(label):
+            return False
+        bag[:] = [other for other in bag if not other.dominated_by(label)]
+        bag.append(label)
+        return True
+
+    def _relax_footpaths(self, new: list[Label], marked: set[int]) -> list[Label]:
+        walks = []
+        for label in new:
+            for neighbour, minutes in self.timetable.footpaths[label.stop]:
+                walk = Label(neighbour, label.arrival + minutes, label.cost, label.rides,
+                             ("walk", minutes), label)
+                if self._insert(walk):
+                    walks.append(walk)
+                    marked.add(neighbour)
+        return walks
+
+    def _run(self, max_rides: int) -> None:
+        tt = self.timetable
+        new = [label for bag in self.bags.values() for label in bag]
+        marked = set(self.bags)
+        new += self._relax_footpaths(new, marked)
+
+        for _ in range(max_rides):
+            # Only labels from the last round need to board: older ones
+            # already boarded every route through their stop back then
+            boarding: dict[int, list[Label]] = {}
+            for label in new:
+                if not self._pruned(label):  # targets may have improved since
+                    boarding.setdefault(label.stop, []).append(label)
+            queue: dict[int, int] = {}
+            for stop in marked:
+                for route, position in tt.stop_routes[stop]:
+                    if position < queue.get(route, _INF):
+                        queue[route] = position
+            marked = set()
+            new = []
+
+            for route, first in queue.items():
+                stops = tt.route_stops[route]
+                departures = tt.departures[route]
+                arrivals = tt.arrivals[route]
+                riding: list[tuple[int, int, Label]] = []  # route bag: (trip, board_pos, label)
+                for i in range(first, len(stops)):
+                    stop = stops[i]
+                    if riding:
+                        riding = self._alight(route, i, stop, arrivals[i], riding, new, marked)
+                    if i == len(stops) - 1 or stop not in boarding:
+                        continue
+                    column = departures[i]
+                    for prev in boarding[stop]:
+                        trip = bisect_left(column, prev.arrival + (MIN_CHANGE_MINUTES if prev.rides else 0))
+                        if trip < len(column):
+                            riding.append((trip, i, prev))
+
+            new += self._relax_footpaths(new, marked)
+            if not marked:
+                break
+
+    def frontier(self, targets: set[int] | None = None, arrival_limit: int = _INF,
+                 egress: dict[int, Mile] | None = None) -> list[Label]:
+        """Non-dominated journeys across target stops (default: the search's).
+
+        With `egress` the targets are its stops, and each label is compared
+        with that stop's last mile added (arrival_limit then applies at home).
+        """
+        if egress is not None:
+            targets = set(egress)
+        elif targets is None:
+            targets = self.targets
+        scored = []
+        for stop in targets:
+            mile = egress[stop] if egress is not None else None
+            minutes, fare = (mile.minutes, mile.fare) if mile is not None else (0, 0)
+            for label in self.bags.get(stop, ()):
+                if label.rides and label.arrival + minutes <= arrival_limit:
+                    scored.append((label.arrival + minutes, label.cost + fare, label.rides, label))
+        scored.sort(key=lambda entry: entry[:3])
+
+        kept: list[tuple[int, int]] = []
+        frontier: list[Label] = []
+        for _, cost, rides, label in scored:
+            if any(c <= cost and r <= rides for c, r in kept):
+                continue  # kept journeys arrive no later (sorted)
+            kept.append((cost, rides))
+            frontier.append(label)
+        return frontier
+
+
+_fare_memos: dict[tuple[int, str], dict] = {}
+
+
+def _fare_memo(rates_version: int, category: str) -> dict:
+    """Student leg fares by (route, board, alight), shared until rates reload."""
+    key = (rates_version, category)
+    memo = _fare_memos.get(key)
+    if memo is None:
+        for stale in [k for k in _fare_memos if k[0] != rates_version]:
+            del _fare_memos[stale]
+        memo = _fare_memos[key] = {}
+    return memo
+
+
+def _label_legs(tt: Timetable, label: Label) -> list[dict]:
+    """Journey legs ending in a label, first leg first."""
+    legs: list[dict] = []
+    while label.prev is not None:
+        prev = label.prev
+        if label.leg[0] == "walk":
+            legs.append({"kind": "walk", "from": prev.stop, "to": label.stop,
+                         "depart": prev.arrival, "arrive": label.arrival})
+        else:
+            _, route, trip, board, _ = label.leg
+            legs.append({"kind": "ride", "route": route, "from": prev.stop, "to": label.stop,
+                         "depart": tt.departures[route][board][trip], "arrive": label.arrival})
+        label = prev
+    legs.reverse()
+    return legs
+
+
+def _city(name: str) -> str | None:
+    """Canonical network city for a name, code or alias."""
+    station = NETWORK.station_id(name)
+    return None if station is None else NETWORK.names[station]
+
+
+def _sources(tt: Timetable, city: str, depart: int) -> dict[int, int]:
+    if city == tt.campus_city:
+        return {tt.campus_stop: depart}
+    return dict.fromkeys(tt.city_stops.get(city, []), depart)
+
+
+def _round_fare(amount: float) -> int:
+    return int(round(amount / 5) * 5)
+
+
+def _leg_price(tt: Timetable, route_id: int, from_stop: int, to_stop: int,
+               category: str, rates) -> tuple[int, int]:
+    """(original ₹, student ₹) for riding a route between two stops."""
+    route = tt.routes[route_id]
+    if route["mode"] == "shuttle":
+        return CAMPUS_BUS_FARE, CAMPUS_BUS_FARE
+    if route["mode"] == "bus":
+        rates_for = tt.bus_fares.get(route["class"], {"base": 0, "per_km": 1})
+        fare = _round_fare(rates_for["base"] + route.get("km", 0) * rates_for["per_km"])
+        return fare, fare
+
+    a, b = tt.stops[from_stop]["id"], tt.stops[to_stop]["id"]
+    original = rates.fare(a, b, route["class"])
+    if original is None:
+        original = rates.fare_for_distance(NETWORK.distance(a, b) or 0, route["class"])
+    return original, rates.concession_fare(original, category)
+
+
+def _leg_fares(tt: Timetable, leg: dict, category: str, rates) -> tuple[int, int, dict]:
+    """(original ₹, student ₹, display fields) for one leg."""
+    if leg["kind"] == "walk":
+        return 0, 0, {
+            "icon": "🚶",
+            "transport": f"Transfer ({leg['arrive'] - leg['depart']} min)",
+            "detail": "Walk / shared auto between station and bus stand",
+        }
+
+    route = tt.routes[leg["route"]]
+    original, student = _leg_price(tt, leg["route"], leg["from"], leg["to"], category, rates)
+    times = f"{format_minute(leg['depart'])} → {format_minute(leg['arrive'])}"
+    if route["mode"] == "shuttle":
+        return original, student, {"icon": "🏫", "transport": "🚌 Campus Shuttle", "detail": times}
+    if route["mode"] == "bus":
+        return original, student, {"icon": "🚍", "transport": route["name"], "detail": times}
+
+    label = CLASS_LABELS.get(route["class"], route["class"])
+    return original, student, {
+        "icon": "🚂",
+        "transport": f"{route['name']} · {label}",
+        "detail": f"{times} · {rates.concession_pct(category)}% Student Concession Applied!",
+        "badge": True,
+    }
+
+
+def _mile_step(mile: Mile, from_name: str, to_name: str, detail: str) -> dict:
+    if mile.mode == "walk":
+        return {"icon": "🚶", "from_location": from_name, "transport": "Walk", "to_location": to_name,
+                "price": "₹0", "detail": f"{mile.km:g} km · {detail}", "badge": False}
+    return {"icon": "🛺", "from_location": from_name, "transport": "Auto / cab", "to_location": to_name,
+            "price": f"₹{mile.fare}", "detail": f"{mile.km:g} km by road via Ola/Uber · {detail}",
+            "badge": False}
+
+
+def journey_response(tt: Timetable, legs: list[dict], to_city: str, category: str,
+                     first_mile: Mile | None = None, last_mile: Mile | None = None) -> dict:
+    """RouteResponse fields for a reconstructed journey (plus the way home).
+
+    Without a `last_mile` (coordinates), home is the city's average auto ride.
+    """
+    rates = current_rates()
+    steps = []
+    total_original = total_discounted = 0
+    leave_at = legs[0]["depart"]
+    if first_mile is not None:
+        leave_at -= first_mile.minutes
+        total_original += first_mile.fare
+        total_discounted += first_mile.fare
+        steps.append(_mile_step(first_mile, "Your location", tt.stop_name(legs[0]["from"]),
+                                f"leave by {format_minute(leave_at)}"))
+    for leg in legs:
+        original, student, display = _leg_fares(tt, leg, category, rates)
+        total_original += original
+        total_discounted += student
+        from_name = tt.stop_name(leg["from"])
+        to_name = tt.stop_name(leg["to"])
+        if leg["kind"] == "ride" and tt.routes[leg["route"]]["mode"] != "shuttle":
+            from_name = f"{tt.stop_city(leg['from'])} → {tt.stop_city(leg['to'])}"
+            to_name = ""
+        steps.append({
+            "icon": display["icon"],
+            "from_location": from_name,
+            "transport": display["transport"],
+            "to_location": to_name,
+            "price": f"₹{student}",
+            "detail": display["detail"],
+            "badge": display.get("badge", False),
+        })
+
+    mile = last_mile or city_mile(to_city)
+    home_at = legs[-1]["arrive"] + mile.minutes
+    total_original += mile.fare
+    total_discounted += mile.fare
+    if last_mile is None:
+        steps.append({
+            "icon": "🛺",
+            "from_location": f"Auto from {tt.stop_name(legs[-1]['to'])}",
+            "transport": "",
+            "to_location": "Home",
+            "price": f"₹{mile.fare}",
+            "detail": f"Estimated fare via Ola/Uber · home by {format_minute(home_at)}",
+            "badge": False,
+        })
+    else:
+        steps.append(_mile_step(last_mile, tt.stop_name(legs[-1]["to"]), "Home",
+                                f"home by {format_minute(home_at)}"))
+
+    savings = total_original - total_discounted
+    vehicles = sum(1 for leg in legs if leg["kind"] == "ride")
+    return {
+        "steps": steps,
+        "total_original": total_original,
+        "total_discounted": total_discounted,
+        "savings": savings,
+        "savings_text": f"You save ₹{savings} with student concession! 🎉",
+        "depart_at": format_minute(leave_at),
+        "arrive_at": format_minute(home_at),
+        "duration": format_duration(home_at - leave_at),
+        "transfers": max(0, vehicles - 1),
+    }
+
+
+def _endpoints(from_city: str, to_city: str, depart: int) -> tuple[Timetable, str, dict, set] | None:
+    """(timetable, destination city, sources, targets) or None if not routable."""
+    tt = get_timetable()
+    origin, destination = _city(from_city), _city(to_city)
+    if origin is None or destination is None or origin == destination:
+        return None
+    sources = _sources(tt, origin, depart)
+    targets = set(tt.city_stops.get(destination, []))
+    if not sources or not targets:
+        return None
+    return tt, destination, sources, targets
+
+
+def _fastest(search: Search, targets: set[int]) -> int | None:
+    reached = [(search.best[stop], search.best_round[stop], stop) for stop in targets if stop in search.best]
+    return min(reached)[2] if reached else None
+
+
+def earliest_journey(from_city: str, to_city: str, depart: int,
+                     category: str = "General") -> dict | None:
+    """Earliest-arrival journey leaving at or after `depart` (timetable minute)."""
+    endpoints = _endpoints(from_city, to_city, depart)
+    if endpoints is None:
+        return None
+    tt, destination, sources, targets = endpoints
+    search = Search(tt, sources, targets)
+    stop = _fastest(search, targets)
+    if stop is None:
+        return None
+    return journey_response(tt, search.legs(stop), destination, category)
+
+
+def _ranked(options: list[dict], k: int) -> list[dict]:
+    """Fastest, cheapest and fewest-changes first, then by arrival."""
+    by_arrival = sorted(options, key=lambda o: (o["_home_at"], o["total_discounted"], o["transfers"]))
+    picks = {
+        "Fastest": by_arrival[0],
+        "Cheapest": min(by_arrival, key=lambda o: (o["total_discounted"], o["_home_at"])),
+        "Fewest changes": min(by_arrival, key=lambda o: (o["transfers"], o["_home_at"])),
+    }
+    ranked: list[dict] = []
+    for tag, option in picks.items():
+        option.setdefault("tags", []).append(tag)
+        if option not in ranked:
+            ranked.append(option)
+    ranked += [option for option in by_arrival if option not in ranked]
+    for option in ranked:
+        option.setdefault("tags", [])
+        del option["_home_at"]
+    return ranked[:k]
+
+
+def slowdown_limit(depart: int, fastest_arrival: int) -> int:
+    """Latest arrival worth offering, given the fastest trip."""
+    return depart + int((fastest_arrival - depart) * MAX_SLOWDOWN)
+
+
+def ranked_journeys(tt: Timetable, labels: list[Label], destination: str, category: str,
+                    k: int = MAX_ALTERNATIVES, access: dict[int, Mile] | None = None,
+                    egress: dict[int, Mile] | None = None) -> list[dict]:
+    """Journey responses for frontier labels, ranked and cut to k."""
+    options = []
+    for label in labels:
+        legs = _label_legs(tt, label)
+        first = access.get(legs[0]["from"]) if access else None
+        last = egress.get(label.stop) if egress else None
+        option = journey_response(tt, legs, destination, category, first, last)
+        option["_home_at"] = label.arrival + (last.minutes if last else 0)
+        options.append(option)
+    return _ranked(options, max(1, min(k, MAX_ALTERNATIVES))) if options else []
+
+
+def door_limit(search: Search, depart: int, egress: dict[int, Mile]) -> int | None:
+    """slowdown_limit at home for the fastest way to any egress stop (None if unreached)."""
+    reached = [
+        search.best[stop] + mile.minutes for stop, mile in egress.items()
+        if search.best_round.get(stop, 0) > 0
+    ]
+    return slowdown_limit(depart, min(reached)) if reached else None
+
+
+def journey_alternatives(from_city: str, to_city: str, depart: int,
+                         category: str = "General", k: int = 3) -> list[dict]:
+    """Up to k Pareto-optimal journeys (₹ after concession / arrival / changes)."""
+    endpoints = _endpoints(from_city, to_city, depart)
+    if endpoints is None:
+        return []
+    tt, destination, sources, targets = endpoints
+
+    fastest = Search(tt, sources, targets)
+    stop = _fastest(fastest, targets)
+    if stop is None:
+        return []
+    limit = slowdown_limit(depart, fastest.best[stop])
+
+    search = ParetoSearch(tt, sources, targets, category, arrival_limit=limit)
+    return ranked_journeys(tt, search.frontier(), destination, category, k)
+
+
+def door_to_door(origin: tuple[float, float], home: tuple[float, float] | None, to_city: str,
+                 depart: int, category: str = "General", k: int = 3) -> list[dict]:
+    """Ranked journeys from a coordinate to a coordinate (or to `to_city`)."""
+    tt = get_timetable()
+    access = nearby_miles(tt, *origin)
+    if home is not None:
+        egress = nearby_miles(tt, *home)
+    else:
+        destination = _city(to_city)
+        egress = {stop: city_mile(destination) for stop in tt.city_stops.get(destination, [])} if destination else {}
+    if not access or not egress:
+        return []
+    destination = tt.stop_city(min(egress, key=lambda stop: egress[stop].km))
+
+    sources = {stop: depart + mile.minutes for stop, mile in access.items()}
+    limit = door_limit(Search(tt, sources), depart, egress)
+    if limit is None:
+        return []
+    search = ParetoSearch(tt, sources, set(), category, arrival_limit=limit,
+                          source_costs={stop: mile.fare for stop, mile in access.items()})
+    return ranked_journeys(tt, search.frontier(arrival_limit=limit, egress=egress),
+                           destination, category, k, access=access,
+                           egress=egress if home is not None else None)
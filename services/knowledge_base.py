@@ -0,0 +1,220 @@
+"""Offline Knowledge Base — BM25 search over local destination guides.
+
+Used when the LLM providers are down or deliberately shed: answers come from
+an in-process inverted index with zero network calls.
+
+Guides are JSON files in data/guides/ (override with CAMPUSGPT_KB_DIR); each
+file holds a list of {name, region, aliases, tags, price_per_person, guide}.
+
+Matching is Hinglish- and transliteration-tolerant:
+    • Hinglish filler words ("se", "jana", "kitna", "plan") are dropped
+    • tokens are reduced to a phonetic key (hrishikesh → risikes,
+      benaras/benares sh/s, aa/a, oo/u …), so spelling variants hit the
+      same posting
+    • unseen tokens fall back to their consonant skeleton (masoori and
+      mussoorie → msr) to find close vocabulary terms
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+KB_DIR = Path(os.getenv(
+    "CAMPUSGPT_KB_DIR",
+    Path(__file__).resolve().parent.parent / "data" / "guides",
+))
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights (implemented as term-frequency boosts)
+NAME_WEIGHT = 3
+REGION_WEIGHT = 2
+TAG_WEIGHT = 2
+
+SKELETON_MIN_LEN = 5
+SKELETON_MATCH_WEIGHT = 0.8
+
+FOOTER = "Paytm se book karo, cashback milega! 💙"
+
+STOPWORDS = {
+    # English
+    "a", "an", "the", "to", "for", "of", "in", "on", "and", "or", "with", "from",
+    "me", "my", "i", "we", "us", "is", "are", "be", "how", "what", "which", "best",
+    "plan", "trip", "travel", "tour", "guide", "please", "want", "go", "going",
+    "days", "day", "nights", "night", "people", "friends", "budget", "cheap",
+    # Hinglish
+    "se", "ka", "ki", "ke", "ko", "hai", "hain", "mein", "me", "pe", "par", "aur",
+    "jana", "jaana", "jao", "jaye", "chalo", "chal", "ghum", "ghumna",
+    "kaise", "kya", "kitna", "kitne", "kab", "kaha", "kahan", "bhai", "yaar",
+    "bata", "batao", "bana", "banao", "chahiye", "log", "logo", "logon", "din",
+    "raat", "hum", "mujhe", "humko", "wala", "wali", "ek", "do", "teen",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_REPEATS = re.compile(r"(.)\1+")
+_ASPIRATED = re.compile(r"([bcdgjkpt])h")
+_VOWELS = re.compile(r"[aeiouy]")
+
+_PHONETIC_RULES = [
+    ("ph", "f"), ("ck", "k"), ("sh", "s"), ("w", "v"), ("z", "j"), ("q", "k"),
+    ("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"), ("ou", "u"), ("aa", "a"),
+]
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens without Hinglish/English filler words or numbers."""
+    return [
+        tok for tok in _TOKEN.findall(text.lower())
+        if tok not in STOPWORDS and not tok.isdigit()
+    ]
+
+
+def phonetic(token: str) -> str:
+    """Transliteration-tolerant key: hrishikesh/rishikesh → risikes."""
+    key = token
+    if len(key) > 2 and key[0] == "h" and key[1] not in "aeiouy":
+        key = key[1:]  # hr-/hm- initial clusters
+    for src, dst in _PHONETIC_RULES:
+        key = key.replace(src, dst)
+    key = _ASPIRATED.sub(r"\1", key)  # kh→k, bh→b, th→t ...
+    key = _REPEATS.sub(r"\1", key)
+    if len(key) > 3 and key.endswith(("ie", "ee")):
+        key = key[:-2] + "i"
+    return key
+
+
+def skeleton(key: str) -> str:
+    """Consonant skeleton of a phonetic key (first letter kept)."""
+    return key[:1] + _VOWELS.sub("", key[1:])
+
+
+class GuideIndex:
+    """Inverted index with BM25 ranking over destination guides."""
+
+    def __init__(self, guides: list[dict]):
+        self.guides = guides
+        self._postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self._skeletons: dict[str, set[str]] = defaultdict(set)
+        self._doc_len: list[int] = []
+        # First phonetic key of each name/alias → (doc_id, alias keys)
+        self._aliases: dict[str, list[tuple[int, tuple[str, ...]]]] = defaultdict(list)
+
+        for doc_id, guide in enumerate(guides):
+            terms: Counter[str] = Counter()
+            names = [guide["name"], *guide.get("aliases", [])]
+            for name in names:
+                keys = tuple(phonetic(tok) for tok in tokenize(name))
+                if keys:
+                    self._aliases[keys[0]].append((doc_id, keys))
+                for key in keys:
+                    terms[key] += NAME_WEIGHT
+            for tok in tokenize(guide.get("region", "")):
+                terms[phonetic(tok)] += REGION_WEIGHT
+            for tag in guide.get("tags", []):
+                for tok in tokenize(tag):
+                    terms[phonetic(tok)] += TAG_WEIGHT
+            for tok in tokenize(guide.get("guide", "")):
+                terms[phonetic(tok)] += 1
+
+            for term, tf in terms.items():
+                self._postings[term].append((doc_id, tf))
+                if len(term) >= SKELETON_MIN_LEN:
+                    self._skeletons[skeleton(term)].add(term)
+            self._doc_len.append(sum(terms.values()))
+
+        n_docs = max(1, len(guides))
+        self._avg_len = sum(self._doc_len) / n_docs if self._doc_len else 1.0
+        self._idf = {
+            term: math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.guides)
+
+    def _query_terms(self, query: str) -> dict[str, float]:
+        """Query phonetic keys (with skeleton expansions) → weight."""
+        terms: dict[str, float] = {}
+        for tok in tokenize(query):
+            key = phonetic(tok)
+            if key in self._postings:
+                terms[key] = 1.0
+            elif len(key) >= SKELETON_MIN_LEN:
+                for term in self._skeletons.get(skeleton(key), ()):
+                    terms.setdefault(term, SKELETON_MATCH_WEIGHT)
+        return terms
+
+    def _scores(self, query_terms: dict[str, float]) -> dict[int, float]:
+        scores: dict[int, float] = defaultdict(float)
+        for term, weight in query_terms.items():
+            idf = self._idf[term]
+            for doc_id, tf in self._postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[doc_id] / self._avg_len)
+                scores[doc_id] += weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, k: int = 5) -> list[tuple[float, dict]]:
+        """Top-k guides by BM25 score (score > 0 only)."""
+        scores = self._scores(self._query_terms(query))
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, self.guides[doc_id]) for doc_id, score in top if score > 0]
+
+    def match_destination(self, query: str) -> dict | None:
+        """Guide whose name or alias appears in the query (best BM25 wins)."""
+        query_terms = self._query_terms(query)
+        if not query_terms:
+            return None
+        matched = {
+            doc_id
+            for term in query_terms
+            for doc_id, alias in self._aliases.get(term, ())
+            if all(key in query_terms for key in alias)
+        }
+        if not matched:
+            return None
+        scores = self._scores(query_terms)
+        return self.guides[max(matched, key=lambda doc_id: scores[doc_id])]
+
+
+def load_guides(kb_dir: Path = KB_DIR) -> list[dict]:
+    """Read every *.json guide file in the knowledge-base directory."""
+    guides: list[dict] = []
+    if not kb_dir.is_dir():
+        print(f"[knowledge-base] {kb_dir} not found, offline answers disabled")
+        return guides
+    for path in sorted(kb_dir.glob("*.json")):
+        with path.open(encoding="utf-8") as f:
+            guides.extend(json.load(f))
+    return guides
+
+
+_index: GuideIndex | None = None
+
+
+def get_index() -> GuideIndex:
+    """Shared index, built on first use."""
+    global _index
+    if _index is None:
+        _index = GuideIndex(load_guides())
+        print(f"[knowledge-base] indexed {len(_index)} destination guides")
+    return _index
+
+
+def destination_answer(message: str) -> tuple[str, bool] | None:
+    """Full offline guide if the message names a known destination."""
+    guide = get_index().match_destination(message)
+    if guide is None:
+        return None
+    return f"{guide['guide']}\n\n{FOOTER}", True
+
+
+def suggestions(message: str, k: int = 6) -> list[dict]:
+    """Guides relevant to a vague request ("beach trip", "pahad weekend")."""
+    return [guide for _, guide in get_index().search(message, k)]
@@ -0,0 +1,180 @@
+"""Ledger Log — append-only SQLite history behind the group ledgers.
+
+Every ledger entry (debt, payment, expense, member) is an event numbered
+per group; the in-memory GroupLedger is just the fold of its events:
+
+    • storage    one SQLite file (LEDGER_DB_PATH) in WAL mode, so the writer
+                 never blocks readers; events are keyed (group, seq) and
+                 never updated or deleted
+    • writes     a single writer thread drains a queue and inserts whatever
+                 has piled up — up to LEDGER_BATCH_MAX events — in one
+                 transaction (group commit). Callers get a Future that
+                 resolves once their event is on disk, so a burst of
+                 concurrent /settle calls costs a handful of fsyncs, not one
+                 each, and groups never wait on each other's locks
+    • snapshots  every LEDGER_SNAPSHOT_EVERY events a group's balances and
+                 pairwise debts are written through the same queue; loading
+                 a group reads its snapshot and replays only the events after
+                 it
+    • lifecycle  nothing is opened at import; group_ledger.ledgers.open()
+                 (main.lifespan) creates the file, the writer thread starts
+                 on the first write. LEDGER_DB_PATH="" keeps ledgers in
+                 memory only
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+# ── Configuration ──────────────────────────────────────────
+LEDGER_DB_PATH = os.getenv(
+    "LEDGER_DB_PATH",
+    str(Path(__file__).resolve().parent.parent / "data" / "cache" / "ledger.db"),
+)
+LEDGER_SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "500"))
+LEDGER_BATCH_MAX = int(os.getenv("LEDGER_BATCH_MAX", "512"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    grp  TEXT    NOT NULL,
+    seq  INTEGER NOT NULL,
+    kind TEXT    NOT NULL,
+    data TEXT    NOT NULL,
+    at   REAL    NOT NULL,
+    PRIMARY KEY (grp, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    grp   TEXT    PRIMARY KEY,
+    seq   INTEGER NOT NULL,
+    state TEXT    NOT NULL,
+    at    REAL    NOT NULL
+);
+"""
+
+_EVENT_SQL = "INSERT INTO events (grp, seq, kind, data, at) VALUES (?, ?, ?, ?, ?)"
+_SNAPSHOT_SQL = "INSERT OR REPLACE INTO snapshots (grp, seq, state, at) VALUES (?, ?, ?, ?)"
+
+Event = tuple[int, str, dict]  # (seq, kind, data)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")  # WAL: durable at checkpoint, never corrupt
+    db.execute("PRAGMA busy_timeout=5000")
+    return db
+
+
+class LedgerLog:
+    """Event and snapshot store with a batching writer thread."""
+
+    def __init__(self, path: str = LEDGER_DB_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._reader = _connect(path)
+        self._reader.executescript(_SCHEMA)
+        self._read_lock = threading.Lock()
+        # (sql, row, future | None); None stops the writer
+        self._queue: queue.SimpleQueue[tuple[str, tuple, Future | None] | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.stats = {"events": 0, "snapshots": 0, "batches": 0}
+
+    # ── Writing ────────────────────────────────────────────
+    def append(self, group: str, seq: int, kind: str, data: dict) -> Future:
+        """Queue an event; the Future resolves once it is committed."""
+        future: Future = Future()
+        row = (group, seq, kind, json.dumps(data, ensure_ascii=False, separators=(",", ":")), time.time())
+        self._put(_EVENT_SQL, row, future)
+        return future
+
+    def snapshot(self, group: str, seq: int, state: dict) -> None:
+        """Queue a snapshot of a group's state as of event `seq`."""
+        row = (group, seq, json.dumps(state, ensure_ascii=False, separators=(",", ":")), time.time())
+        self._put(_SNAPSHOT_SQL, row, None)
+
+    def _put(self, sql: str, row: tuple, future: Future | None) -> None:
+        if self._writer is None:
+            with self._start_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="ledger-log", daemon=True)
+                    self._writer.start()
+        self._queue.put((sql, row, future))
+
+    def _write_loop(self) -> None:
+        db = _connect(self.path)
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < LEDGER_BATCH_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            if batch:
+                self._commit(db, batch)
+        db.close()
+
+    def _commit(self, db: sqlite3.Connection, batch: list[tuple[str, tuple, Future | None]]) -> None:
+        events = [row for sql, row, _ in batch if sql == _EVENT_SQL]
+        snapshots = [row for sql, row, _ in batch if sql == _SNAPSHOT_SQL]
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(_EVENT_SQL, events)
+            db.executemany(_SNAPSHOT_SQL, snapshots)
+            db.execute("COMMIT")
+        except sqlite3.Error as e:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            print(f"[ledger-log] write of {len(batch)} entries failed: {e}")
+            for _, _, future in batch:
+                if future is not None:
+                    future.set_exception(e)
+            return
+        self.stats["events"] += len(events)
+        self.stats["snapshots"] += len(snapshots)
+        self.stats["batches"] += 1
+        for _, _, future in batch:
+            if future is not None:
+                future.set_result(None)
+
+    # ── Reading ────────────────────────────────────────────
+    def load(self, group: str) -> tuple[int, dict | None, list[Event]]:
+        """(snapshot seq, snapshot state, events after it) for a group."""
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT seq, state FROM snapshots WHERE grp = ?", (group,),
+            ).fetchone()
+            seq, state = (row[0], json.loads(row[1])) if row else (0, None)
+            events = [
+                (event_seq, kind, json.loads(data))
+                for event_seq, kind, data in self._reader.execute(
+                    "SELECT seq, kind, data FROM events WHERE grp = ? AND seq > ? ORDER BY seq",
+                    (group, seq),
+                )
+            ]
+        return seq, state, events
+
+    def groups(self) -> list[str]:
+        with self._read_lock:
+            return [row[0] for row in self._reader.execute("SELECT DISTINCT grp FROM events")]
+
+    def close(self) -> None:
+        """Flush queued writes and stop the writer (a later append restarts it)."""
+        with self._start_lock:
+            if self._writer is not None:
+                self._queue.put(None)
+                self._writer.join()
+                self._writer = None
+
+    def info(self) -> dict:
+        return {**self.stats, "path": self.path, "queued": self._queue.qsize()}
@@ -0,0 +1,216 @@
+"""LLM Admission Scheduler — RPM/TPM budgets with per-student fair queuing.
+
+Groq (and Anthropic) enforce request-per-minute and token-per-minute limits.
+Every upstream call first asks the scheduler for admission with an estimate
+of its tokens (system prompt + history + max_tokens):
+
+    • each provider keeps a 60 s sliding window of admitted requests/tokens
+    • if the budget is full the request waits in its student's queue;
+      queues are served round-robin so one student's burst of long plans
+      can't starve everybody else
+    • waiting is bounded — requests that can't be admitted within
+      `max_wait` (or obviously never will) are rejected immediately so the
+      caller can route them to the next provider / fallback
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+
+WINDOW_SECONDS = 60.0
+
+# Defaults follow Groq's free tier for llama-3.3-70b-versatile
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))
+CLAUDE_RPM = int(os.getenv("CLAUDE_RPM", "50"))
+CLAUDE_TPM = int(os.getenv("CLAUDE_TPM", "50000"))
+
+# Longest a chat request may queue before going to the next provider
+MAX_QUEUE_WAIT_SECONDS = float(os.getenv("LLM_MAX_QUEUE_WAIT", "2"))
+
+
+class AdmissionRejected(Exception):
+    """The provider budget can't take this request in time."""
+
+
+class ProviderBudget:
+    """Sliding-window request + token budget for one provider."""
+
+    def __init__(self, name: str, rpm: int, tpm: int):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self._window: deque[tuple[float, int]] = deque()  # (admitted_at, tokens)
+        self._tokens_in_window = 0
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - WINDOW_SECONDS
+        while self._window and self._window[0][0] <= cutoff:
+            _, tokens = self._window.popleft()
+            self._tokens_in_window -= tokens
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        """Seconds until a request of `tokens` would fit (0 = fits now)."""
+        self._trim(now)
+        if tokens > self.tpm:
+            return float("inf")
+
+        requests_over = len(self._window) + 1 - self.rpm
+        tokens_over = self._tokens_in_window + tokens - self.tpm
+        if requests_over <= 0 and tokens_over <= 0:
+            return 0.0
+
+        # Walk the window until enough old entries expire
+        freed_requests = freed_tokens = 0
+        for admitted_at, used in self._window:
+            freed_requests += 1
+            freed_tokens += used
+            if freed_requests >= requests_over and freed_tokens >= tokens_over:
+                return admitted_at + WINDOW_SECONDS - now
+        return WINDOW_SECONDS
+
+    def consume(self, tokens: int, now: float) -> None:
+        self._window.append((now, tokens))
+        self._tokens_in_window += tokens
+
+    def snapshot(self, now: float) -> dict:
+        self._trim(now)
+        return {
+            "requests_in_window": len(self._window),
+            "rpm_limit": self.rpm,
+            "tokens_in_window": self._tokens_in_window,
+            "tpm_limit": self.tpm,
+        }
+
+
+class _Waiter:
+    __slots__ = ("tokens", "future")
+
+    def __init__(self, tokens: int, future: asyncio.Future):
+        self.tokens = tokens
+        self.future = future
+
+
+class FairScheduler:
+    """Per-provider admission with round-robin fairness across students."""
+
+    def __init__(self, budgets: dict[str, ProviderBudget]):
+        self.budgets = budgets
+        # provider -> student_id -> FIFO of waiters; dict order = RR order
+        self._queues: dict[str, OrderedDict[str, deque[_Waiter]]] = {
+            name: OrderedDict() for name in budgets
+        }
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    async def acquire(self, provider: str, student_id: str, tokens: int,
+                      max_wait: float = MAX_QUEUE_WAIT_SECONDS) -> None:
+        """Wait (bounded) for budget; raises AdmissionRejected."""
+        budget = self.budgets.get(provider)
+        if budget is None:
+            return
+
+        now = time.monotonic()
+        queues = self._queues[provider]
+        wait = budget.wait_time(tokens, now)
+
+        if not queues and wait == 0:
+            budget.consume(tokens, now)
+            self.stats["admitted"] += 1
+            return
+
+        # Reject up front if even an empty queue couldn't serve it in time
+        if wait > max_wait:
+            self.stats["rejected"] += 1
+            if wait == float("inf"):
+                raise AdmissionRejected(f"{provider} request of ~{tokens} tokens exceeds TPM limit")
+            raise AdmissionRejected(f"{provider} budget full (~{wait:.1f}s wait)")
+
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+        queues.setdefault(student_id, deque()).append(waiter)
+        self.stats["queued"] += 1
+        self._pump(provider)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                return  # admitted right at the deadline
+            waiter.future.cancel()
+            self._discard(provider, student_id, waiter)
+            self.stats["rejected"] += 1
+            raise AdmissionRejected(f"{provider} queue wait exceeded {max_wait}s") from None
+        except asyncio.CancelledError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._discard(provider, student_id, waiter)
+            raise
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "providers": {
+                name: {
+                    **budget.snapshot(now),
+                    "queued": sum(len(q) for q in self._queues[name].values()),
+                }
+                for name, budget in self.budgets.items()
+            },
+        }
+
+    # ── Internals ──────────────────────────────────────────
+    def _pump(self, provider: str) -> None:
+        """Admit queued waiters round-robin while the budget allows."""
+        budget = self.budgets[provider]
+        queues = self._queues[provider]
+
+        while queues:
+            student_id, queue = next(iter(queues.items()))
+            waiter = queue[0]
+            now = time.monotonic()
+            wait = budget.wait_time(waiter.tokens, now)
+            if wait > 0:
+                self._schedule(provider, wait)
+                return
+
+            queue.popleft()
+            budget.consume(waiter.tokens, now)
+            waiter.future.set_result(None)
+            self.stats["admitted"] += 1
+
+            # Next turn goes to the next student
+            if queue:
+                queues.move_to_end(student_id)
+            else:
+                del queues[student_id]
+
+    def _schedule(self, provider: str, delay: float) -> None:
+        timer = self._timers.get(provider)
+        if timer is not None:
+            timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timers[provider] = loop.call_later(delay, self._pump, provider)
+
+    def _discard(self, provider: str, student_id: str, waiter: _Waiter) -> None:
+        queues = self._queues[provider]
+        queue = queues.get(student_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        if not queue:
+            del queues[student_id]
+        # The head may have changed — re-evaluate
+        self._pump(provider)
+
+
+# Shared process-wide scheduler
+scheduler = FairScheduler({
+    "Groq": ProviderBudget("Groq", GROQ_RPM, GROQ_TPM),
+    "Claude": ProviderBudget("Claude", CLAUDE_RPM, CLAUDE_TPM),
+})
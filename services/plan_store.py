@@ -0,0 +1,284 @@
+"""Trip Plan Store — precomputed TripPlans for popular destinations.
+
+A background refresher (started from main.lifespan) walks the grid of
+PLAN_DESTINATIONS × PLAN_GROUP_SIZES × PLAN_ORIGINS, asks CampusGPT for each
+plan, parses it with TripPlanParser and validates it as a TripPlan before
+storing it. `/api/yatra/plan?destination=…&members=…` is then answered from
+memory:
+
+    • fresh plan            → served as is
+    • stale plan            → served as is, regeneration queued
+                              (stale-while-revalidate, one job per key)
+    • unknown group size    → nearest stored size for that destination,
+                              member_count adjusted, exact plan queued
+    • nothing stored        → generated inline once, then cached
+
+Only known destinations, group sizes of 1..PLAN_MAX_MEMBERS (clamped) and
+PLAN_ORIGINS are ever generated. Any other origin gets the nearest stored
+plan for the destination. The store itself is an LRU of PLAN_STORE_MAX
+plans, so query strings cannot grow the generation queue or the file.
+
+When no LLM provider is up, plans come from the offline destination guides
+(knowledge_base) so the grid is never empty.
+
+Plans persist in a small versioned gzip-JSON file (PLAN_STORE_PATH), written
+atomically, so a restart serves the previous generation immediately.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from models import TripPlan
+from services import knowledge_base
+from services.trip_parser import TripPlanParser
+
+# ── Configuration ──────────────────────────────────────────
+def _env_list(name: str, default: str) -> list[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+PLAN_DESTINATIONS = _env_list("PLAN_DESTINATIONS", "Rishikesh,Jaipur,Varanasi,Udaipur,Manali,Goa")
+PLAN_GROUP_SIZES = [int(size) for size in _env_list("PLAN_GROUP_SIZES", "2,4,5,8")]
+PLAN_ORIGINS = _env_list("PLAN_ORIGINS", "Lucknow,Delhi")
+PLAN_MAX_MEMBERS = int(os.getenv("PLAN_MAX_MEMBERS", "20"))
+PLAN_STORE_MAX = int(os.getenv("PLAN_STORE_MAX", "500"))
+
+PLAN_TTL_SECONDS = float(os.getenv("PLAN_TTL", str(6 * 3600)))
+PLAN_REFRESH_INTERVAL = float(os.getenv("PLAN_REFRESH_INTERVAL", str(15 * 60)))
+# Gap between generations so the refresher never crowds out live chats
+PLAN_REFRESH_PAUSE = float(os.getenv("PLAN_REFRESH_PAUSE", "5"))
+
+PLAN_STORE_PATH = Path(os.getenv(
+    "PLAN_STORE_PATH",
+    Path(__file__).resolve().parent.parent / "data" / "cache" / "trip_plans.json.gz",
+))
+
+STORE_FORMAT_VERSION = 1
+REFRESHER_ID = "plan-refresher"
+
+PlanKey = tuple[str, int, str]  # (destination, members, origin)
+
+
+def _plan_prompt(destination: str, members: int, origin: str) -> str:
+    return f"{destination} trip plan for {members} log from {origin}"
+
+
+def _usable(plan: dict | None) -> bool:
+    """A stored plan needs at least transport or stays, and a price."""
+    return bool(plan and (plan["transport"] or plan["stays"]) and plan["budget_used"])
+
+
+class PlanStore:
+    """In-memory plan map with on-disk snapshots and background refresh."""
+
+    def __init__(self, path: Path = PLAN_STORE_PATH, ttl: float = PLAN_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.generation = 0
+        # key -> (plan, generated_at), least recently used first
+        self._plans: OrderedDict[PlanKey, tuple[dict, float]] = OrderedDict()
+        self._jobs: dict[PlanKey, asyncio.Task] = {}
+        self._dirty = False
+        self.stats = {"fresh": 0, "stale": 0, "nearest": 0, "generated": 0, "failed": 0}
+
+    # ── Serving ────────────────────────────────────────────
+    async def get(self, destination: str, members: int, origin: str | None = None) -> dict | None:
+        """Plan for a destination/group size (None if the destination is unknown)."""
+        guide = knowledge_base.get_index().match_destination(destination)
+        if guide is None:
+            return None
+        members = min(max(members, 1), PLAN_MAX_MEMBERS)
+        origin = (origin or PLAN_ORIGINS[0]).strip().title()
+        key = (guide["name"], members, origin)
+
+        entry = self._plans.get(key)
+        if entry is not None:
+            self._plans.move_to_end(key)
+            plan, generated_at = entry
+            if time.time() - generated_at < self.ttl:
+                self.stats["fresh"] += 1
+            else:
+                self.stats["stale"] += 1
+                self._schedule(key)
+            return plan
+
+        known_origin = origin in PLAN_ORIGINS
+        nearest = self._nearest(key, any_origin=not known_origin)
+        if nearest is not None:
+            self.stats["nearest"] += 1
+            if known_origin:
+                self._schedule(key)
+            return {**nearest, "member_count": members}
+
+        if not known_origin:
+            key = (key[0], members, PLAN_ORIGINS[0])
+        # Shielded: the job is shared, one client going away must not cancel it
+        return await asyncio.shield(self._schedule(key))
+
+    def _nearest(self, key: PlanKey, any_origin: bool = False) -> dict | None:
+        destination, members, origin = key
+        candidates = [
+            (abs(size - members), source != origin, plan)
+            for (name, size, source), (plan, _) in self._plans.items()
+            if name == destination and (any_origin or source == origin)
+        ]
+        return min(candidates, key=lambda item: item[:2])[2] if candidates else None
+
+    def _schedule(self, key: PlanKey) -> asyncio.Task:
+        """Regenerate a key in the background (one job per key)."""
+        job = self._jobs.get(key)
+        if job is None:
+            job = asyncio.create_task(self._refresh(key))
+            self._jobs[key] = job
+            job.add_done_callback(lambda _: self._jobs.pop(key, None))
+        return job
+
+    # ── Generation ─────────────────────────────────────────
+    async def _refresh(self, key: PlanKey) -> dict | None:
+        try:
+            plan = await self._generate(*key)
+        except Exception as e:
+            print(f"[plan-store] {key} generation failed: {e}")
+            plan = None
+        if plan is None:
+            self.stats["failed"] += 1
+            entry = self._plans.get(key)
+            return entry[0] if entry else None
+
+        self._plans[key] = (plan, time.time())
+        self._plans.move_to_end(key)
+        while len(self._plans) > PLAN_STORE_MAX:
+            self._plans.popitem(last=False)
+        self._dirty = True
+        self.stats["generated"] += 1
+        return plan
+
+    async def _generate(self, destination: str, members: int, origin: str) -> dict | None:
+        # Imported here: ai_chat pulls in the provider clients
+        from services.ai_chat import get_llm_response
+
+        guide = knowledge_base.get_index().match_destination(destination)
+        response = await get_llm_response(
+            _plan_prompt(destination, members, origin), [], REFRESHER_ID,
+        )
+        plan = TripPlanParser.from_text(response[0]).plan() if response else None
+        if not _usable(plan) and guide is not None:
+            plan = TripPlanParser.from_text(guide["guide"]).plan()
+        if not _usable(plan):
+            return None
+
+        plan["destination"] = plan["destination"] or destination
+        plan["region"] = plan["region"] or (guide["region"] if guide else "")
+        plan["member_count"] = members
+        try:
+            return TripPlan(**plan).model_dump()
+        except ValidationError as e:
+            print(f"[plan-store] invalid plan for {destination}: {e}")
+            return None
+
+    async def refresh_all(self) -> int:
+        """Regenerate every missing/stale plan in the grid; returns how many."""
+        now = time.time()
+        refreshed = 0
+        index = knowledge_base.get_index()
+        for name in PLAN_DESTINATIONS:
+            guide = index.match_destination(name)
+            destination = guide["name"] if guide else name
+            for members in PLAN_GROUP_SIZES:
+                for origin in PLAN_ORIGINS:
+                    key = (destination, members, origin)
+                    entry = self._plans.get(key)
+                    if entry is not None and now - entry[1] < self.ttl:
+                        continue
+                    if await self._schedule(key) is not None:
+                        refreshed += 1
+                    await asyncio.sleep(PLAN_REFRESH_PAUSE)
+        return refreshed
+
+    async def run_refresher(self) -> None:
+        """Background loop: load the last snapshot, then keep the grid fresh."""
+        self.load()
+        while True:
+            try:
+                refreshed = await self.refresh_all()
+                if self._dirty:
+                    self.save()
+                print(f"[plan-store] refreshed {refreshed} plans (generation {self.generation})")
+            except Exception as e:
+                print(f"[plan-store] refresh failed: {e}")
+            await asyncio.sleep(PLAN_REFRESH_INTERVAL)
+
+    # ── Persistence ────────────────────────────────────────
+    def load(self) -> None:
+        """Read the last on-disk snapshot (ignored if missing or another format)."""
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[plan-store] could not read {self.path}: {e}")
+            return
+        if data.get("version") != STORE_FORMAT_VERSION:
+            print(f"[plan-store] ignoring {self.path}: format v{data.get('version')}")
+            return
+
+        self.generation = data["generation"]
+        for row in data["plans"][-PLAN_STORE_MAX:]:  # saved least recently used first
+            key = (row["destination"], row["members"], row["origin"])
+            self._plans.setdefault(key, (row["plan"], row["generated_at"]))
+        while len(self._plans) > PLAN_STORE_MAX:
+            self._plans.popitem(last=False)
+        print(f"[plan-store] loaded {len(data['plans'])} plans (generation {self.generation})")
+
+    def save(self) -> None:
+        """Write a new generation atomically (tmp file + rename)."""
+        self.generation += 1
+        data = {
+            "version": STORE_FORMAT_VERSION,
+            "generation": self.generation,
+            "saved_at": time.time(),
+            "plans": [
+                {
+                    "destination": destination,
+                    "members": members,
+                    "origin": origin,
+                    "generated_at": generated_at,
+                    "plan": plan,
+                }
+                for (destination, members, origin), (plan, generated_at) in self._plans.items()
+            ],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def close(self) -> None:
+        """Persist plans generated since the last snapshot."""
+        if self._dirty:
+            self.save()
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {
+            **self.stats,
+            "generation": self.generation,
+            "plans": len(self._plans),
+            "stale_plans": sum(1 for _, at in self._plans.values() if now - at >= self.ttl),
+            "refreshing": len(self._jobs),
+        }
+
+
+# Shared process-wide store
+plan_store = PlanStore()
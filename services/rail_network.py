@@ -0,0 +1,106 @@
+"""Rail Network — station graph with precomputed all-pairs shortest distances.
+
+Stations and rail segments live in data/rail/network.json (override with
+RAIL_NETWORK_PATH):
+
+    {"stations": [{code, name, state, aliases}, ...],
+     "segments": [[code_a, code_b, km], ...]}
+
+When the network loads, one Dijkstra run per station fills a flat n×n
+integer array indexed by station id. Every distance lookup after that is a
+single array read, however large the network grows.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import os
+from array import array
+from pathlib import Path
+
+NETWORK_PATH = Path(os.getenv(
+    "RAIL_NETWORK_PATH",
+    Path(__file__).resolve().parent.parent / "data" / "rail" / "network.json",
+))
+
+UNREACHABLE = -1
+
+
+def _shortest_paths(adjacency: list[list[tuple[int, int]]], source: int) -> list[int]:
+    """Dijkstra from one station; UNREACHABLE where there is no path."""
+    dist = [UNREACHABLE] * len(adjacency)
+    dist[source] = 0
+    heap = [(0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for neighbour, km in adjacency[node]:
+            nd = d + km
+            if dist[neighbour] == UNREACHABLE or nd < dist[neighbour]:
+                dist[neighbour] = nd
+                heapq.heappush(heap, (nd, neighbour))
+    return dist
+
+
+class RailNetwork:
+    """Stations indexed by id, with an all-pairs distance table."""
+
+    unreachable = UNREACHABLE
+
+    def __init__(self, stations: list[dict], segments: list[list]):
+        self.stations = stations
+        self.names = [station["name"] for station in stations]
+        self.size = len(stations)
+
+        # Lower-cased name / code / alias → station id
+        self._ids: dict[str, int] = {}
+        for station_id, station in enumerate(stations):
+            for key in [station["name"], station["code"], *station.get("aliases", [])]:
+                self._ids.setdefault(key.lower(), station_id)
+
+        codes = {station["code"]: station_id for station_id, station in enumerate(stations)}
+        adjacency: list[list[tuple[int, int]]] = [[] for _ in stations]
+        for code_a, code_b, km in segments:
+            a, b = codes[code_a], codes[code_b]
+            adjacency[a].append((b, int(km)))
+            adjacency[b].append((a, int(km)))
+
+        self.distances = array("i")
+        for source in range(self.size):
+            self.distances.extend(_shortest_paths(adjacency, source))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def station_index(self) -> dict[str, int]:
+        """Every lookup key (lower-cased name, code, alias) → station id."""
+        return dict(self._ids)
+
+    def station_id(self, name: str) -> int | None:
+        """Id for a station name, code or alias (case-insensitive)."""
+        return self._ids.get(name.strip().lower())
+
+    def distance(self, from_station: str, to_station: str) -> int | None:
+        """Shortest rail distance in km (None if unknown or unconnected)."""
+        a = self.station_id(from_station)
+        b = self.station_id(to_station)
+        if a is None or b is None:
+            return None
+        km = self.distances[a * self.size + b]
+        return None if km == UNREACHABLE else km
+
+    def fare_tables(self, fare_rates: dict) -> None:
+        """No precompiled fare tables in the JSON-built network."""
+        return None
+
+    def fare(self, from_station: str, to_station: str, travel_class: str) -> int | None:
+        """No precompiled fares in the JSON-built network (see fare_artifact)."""
+        return None
+
+
+def load_network(path: Path = NETWORK_PATH) -> RailNetwork:
+    """Read the station/segment file and build the distance table."""
+    with path.open(encoding="utf-8") as f:
+        data = json.load(f)
+    return RailNetwork(data["stations"], data["segments"])
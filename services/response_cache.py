@@ -0,0 +1,299 @@
+"""CampusGPT Response Cache — LRU+TTL, near-duplicate matching, single-flight.
+
+Sits in front of the LLM providers. Answers are keyed on the normalized
+message plus a fingerprint of the conversation history, so the same
+first-turn prompt ("goa plan", "Goa plan!!") is served from memory.
+
+Tiers:
+    1. Exact  — sha1(history fingerprint + normalized message)
+    2. Near   — MinHash over character shingles with LSH banding, only
+                within the same history and only if the numbers in both
+                prompts match ("5 log" must never answer "6 log") and the
+                ordered (origin, destination) stations match (shingles
+                can't tell "Lucknow se Delhi" from "Delhi se Lucknow")
+    3. Miss   — one upstream call per key; concurrent identical requests
+                await the same in-flight future (single-flight)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from services.intent_router import extract_stations
+
+# ── Configuration ──────────────────────────────────────────
+CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_SIZE", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL", str(6 * 60 * 60)))
+NEAR_DUP_THRESHOLD = float(os.getenv("CHAT_CACHE_NEAR_DUP", "0.8"))
+
+SHINGLE_SIZE = 3
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+MINHASH_PERMS = MINHASH_BANDS * MINHASH_ROWS
+
+# Universal hash family h(x) = (a*x + b) mod p, fixed seeds so every
+# worker computes the same signatures
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.sha1(f"a{i}".encode()).digest()[:8], "big") % _MERSENNE_PRIME | 1,
+        int.from_bytes(hashlib.sha1(f"b{i}".encode()).digest()[:8], "big") % _MERSENNE_PRIME,
+    )
+    for i in range(MINHASH_PERMS)
+]
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+_NUMBERS = re.compile(r"\d+")
+
+Value = tuple[str, bool]
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation/emoji, collapse whitespace."""
+    text = _NON_WORD.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def history_fingerprint(history: list[dict]) -> str:
+    """Stable fingerprint of a chat history (roles + normalized text)."""
+    h = hashlib.sha1()
+    for msg in history:
+        text = normalize(msg.get("text", ""))
+        if text:
+            role = "u" if msg.get("role") == "user" else "a"
+            h.update(f"{role}:{text}\x00".encode())
+    return h.hexdigest()
+
+
+def _minhash(normalized: str) -> tuple[int, ...]:
+    """MinHash signature over character shingles."""
+    padded = f" {normalized} "
+    shingles = {
+        int.from_bytes(hashlib.blake2b(padded[i:i + SHINGLE_SIZE].encode(), digest_size=8).digest(), "big")
+        for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))
+    }
+    return tuple(
+        min((a * x + b) % _MERSENNE_PRIME for x in shingles)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _bands(signature: tuple[int, ...]) -> list[tuple[int, ...]]:
+    return [
+        signature[i * MINHASH_ROWS:(i + 1) * MINHASH_ROWS]
+        for i in range(MINHASH_BANDS)
+    ]
+
+
+def _similarity(sig1: tuple[int, ...], sig2: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(a == b for a, b in zip(sig1, sig2)) / MINHASH_PERMS
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "history_fp", "signature", "numbers", "stations")
+
+    def __init__(self, value: Value, expires_at: float, history_fp: str,
+                 signature: tuple[int, ...], numbers: tuple[str, ...],
+                 stations: tuple[str | None, str | None]):
+        self.value = value
+        self.expires_at = expires_at
+        self.history_fp = history_fp
+        self.signature = signature
+        self.numbers = numbers
+        self.stations = stations
+
+
+class ResponseCache:
+    """In-process answer cache with LRU+TTL eviction and single-flight."""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        near_dup_threshold: float = NEAR_DUP_THRESHOLD,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.near_dup_threshold = near_dup_threshold
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # (history_fp, band_index, band) -> keys sharing that LSH bucket
+        self._buckets: dict[tuple, set[str]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+
+        self.stats = {
+            "exact_hits": 0,
+            "near_hits": 0,
+            "misses": 0,
+            "coalesced": 0,  # misses that joined an in-flight call
+            "evictions": 0,
+        }
+
+    # ── Lookup ─────────────────────────────────────────────
+    def lookup(self, message: str, history: list[dict]) -> Value | None:
+        """Return a cached answer (exact or near-duplicate) or None."""
+        normalized = normalize(message)
+        history_fp = history_fingerprint(history)
+        key = self._key(normalized, history_fp)
+
+        entry = self._get_fresh(key)
+        if entry is not None:
+            self.stats["exact_hits"] += 1
+            return entry.value
+
+        entry = self._near_lookup(normalized, history_fp)
+        if entry is not None:
+            self.stats["near_hits"] += 1
+            return entry.value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def get_or_compute(
+        self,
+        message: str,
+        history: list[dict],
+        compute: Callable[[], Awaitable[Value]],
+    ) -> Value:
+        """Serve from cache, or run `compute` once per key and cache its result."""
+        cached = self.lookup(message, history)
+        if cached is not None:
+            return cached
+
+        key = self._key(normalize(message), history_fingerprint(history))
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Leader was cancelled (client went away) — take over
+                return await self.get_or_compute(message, history, compute)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Followers re-raise it; mark retrieved so the loop doesn't warn
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            self.store(message, history, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    # ── Insert / evict ─────────────────────────────────────
+    def store(self, message: str, history: list[dict], value: Value) -> None:
+        """Cache an answer for (message, history)."""
+        normalized = normalize(message)
+        history_fp = history_fingerprint(history)
+        key = self._key(normalized, history_fp)
+
+        if key in self._entries:
+            self._remove(key)
+
+        entry = _Entry(
+            value=value,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            history_fp=history_fp,
+            signature=_minhash(normalized),
+            numbers=tuple(_NUMBERS.findall(normalized)),
+            stations=extract_stations(normalized),
+        )
+        self._entries[key] = entry
+        for i, band in enumerate(_bands(entry.signature)):
+            self._buckets.setdefault((history_fp, i, band), set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+
+    def snapshot(self) -> dict:
+        """Counters for monitoring (hit rate, upstream calls saved)."""
+        hits = self.stats["exact_hits"] + self.stats["near_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "upstream_calls_saved": hits + self.stats["coalesced"],
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    # ── Internals ──────────────────────────────────────────
+    @staticmethod
+    def _key(normalized: str, history_fp: str) -> str:
+        return hashlib.sha1(f"{history_fp}\x00{normalized}".encode()).hexdigest()
+
+    def _get_fresh(self, key: str) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _near_lookup(self, normalized: str, history_fp: str) -> _Entry | None:
+        if not self._entries:
+            return None
+
+        signature = _minhash(normalized)
+        numbers = tuple(_NUMBERS.findall(normalized))
+        stations = extract_stations(normalized)
+
+        candidates: set[str] = set()
+        for i, band in enumerate(_bands(signature)):
+            candidates |= self._buckets.get((history_fp, i, band), set())
+
+        matches: list[tuple[float, str]] = []
+        for key in candidates:
+            entry = self._entries[key]
+            if entry.numbers != numbers or entry.stations != stations:
+                continue
+            sim = _similarity(signature, entry.signature)
+            if sim >= self.near_dup_threshold:
+                matches.append((sim, key))
+
+        # Best first; expired entries are dropped and the next one tried
+        for _, key in sorted(matches, reverse=True):
+            entry = self._get_fresh(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for i, band in enumerate(_bands(entry.signature)):
+            bucket_key = (entry.history_fp, i, band)
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[bucket_key]
+
+
+# Shared process-wide cache
+response_cache = ResponseCache()
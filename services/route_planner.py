@@ -1,7 +1,7 @@
 """Multi-modal Route Planner — smart home route for students."""
 from __future__ import annotations
 
-from services.concession_engine import get_distance, calculate_fare, CONCESSION_RATES
+from services.concession_engine import current_rates, get_distance
 
 # ── Auto/Cab fare estimation (per city) ────────────────────
 AUTO_BASE_FARE = 30  # base fare in ₹
@@ -36,13 +36,17 @@ def _estimate_duration(distance_km: int) -> str:
     return f"{h}h {m:02d}m"
 
 
-def _estimate_auto_fare(city: str) -> int:
-    """Estimate auto fare for last mile in a city."""
-    km = LAST_MILE_KM.get(city, 5)
+def _auto_fare(km: float) -> int:
+    """Auto/cab fare for a ride of `km` road kilometres."""
     fare = AUTO_BASE_FARE + (km * AUTO_PER_KM)
     return int(round(fare / 5) * 5)  # Round to nearest 5
 
 
+def _estimate_auto_fare(city: str) -> int:
+    """Estimate auto fare for last mile in a city."""
+    return _auto_fare(LAST_MILE_KM.get(city, 5))
+
+
 def calculate_route(
     from_city: str,
     to_city: str,
@@ -60,11 +64,10 @@ def calculate_route(
     if distance is None:
         distance = 300  # fallback
 
-    original_train_fare = calculate_fare(distance, "SL")
-    concession_pct = CONCESSION_RATES.get(category, 50)
-    discount = int(original_train_fare * concession_pct / 100)
-    concession_train_fare = original_train_fare - discount
-    concession_train_fare = int(round(concession_train_fare / 5) * 5)
+    rates = current_rates()
+    original_train_fare = rates.fare(from_city, to_city, "SL") or rates.fare_for_distance(distance, "SL")
+    concession_pct = rates.concession_pct(category)
+    concession_train_fare = rates.concession_fare(original_train_fare, category)
     duration = _estimate_duration(distance)
 
     # Step 3: Auto from destination station to home
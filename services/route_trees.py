@@ -0,0 +1,253 @@
+"""Route Trees — one-to-many GharWaapsi routing for the campus-wide exodus.
+
+Before Diwali or Holi thousands of students ask for a route home from the
+same campus within a few hours. Rather than one search per request, a
+RouteTree is built once per (origin, departure window, category) and answers
+every hometown from it:
+
+    • window    departures are rounded up to ROUTE_WINDOW_MINUTES (default
+                30, the shuttle headway), so everyone leaving in the same half
+                hour shares a tree and nobody is put on a vehicle that left
+                before they asked
+    • tree      one RAPTOR run from the origin (earliest arrival everywhere),
+                then one ParetoSearch without targets, bounded by the
+                farthest city's MAX_SLOWDOWN limit. Each city's bags, cut at
+                that city's own limit, are exactly the frontier a point
+                query would find — ~0.25 s for all ~80 hometowns against ~8 s
+                for one search each
+    • journeys  ranked options per hometown are built on first use and kept;
+                a home coordinate reuses the same bags with each nearby
+                stop's last mile added (computed per request, not kept)
+    • cache     LRU of ROUTE_TREE_CACHE_SIZE trees keyed by (origin, window,
+                category, fare-rates version), so a rates reload just misses;
+                a miss is built outside the cache lock, and concurrent misses
+                on the same key wait for that one build. Building and
+                searching block, so the API calls plan_route / plan_routes
+                through asyncio.to_thread
+    • warm-up   run_warmer() (started from main.lifespan) builds the trees
+                for ROUTE_WARM_ORIGINS over the next ROUTE_WARM_HOURS in a
+                worker thread every ROUTE_WARM_INTERVAL, journeys included,
+                so the rush is served from memory
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+
+from services.concession_engine import current_rates
+from services.journey_planner import (
+    MAX_ALTERNATIVES, ParetoSearch, Search, _city, _fastest, _sources, door_limit,
+    door_to_door, nearby_miles, ranked_journeys, slowdown_limit,
+)
+from services.route_planner import calculate_route
+from services.timetable import Timetable, format_minute, get_timetable, week_minute
+
+# ── Configuration ──────────────────────────────────────────
+ROUTE_WINDOW_MINUTES = int(os.getenv("ROUTE_WINDOW_MINUTES", "30"))
+ROUTE_TREE_CACHE_SIZE = int(os.getenv("ROUTE_TREE_CACHE_SIZE", "128"))
+ROUTE_WARM_ORIGINS = [
+    origin.strip() for origin in os.getenv("ROUTE_WARM_ORIGINS", "Lucknow").split(",") if origin.strip()
+]
+ROUTE_WARM_CATEGORIES = [
+    category.strip() for category in os.getenv("ROUTE_WARM_CATEGORIES", "General").split(",") if category.strip()
+]
+ROUTE_WARM_HOURS = float(os.getenv("ROUTE_WARM_HOURS", "12"))
+ROUTE_WARM_INTERVAL = float(os.getenv("ROUTE_WARM_INTERVAL", str(15 * 60)))
+
+TreeKey = tuple[str, int, str, int]  # (origin, window, category, rates version)
+
+
+def window_start(minute: int) -> int:
+    """Round a timetable minute up to its departure window."""
+    return -(-minute // ROUTE_WINDOW_MINUTES) * ROUTE_WINDOW_MINUTES
+
+
+class RouteTree:
+    """Every hometown's journeys from one origin and departure."""
+
+    def __init__(self, timetable: Timetable, origin: str, depart: int, category: str):
+        self.timetable = timetable
+        self.origin = origin
+        self.depart = depart
+        self.category = category
+        self.built_at = time.time()
+
+        sources = _sources(timetable, origin, depart)
+        fastest = self._fastest = Search(timetable, sources)
+        self.limits: dict[str, int] = {}  # reachable city -> latest arrival worth offering
+        for city, stops in timetable.city_stops.items():
+            stop = _fastest(fastest, set(stops)) if city != origin else None
+            if stop is not None:
+                self.limits[city] = slowdown_limit(depart, fastest.best[stop])
+        self._search = ParetoSearch(timetable, sources, set(), category,
+                                    arrival_limit=max(self.limits.values(), default=depart))
+        self._journeys: dict[str, list[dict]] = {}
+
+    def journeys(self, city: str, k: int = MAX_ALTERNATIVES) -> list[dict]:
+        """Ranked options to a canonical city (empty if unreachable)."""
+        options = self._journeys.get(city)
+        if options is None:
+            limit = self.limits.get(city)
+            labels = [] if limit is None else self._search.frontier(
+                set(self.timetable.city_stops[city]), limit,
+            )
+            options = ranked_journeys(self.timetable, labels, city, self.category)
+            self._journeys[city] = options
+        return options[:max(1, k)]
+
+    def door_journeys(self, home: tuple[float, float], k: int = MAX_ALTERNATIVES) -> list[dict]:
+        """Ranked options to a home coordinate, last mile from each nearby stop."""
+        tt = self.timetable
+        egress = nearby_miles(tt, *home)
+        limit = door_limit(self._fastest, self.depart, egress) if egress else None
+        if limit is None:
+            return []
+        destination = tt.stop_city(min(egress, key=lambda stop: egress[stop].km))
+        labels = self._search.frontier(arrival_limit=limit, egress=egress)
+        return ranked_journeys(tt, labels, destination, self.category, k, egress=egress)
+
+    def warm(self) -> None:
+        for city in self.limits:
+            self.journeys(city)
+
+
+class RouteTreeCache:
+    """LRU of route trees, shared by requests and the warm-up job."""
+
+    def __init__(self, size: int = ROUTE_TREE_CACHE_SIZE):
+        self.size = size
+        self._trees: OrderedDict[TreeKey, RouteTree] = OrderedDict()
+        self._building: dict[TreeKey, Future] = {}  # trees being built, by key
+        self._lock = threading.Lock()  # guards the two dicts only, never a build
+        self.stats = {"hits": 0, "builds": 0, "evicted": 0, "warmed": 0}
+
+    def get(self, origin: str, depart: int, category: str = "General") -> RouteTree | None:
+        """Tree for leaving `origin` at `depart` (timetable minute), built if missing.
+
+        Blocking: call from a worker thread. Concurrent misses on one key wait
+        for a single build; other keys are served meanwhile.
+        """
+        city = _city(origin)
+        tt = get_timetable()
+        if city is None or not _sources(tt, city, 0):
+            return None
+        key = (city, window_start(depart), category, current_rates().version)
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+                self.stats["hits"] += 1
+                return tree
+            building = self._building.get(key)
+            owner = building is None
+            if owner:
+                building = self._building[key] = Future()
+        if not owner:
+            return building.result()
+
+        try:
+            tree = RouteTree(tt, city, key[1], category)
+        except BaseException as e:
+            with self._lock:
+                del self._building[key]
+            building.set_exception(e)
+            raise
+        with self._lock:
+            del self._building[key]
+            self._trees[key] = tree
+            self.stats["builds"] += 1
+            while len(self._trees) > self.size:
+                self._trees.popitem(last=False)
+                self.stats["evicted"] += 1
+        building.set_result(tree)
+        return tree
+
+    def warm(self, origins: list[str] = ROUTE_WARM_ORIGINS,
+             hours: float = ROUTE_WARM_HOURS) -> int:
+        """Build trees and journeys for the coming windows; returns how many windows."""
+        now = week_minute()
+        windows = range(window_start(now), now + int(hours * 60) + 1, ROUTE_WINDOW_MINUTES)
+        for origin in origins:
+            for category in ROUTE_WARM_CATEGORIES:
+                for depart in windows:
+                    tree = self.get(origin, depart, category)
+                    if tree is not None:
+                        tree.warm()
+        self.stats["warmed"] += 1
+        return len(windows)
+
+    async def run_warmer(self) -> None:
+        """Background loop: keep the next few hours of departures precomputed."""
+        while True:
+            try:
+                started = time.perf_counter()
+                windows = await asyncio.to_thread(self.warm)
+                print(f"[route-trees] warmed {windows} windows in "
+                      f"{time.perf_counter() - started:.1f}s ({len(self._trees)} trees)")
+            except Exception as e:
+                print(f"[route-trees] warm-up failed: {e}")
+            await asyncio.sleep(ROUTE_WARM_INTERVAL)
+
+    def info(self) -> dict:
+        return {**self.stats, "trees": len(self._trees), "size": self.size,
+                "window_minutes": ROUTE_WINDOW_MINUTES}
+
+
+# Shared process-wide cache
+route_trees = RouteTreeCache()
+
+
+def plan_route(from_city: str, to_city: str, category: str = "General",
+               depart_after: datetime | None = None, k: int = 3,
+               origin: tuple[float, float] | None = None,
+               home: tuple[float, float] | None = None) -> dict:
+    """Ranked timetable journeys home, else the fixed three-leg estimate.
+
+    An `origin` coordinate is searched on its own (its nearby stops are the
+    sources); otherwise the origin city's shared tree answers, to the
+    `home` coordinate when given, else to `to_city`.
+    """
+    depart = week_minute(depart_after)
+    if origin is not None:
+        options = door_to_door(origin, home, to_city, window_start(depart), category, k)
+    else:
+        tree = route_trees.get(from_city, depart, category)
+        destination = _city(to_city)
+        if tree is None:
+            options = []
+        elif home is not None:
+            options = tree.door_journeys(home, k)
+        else:
+            options = tree.journeys(destination, k) if destination else []
+    if not options:
+        return calculate_route(from_city, to_city, category)
+    return {**options[0], "alternatives": options}
+
+
+def plan_routes(from_city: str, to_cities: list[str] | None = None, category: str = "General",
+                depart_after: datetime | None = None, k: int = 1) -> dict:
+    """Journeys from one origin to many hometowns (default: every one) off one tree."""
+    tree = route_trees.get(from_city, week_minute(depart_after), category)
+    if tree is None:
+        return {"from_city": from_city, "depart_at": "", "routes": {},
+                "unreachable": list(to_cities or [])}
+
+    cities = {name: _city(name) for name in to_cities} if to_cities else {city: city for city in tree.limits}
+    routes, unreachable = {}, []
+    for name, city in cities.items():
+        options = tree.journeys(city, k) if city else []
+        if options:
+            routes[name] = {**options[0], "alternatives": options}
+        else:
+            unreachable.append(name)
+    return {
+        "from_city": tree.origin,
+        "depart_at": format_minute(tree.depart),
+        "routes": routes,
+        "unreachable": unreachable,
+    }
@@ -0,0 +1,157 @@
+"""Station Search — autocomplete over the rail network's stations.
+
+Built once at startup from the station records (name, code, aliases):
+
+    • station codes ("LKO", "NDLS") are an exact dictionary lookup
+    • a character trie over names, every word of a name and aliases
+      ("prayagraj" → Allahabad) answers prefix queries; each trie node keeps
+      its best MAX_LIMIT station ids, so a lookup is O(len(prefix)) with no
+      subtree walk
+    • a trigram index catches typos ("lucnow", "varansi") when prefixes
+      don't fill the limit, ranked by Dice similarity with a bounded heap
+
+Stations are ranked by their order in the network file (major stations first).
+"""
+from __future__ import annotations
+
+import heapq
+import re
+from collections import Counter, defaultdict
+
+from services.concession_engine import NETWORK
+
+MAX_LIMIT = 20
+MIN_FUZZY_QUERY = 3
+MIN_SIMILARITY = 0.35
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _trigrams(term: str) -> set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.top: list[int] = []
+
+
+class StationIndex:
+    """Code map + prefix trie + trigram index over station names/aliases."""
+
+    def __init__(self, stations: list[dict]):
+        self.stations = stations
+        self._codes: dict[str, int] = {}
+        self._root = _TrieNode()
+        self._terms: list[tuple[str, int]] = []  # (term, station id)
+        self._term_grams: list[int] = []
+        self._grams: dict[str, list[int]] = defaultdict(list)
+
+        for station_id, station in enumerate(stations):
+            self._codes[station["code"].upper()] = station_id
+
+        # Insertion order is rank order — full names, then later words of a
+        # name, then aliases, each in station order — so every trie node's
+        # `top` already holds the best ids
+        for terms_of in (self._name_terms, self._word_terms, self._alias_terms):
+            for station_id, station in enumerate(stations):
+                for term in terms_of(station):
+                    self._insert(term, station_id)
+
+    @staticmethod
+    def _name_terms(station: dict) -> list[str]:
+        return [_normalize(station["name"])]
+
+    @staticmethod
+    def _word_terms(station: dict) -> list[str]:
+        words = _normalize(station["name"]).split()
+        return [" ".join(words[i:]) for i in range(1, len(words))]
+
+    @staticmethod
+    def _alias_terms(station: dict) -> list[str]:
+        return [term for alias in station.get("aliases", []) if (term := _normalize(alias))]
+
+    def _insert(self, term: str, station_id: int) -> None:
+        node = self._root
+        for char in term:
+            node = node.children.setdefault(char, _TrieNode())
+            if len(node.top) < MAX_LIMIT and station_id not in node.top:
+                node.top.append(station_id)
+
+        term_id = len(self._terms)
+        grams = _trigrams(term)
+        self._terms.append((term, station_id))
+        self._term_grams.append(len(grams))
+        for gram in grams:
+            self._grams[gram].append(term_id)
+
+    def _prefix(self, query: str) -> list[int]:
+        node = self._root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top
+
+    def _fuzzy(self, query: str, limit: int) -> list[int]:
+        grams = _trigrams(query)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+
+        best: dict[int, float] = {}
+        for term_id, count in shared.items():
+            score = 2 * count / (len(grams) + self._term_grams[term_id])
+            station_id = self._terms[term_id][1]
+            if score >= MIN_SIMILARITY and score > best.get(station_id, 0.0):
+                best[station_id] = score
+        top = heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1], item[0]))
+        return [station_id for station_id, _ in top]
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """Best matching stations for a partial query, best first."""
+        limit = max(1, min(limit, MAX_LIMIT))
+        normalized = _normalize(query)
+        if not normalized:
+            return []
+
+        ids: list[int] = []
+        code = self._codes.get(query.strip().upper())
+        if code is not None:
+            ids.append(code)
+        for station_id in self._prefix(normalized):
+            if station_id not in ids:
+                ids.append(station_id)
+        if len(ids) < limit and len(normalized) >= MIN_FUZZY_QUERY:
+            for station_id in self._fuzzy(normalized, limit):
+                if station_id not in ids:
+                    ids.append(station_id)
+
+        return [
+            {
+                "name": self.stations[station_id]["name"],
+                "code": self.stations[station_id]["code"],
+                "state": self.stations[station_id].get("state", ""),
+            }
+            for station_id in ids[:limit]
+        ]
+
+
+_index: StationIndex | None = None
+
+
+def get_index() -> StationIndex:
+    """Shared index, built on first use."""
+    global _index
+    if _index is None:
+        _index = StationIndex(NETWORK.stations)
+        print(f"[station-search] indexed {len(NETWORK.stations)} stations")
+    return _index
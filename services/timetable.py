@@ -0,0 +1,162 @@
+"""Timetable — GTFS-like local schedule of trains, intercity buses and shuttles.
+
+data/transit/timetable.json (override with TIMETABLE_PATH) stores service
+patterns compactly, the way GTFS frequencies do:
+
+    stops      [{id, name, city, kind, lat, lon}]   rail stops use the network's codes
+    transfers  [[stop_a, stop_b, minutes]]  station ↔ bus stand and the like
+    routes     [{id, name, mode, class, stops, offsets,
+                 departures: ["HH:MM", …] | headway: {from, to, every},
+                 days: "1111100" (Mon…Sun)}]
+               offsets are minutes after the first departure:
+               dep0, arr1, dep1, …, arrN
+
+When the timetable loads, every pattern is expanded into concrete trips
+over an eight-day window. Minute 0 is Monday 00:00, and the eighth day lets
+Sunday-night searches run into Monday. The trips are then indexed for
+round-based search:
+
+    • route_stops[r]          stop ids in travel order
+    • departures[r][i]        array('i') per stop position, one entry per
+      arrivals[r][i]          trip in departure order; patterns are FIFO, so
+                              every column is sorted and "earliest trip from
+                              stop i at or after t" is a bisect
+    • stop_routes[s]          (route, position) pairs serving a stop
+    • footpaths[s]            (stop, minutes) transfers
+    • city_stops[city]        stop ids per city
+    • geo                     GeoIndex over stop coordinates (nearest stops)
+"""
+from __future__ import annotations
+
+import json
+import os
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from services.geo_index import GeoIndex
+
+TIMETABLE_PATH = Path(os.getenv(
+    "TIMETABLE_PATH",
+    Path(__file__).resolve().parent.parent / "data" / "transit" / "timetable.json",
+))
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+HORIZON_DAYS = 8
+IST = timezone(timedelta(hours=5, minutes=30))
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _daily_departures(route: dict) -> list[int]:
+    if "departures" in route:
+        return sorted(_minutes(time) for time in route["departures"])
+    headway = route["headway"]
+    return list(range(_minutes(headway["from"]), _minutes(headway["to"]) + 1, headway["every"]))
+
+
+def week_minute(when: datetime | None = None) -> int:
+    """Minutes since Monday 00:00 IST (now if `when` is None; naive = IST)."""
+    when = when or datetime.now(IST)
+    if when.tzinfo is not None:
+        when = when.astimezone(IST)
+    return when.weekday() * DAY_MINUTES + when.hour * 60 + when.minute
+
+
+def format_minute(minute: int) -> str:
+    """Timetable minute → "Fri 18:30"."""
+    day, minute = divmod(minute, DAY_MINUTES)
+    return f"{WEEKDAYS[day % 7]} {minute // 60:02d}:{minute % 60:02d}"
+
+
+def format_duration(minutes: int) -> str:
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+
+class Timetable:
+    """Expanded trips with RAPTOR-style stop/route indexes."""
+
+    def __init__(self, data: dict):
+        self.stops: list[dict] = data["stops"]
+        self.stop_ids = {stop["id"]: i for i, stop in enumerate(self.stops)}
+        self.campus_stop = self.stop_ids[data["campus"]["stop"]]
+        self.campus_city = data["campus"]["city"]
+        self.bus_fares: dict = data.get("bus_fares", {})
+        self.geo = GeoIndex([(stop["lat"], stop["lon"]) for stop in self.stops])
+
+        self.city_stops: dict[str, list[int]] = {}
+        for i, stop in enumerate(self.stops):
+            if stop["kind"] != "campus":
+                self.city_stops.setdefault(stop["city"], []).append(i)
+
+        self.footpaths: list[list[tuple[int, int]]] = [[] for _ in self.stops]
+        for a, b, minutes in data.get("transfers", []):
+            self.footpaths[self.stop_ids[a]].append((self.stop_ids[b], minutes))
+            self.footpaths[self.stop_ids[b]].append((self.stop_ids[a], minutes))
+
+        self.routes: list[dict] = []
+        self.route_stops: list[list[int]] = []
+        self.departures: list[list[array]] = []
+        self.arrivals: list[list[array]] = []
+        self.stop_routes: list[list[tuple[int, int]]] = [[] for _ in self.stops]
+        self.trip_count = 0
+        for route in data["routes"]:
+            self._add_route(route)
+
+    def _add_route(self, route: dict) -> None:
+        daily = _daily_departures(route)
+        starts = [
+            day * DAY_MINUTES + minute
+            for day in range(HORIZON_DAYS) if route["days"][day % 7] == "1"
+            for minute in daily
+        ]
+        if not starts:
+            return
+
+        offsets = route["offsets"]
+        last = len(route["stops"]) - 1
+        arrive = [0] + [offsets[2 * i - 1] for i in range(1, last + 1)]
+        depart = [offsets[2 * i] for i in range(last)] + [offsets[-1]]
+
+        r = len(self.routes)
+        self.routes.append({key: value for key, value in route.items() if key != "offsets"})
+        stops = [self.stop_ids[stop] for stop in route["stops"]]
+        self.route_stops.append(stops)
+        self.departures.append([array("i", (start + off for start in starts)) for off in depart])
+        self.arrivals.append([array("i", (start + off for start in starts)) for off in arrive])
+        for position, stop in enumerate(stops[:-1]):  # nobody boards at the terminus
+            self.stop_routes[stop].append((r, position))
+        self.trip_count += len(starts)
+
+    def stop_name(self, stop: int) -> str:
+        return self.stops[stop]["name"]
+
+    def stop_city(self, stop: int) -> str:
+        return self.stops[stop]["city"]
+
+    def nearest_stops(self, lat: float, lon: float, k: int = 5,
+                      max_km: float | None = None) -> list[tuple[float, int]]:
+        """(straight-line km, stop) for the k stops nearest a coordinate."""
+        return self.geo.nearest(lat, lon, k, max_km)
+
+
+def load_timetable(path: Path = TIMETABLE_PATH) -> Timetable:
+    with path.open(encoding="utf-8") as f:
+        return Timetable(json.load(f))
+
+
+_timetable: Timetable | None = None
+
+
+def get_timetable() -> Timetable:
+    """Shared timetable, built on first use."""
+    global _timetable
+    if _timetable is None:
+        _timetable = load_timetable()
+        print(f"[timetable] {len(_timetable.routes)} routes, {_timetable.trip_count} trips")
+    return _timetable
@@ -0,0 +1,341 @@
+"""Trip Plan Parser — incremental extraction of a TripPlan from CampusGPT text.
+
+CampusGPT replies follow the emoji-sectioned format of SYSTEM_PROMPT
+(📍 header, 🚂 STEP 3 main journey, 🛏️ STEP 5 stays, 🎯 STEP 6 itinerary,
+💰 STEP 9 cost table). The parser is fed deltas as they stream in and
+handles every completed line exactly once — only the unfinished tail line
+is buffered, the accumulated reply is never re-scanned.
+
+Each update is {"kind", "index", "item"}: index is the item's position in its
+list. A transport card that only gets its price from the section's fare line
+("Train fare: Sleeper ₹380") is sent again, same index, with "update": True,
+once that section ends.
+
+Short replies (the offline fallback) use one-line emoji items instead of
+STEP sections ("🚂 Train: Delhi→Haridwar ₹380", "🏨 Zostel: ₹500/night |
+Hostel: ₹400/night"); those are understood too.
+"""
+from __future__ import annotations
+
+import re
+
+# ── Patterns ───────────────────────────────────────────────
+_STEP = re.compile(r"STEP\s*(\d+)", re.IGNORECASE)
+_AMOUNT = r"\d{1,3}(?:,\d{2,3})+|\d+"  # 500, 2,450, 1,00,000
+_PRICE = re.compile(rf"₹\s?({_AMOUNT})")
+_PRICE_UNIT = re.compile(rf"₹\s?(?:{_AMOUNT})(?:\s?/\s?[a-z]+)?", re.IGNORECASE)
+_LABEL = re.compile(r"^([^:₹]{1,30}):(?!\d)\s*(.*)$")
+_DURATION = re.compile(r"\b\d+\s?h(?:\s?\d+\s?m)?\b|\b\d+(?:\.\d+)?\s?(?:hrs?|hours?)\b", re.IGNORECASE)
+_DEPARTS = re.compile(r"departs?\s+([^,]+?),\s*arrives?\s+([^,;]+)", re.IGNORECASE)
+_RATING = re.compile(r"(\d(?:\.\d)?)\s*(?:★|⭐|/\s?5|stars?|rating)", re.IGNORECASE)
+_GROUP = re.compile(r"(\d+)\s*(?:logo|log|people|persons|friends|members|students)\b", re.IGNORECASE)
+_DAYS = re.compile(r"(\d+)\s*(?:days?|din)\b", re.IGNORECASE)
+_NIGHTS = re.compile(r"(\d+(?:-\d+)?)\s*nights?\b", re.IGNORECASE)
+_TOTAL_PER_PERSON = re.compile(r"total[^₹\n]*per\s*person", re.IGNORECASE)
+_TOTAL_GROUP = re.compile(r"total\s+for\s+(\d+)", re.IGNORECASE)
+_NAME_SPLIT = re.compile(r"\s+[—–-]\s+|,|\(")
+_LETTERS = re.compile(r"[^\W\d_]")
+
+BULLET = "•"
+
+# STEP number → section kind (see SYSTEM_PROMPT)
+STEP_SECTIONS = {
+    3: "transport",
+    5: "stays",
+    6: "activities",
+    9: "costs",
+}
+
+TRANSPORT_MODES = [
+    ("✈️ Flight", ("flight", "indigo", "air india", "spicejet", "✈")),
+    ("🚌 Bus", ("bus", "volvo", "sleeper coach", "semi-sleeper", "🚌")),
+    ("🚂 Train", ("train", "express", "shatabdi", "rajdhani", "vande", "mail", "🚂", "🚆")),
+]
+
+# One-line emoji items used by short replies
+LINE_ITEM_KINDS = [
+    ("🚂", "transport"), ("🚆", "transport"), ("🚌", "transport"), ("✈", "transport"),
+    ("🏨", "stays"),
+    ("🎯", "activities"), ("🏔", "activities"), ("🏍", "activities"),
+]
+
+GENERIC_TRANSPORT_LABELS = {"train", "bus", "flight", "volvo", "bus options", "flight options"}
+SKIP_TRANSPORT_LABELS = ("fare", "which", "best", "most", "tip")
+
+STAY_TAGS = {
+    "budget": "Best Value",
+    "mid": "Mid-range",
+    "premium": "Premium",
+    "luxury": "Premium",
+}
+
+
+def _first_price(text: str) -> int | None:
+    match = _PRICE.search(text)
+    return int(match.group(1).replace(",", "")) if match else None
+
+
+def _format_price(text: str) -> str:
+    match = _PRICE_UNIT.search(text)
+    if match:
+        return match.group(0).replace(" ", "")
+    return "Free" if "free" in text.lower() else ""
+
+
+def _has_name(text: str) -> bool:
+    """True unless the text is only a price / 'free' / punctuation."""
+    rest = _PRICE_UNIT.sub("", text).lower().replace("free", "")
+    return _LETTERS.search(rest) is not None
+
+
+def _split_label(text: str) -> tuple[str, str]:
+    """'Budget: Zostel, ₹500' → ('Budget', 'Zostel, ₹500'); times like 6:45 are not labels."""
+    match = _LABEL.match(text)
+    if match:
+        return match.group(1).strip(" ️✈🚂🚌"), match.group(2).strip()
+    return "", text.strip()
+
+
+def _transport_mode(text: str) -> str | None:
+    lowered = text.lower()
+    for mode, keywords in TRANSPORT_MODES:
+        if any(kw in lowered for kw in keywords):
+            return mode
+    return None
+
+
+class TripPlanParser:
+    """Single-pass, incremental parser over a streaming CampusGPT reply."""
+
+    def __init__(self):
+        self._tail = ""
+        self._section: str | None = None
+        self._section_fare: str = ""
+
+        self.destination = ""
+        self.region = ""
+        self.dates = ""
+        self.member_count = 0
+        self.price_per_person: int | None = None
+        self.group_total: int | None = None
+        self.transport: list[dict] = []
+        self.stays: list[dict] = []
+        self.activities: list[dict] = []
+
+    @classmethod
+    def from_text(cls, text: str) -> "TripPlanParser":
+        parser = cls()
+        parser.feed(text)
+        parser.close()
+        return parser
+
+    # ── Feeding ────────────────────────────────────────────
+    def feed(self, delta: str) -> list[dict]:
+        """Consume a text delta; returns plan items completed by it."""
+        text = self._tail + delta
+        lines = text.split("\n")
+        self._tail = lines.pop()
+        updates: list[dict] = []
+        for line in lines:
+            updates += self._line(line)
+        return updates
+
+    def close(self) -> list[dict]:
+        """Flush the last (unterminated) line at end of stream."""
+        line, self._tail = self._tail, ""
+        updates = self._line(line) if line else []
+        return updates + self._end_section()
+
+    # ── Results ────────────────────────────────────────────
+    @property
+    def trip_generated(self) -> bool:
+        """Whether the reply contained an actual plan (not just chit-chat)."""
+        return bool(self.transport or self.stays or self.activities or self.price_per_person)
+
+    def plan(self) -> dict | None:
+        """TripPlan fields extracted so far (None until a plan shows up)."""
+        if not self.trip_generated:
+            return None
+        per_person = self.price_per_person or 0
+        return {
+            "destination": self.destination,
+            "region": self.region,
+            "dates": self.dates,
+            "member_count": self.member_count or 1,
+            "price_per_person": f"₹{per_person:,}" if per_person else "",
+            "transport": self.transport,
+            "stays": self.stays,
+            "activities": self.activities,
+            "budget_used": per_person,
+            "budget_total": per_person,
+            "members": [],
+        }
+
+    # ── Line handling ──────────────────────────────────────
+    def _line(self, raw: str) -> list[dict]:
+        line = raw.strip()
+        if not line:
+            return []
+
+        step = _STEP.search(line)
+        if step and not line.startswith(BULLET):
+            updates = self._end_section()
+            self._section = STEP_SECTIONS.get(int(step.group(1)))
+            return updates
+
+        if line.startswith("📍"):
+            self._header(line[1:].strip())
+            return []
+        if line.startswith("📅"):
+            self._dates(line[1:].strip(), free_text=True)
+            return []
+        if line.startswith(("📊", "💰")) or _TOTAL_GROUP.search(line):
+            self._total(line)
+            return []
+
+        if line.startswith(BULLET):
+            return self._bullet(line[1:].strip())
+
+        # One-line emoji items (short replies, outside STEP sections)
+        for emoji, kind in LINE_ITEM_KINDS:
+            if line.startswith(emoji):
+                body = line[len(emoji):].lstrip("️ ").strip()
+                updates = []
+                for part in body.split("|"):
+                    updates += self._item(kind, part.strip())
+                return updates
+
+        return []
+
+    def _bullet(self, text: str) -> list[dict]:
+        if self._section == "costs":
+            self._total(text)
+            return []
+        if self._section is None:
+            return []
+        return self._item(self._section, text)
+
+    def _item(self, kind: str, text: str) -> list[dict]:
+        if not text:
+            return []
+        item, items = None, None
+        if kind == "transport":
+            item, items = self._transport(text), self.transport
+        elif kind == "stays":
+            item, items = self._stay(text), self.stays
+        elif kind == "activities":
+            item, items = self._activity(text), self.activities
+        if item is None:
+            return []
+        items.append(item)
+        return [{"kind": kind, "index": len(items) - 1, "item": item}]
+
+    # ── Field extraction ───────────────────────────────────
+    def _header(self, text: str) -> None:
+        name = re.split(r"\s+COMPLETE GUIDE|\s+[—–-]\s+", text, maxsplit=1, flags=re.IGNORECASE)[0]
+        self.destination = self.destination or name.strip()
+        if "," in self.destination and not self.region:
+            self.region = self.destination.split(",", 1)[1].strip()
+        group = _GROUP.search(text)
+        if group:
+            self.member_count = int(group.group(1))
+        self._dates(text)
+
+    def _dates(self, text: str, free_text: bool = False) -> None:
+        if self.dates:
+            return
+        days = _DAYS.search(text)
+        nights = _NIGHTS.search(text)
+        if days:
+            self.dates = f"{days.group(1)} days"
+        elif nights:
+            self.dates = f"{nights.group(1)} nights"
+        elif free_text and len(text) <= 40:
+            self.dates = text
+
+    def _total(self, text: str) -> None:
+        group = _TOTAL_GROUP.search(text)
+        if group:
+            self.member_count = self.member_count or int(group.group(1))
+            self.group_total = _first_price(text)
+            return
+        if _TOTAL_PER_PERSON.search(text) or "/person" in text or text.lower().lstrip("💰📊 ").startswith("total"):
+            price = _first_price(text)
+            if price is not None:
+                self.price_per_person = price
+
+    def _transport(self, text: str) -> dict | None:
+        label, body = _split_label(text)
+        lowered = label.lower()
+        if any(word in lowered for word in SKIP_TRANSPORT_LABELS):
+            if "fare" in lowered:
+                # "Train fare: Sleeper ₹380, 3AC ₹990" — default price for the section
+                self._section_fare = self._section_fare or _format_price(body)
+            return None
+
+        mode = _transport_mode(text)
+        if mode is None:
+            return None
+
+        departs = _DEPARTS.search(body)
+        duration = _DURATION.search(body)
+        if departs:
+            time = f"{departs.group(1).strip()} → {departs.group(2).strip()}"
+        else:
+            time = duration.group(0) if duration else ""
+
+        core = _NAME_SPLIT.split(body, maxsplit=1)[0]
+        core = _PRICE_UNIT.sub("", core).strip(" ,:—-~+") if _has_name(core) else ""
+        if label and lowered not in GENERIC_TRANSPORT_LABELS:
+            route = f"{label} {core}".strip()
+        else:
+            route = core or mode.split(" ", 1)[1]
+
+        return {
+            "mode": mode,
+            "route": route,
+            "time": time,
+            "price": _format_price(body),
+        }
+
+    def _stay(self, text: str) -> dict | None:
+        label, body = _split_label(text)
+        if "tip" in label.lower() or "₹" not in body:
+            return None
+        rating = _RATING.search(body)
+        name = _NAME_SPLIT.split(body, maxsplit=1)[0].strip()
+        if not _has_name(name):
+            # "Zostel: ₹500/night" — the name is the label
+            name, label = label or "Stay", ""
+        return {
+            "name": name,
+            "rating": float(rating.group(1)) if rating else 0.0,
+            "price": _format_price(body),
+            "tag": STAY_TAGS.get(label.lower().split()[0], label) if label else "",
+        }
+
+    def _activity(self, text: str) -> dict | None:
+        label, body = _split_label(text)
+        if not body or label.lower().startswith(("day", "tip", "include", "same")):
+            return None
+        name = _NAME_SPLIT.split(body, maxsplit=1)[0].strip()
+        if not _has_name(name):
+            # "Ganga Aarti: FREE" — the name is the label
+            name = label
+        if not name or name.lower().startswith(("same", "include")):
+            return None
+        return {"name": name, "cost": _format_price(body) or "—"}
+
+    def _end_section(self) -> list[dict]:
+        """Backfill section-level fare into price-less transport options.
+
+        Returns an update per backfilled card (already sent without a price).
+        """
+        updates = []
+        if self._section == "transport" and self._section_fare:
+            for index, option in enumerate(self.transport):
+                if not option["price"]:
+                    option["price"] = self._section_fare
+                    updates.append({"kind": "transport", "index": index, "item": option, "update": True})
+        self._section_fare = ""
+        return updates
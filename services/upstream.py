@@ -0,0 +1,123 @@
+"""Upstream LLM clients — long-lived, pooled connections to Groq and Anthropic.
+
+The clients are created once in ``main.lifespan`` and shared by every request,
+so chat turns reuse warm keep-alive (HTTP/2 where available) connections
+instead of paying a fresh TLS handshake, and Claude calls never block the
+event loop.
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ── Pool / timeout configuration (env overridable) ────────
+POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "30"))
+
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+WRITE_TIMEOUT = float(os.getenv("LLM_WRITE_TIMEOUT", "10"))
+POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "5"))
+
+# HTTP/2 needs the optional `h2` package (installed via httpx[http2])
+HTTP2_ENABLED = (
+    os.getenv("LLM_HTTP2", "1") != "0"
+    and importlib.util.find_spec("h2") is not None
+)
+
+_http_client: httpx.AsyncClient | None = None
+_anthropic_client = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=CONNECT_TIMEOUT,
+        read=READ_TIMEOUT,
+        write=WRITE_TIMEOUT,
+        pool=POOL_TIMEOUT,
+    )
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=_limits(),
+        timeout=_timeout(),
+    )
+
+
+def _new_anthropic_client():
+    """Build an AsyncAnthropic client, or None if no key / package."""
+    anthropic_key = os.getenv("ANTHROPIC_API_KEY", "")
+    if not anthropic_key:
+        return None
+    try:
+        import anthropic
+    except ImportError:
+        print("[upstream] anthropic package missing, Claude fallback disabled")
+        return None
+
+    return anthropic.AsyncAnthropic(
+        api_key=anthropic_key,
+        max_retries=0,
+        http_client=anthropic.DefaultAsyncHttpxClient(
+            limits=_limits(),
+            timeout=_timeout(),
+        ),
+    )
+
+
+async def start_clients() -> None:
+    """Open the shared upstream clients (called from main.lifespan)."""
+    global _http_client, _anthropic_client
+
+    if _http_client is None:
+        _http_client = _new_http_client()
+    if _anthropic_client is None:
+        _anthropic_client = _new_anthropic_client()
+
+    print(f"[upstream] clients ready (http2={HTTP2_ENABLED}, "
+          f"pool={POOL_MAX_CONNECTIONS}/{POOL_MAX_KEEPALIVE})")
+
+
+async def close_clients() -> None:
+    """Close the shared upstream clients and drain their pools."""
+    global _http_client, _anthropic_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+    if _anthropic_client is not None:
+        await _anthropic_client.close()
+        _anthropic_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled HTTP client, creating it lazily outside lifespan."""
+    global _http_client
+    if _http_client is None:
+        _http_client = _new_http_client()
+    return _http_client
+
+
+def get_anthropic_client():
+    """Return the shared AsyncAnthropic client (None if not configured)."""
+    global _anthropic_client
+    if _anthropic_client is None:
+        _anthropic_client = _new_anthropic_client()
+    return _anthropic_client
@@ -0,0 +1,51 @@
+import json
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import campuspay
+
+
+class BulkSettleEndpointTest(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(campuspay.router)
+        self.client = TestClient(app)
+
+    def settle(self, body: str, **params) -> list[dict]:
+        response = self.client.post("/api/campuspay/settle/bulk", params=params, content=body)
+        self.assertEqual(response.status_code, 200, response.text)
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_unquoted_csv(self):
+        lines = self.settle(
+            "group,payer,amount,participants\n"
+            "mess1,A,300,A;B;C\n"
+            "mess1,B,90,A;C\n"
+            "trip,A,100.50,A;Y\n"
+        )
+        *payments, summary = lines
+        self.assertEqual(summary["rows"], 3)
+        self.assertEqual(summary["skipped"], 0)
+        self.assertEqual(summary["people"], 4)  # A counts once across both groups
+        net: dict[tuple[str, str], float] = {}
+        for p in payments:
+            net[p["group"], p["to_person"]] = net.get((p["group"], p["to_person"]), 0) + p["amount"]
+            net[p["group"], p["from_person"]] = net.get((p["group"], p["from_person"]), 0) - p["amount"]
+        self.assertEqual(net, {("mess1", "A"): 155.0, ("mess1", "B"): -10.0,
+                               ("mess1", "C"): -145.0, ("trip", "A"): 50.25, ("trip", "Y"): -50.25})
+
+    def test_crlf_and_quoted_csv_agree(self):
+        plain = self.settle("group,payer,amount,participants\r\ng,P,50,P;Q\r\n")
+        quoted = self.settle('group,payer,amount,participants\n"g","P","50","P;Q"\n')
+        self.assertEqual(plain[:-1], quoted[:-1])
+        self.assertEqual(plain[0], {"group": "g", "from_person": "Q", "to_person": "P", "amount": 25.0})
+
+    def test_missing_header(self):
+        response = self.client.post("/api/campuspay/settle/bulk", content="a,b\n1,2\n")
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
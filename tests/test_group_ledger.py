@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.group_ledger import GroupLedger, LedgerStore
+from services.ledger_log import LedgerLog
+
+
+class GroupLedgerLogTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "ledger.db")
+        self.log = LedgerLog(self.path)
+
+    def tearDown(self):
+        self.log.close()
+        self.dir.cleanup()
+
+    def view(self, ledger: GroupLedger):
+        owed = {a: dict(b) for a, b in ledger.owed.items() if b}
+        return ledger.version, dict(ledger.balances), owed, ledger.pair_count
+
+    def test_failed_write_changes_nothing(self):
+        ledger = GroupLedger("trip", self.log)
+        ledger.record_expense("A", 90, ["A", "B", "C"])
+        before = self.view(ledger)
+
+        # Another writer already holds the next sequence number: the commit fails
+        db = sqlite3.connect(self.path)
+        db.execute("INSERT INTO events VALUES ('trip', 2, 'payment', '{}', 0)")
+        db.commit()
+        db.close()
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            ledger.record_payment("B", "A", 30)
+        self.assertEqual(self.view(ledger), before)
+
+    @mock.patch("services.group_ledger.LEDGER_SNAPSHOT_EVERY", 4)
+    def test_reload_replays_tail_after_snapshot(self):
+        store = LedgerStore()
+        store.open(self.path)
+        ledger = store.get("trip")
+        for i in range(7):
+            ledger.record_expense("A", 100 + i, ["A", "B", "C"])
+            ledger.record_debt("C", "B", 5)
+        ledger.settle_pair("A", "B")
+        store.close()
+
+        reloaded = LedgerStore()
+        reloaded.open(self.path)
+        snapshot_seq, _, tail = reloaded.log.load("trip")
+        self.assertEqual((snapshot_seq, len(tail)), (12, 3))
+        self.assertEqual(self.view(reloaded.get("trip")), self.view(ledger))
+        reloaded.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from services import intent_router
+from services.timetable import get_timetable
+
+
+class IntentRouterTest(unittest.TestCase):
+    def test_single_station_route_starts_at_campus(self):
+        reply = intent_router.answer("Patna ghar jaane ka route")
+        self.assertIsNotNone(reply)
+        text, trip_generated = reply
+        self.assertIn(f"{get_timetable().campus_city} → Patna", text)
+        self.assertFalse(trip_generated)
+
+    def test_campus_city_alone_needs_the_llm(self):
+        campus = get_timetable().campus_city
+        self.assertIsNone(intent_router.answer(f"{campus} ghar ka route"))
+
+    def test_unpriced_class_needs_the_llm(self):
+        self.assertIsNone(intent_router.answer("Delhi se Lucknow 2ac kitna"))
+        reply = intent_router.answer("Delhi se Lucknow 3ac kitna")
+        self.assertIn("AC 3-Tier", reply[0])
+
+
+if __name__ == "__main__":
+    unittest.main()